@@ -0,0 +1,110 @@
+import os
+import random
+import time
+from dotenv import load_dotenv
+from starlette.datastructures import URL
+from logger import get_logger
+
+'''
+Sampled access log: one line per request, written once its response is sent.
+
+AccessLogMiddleware is plain ASGI: it only wraps send() to see the status
+and times the call, without the extra tasks and memory streams
+BaseHTTPMiddleware (@app.middleware("http")) puts between the app and the
+server, so large and streaming responses pass through untouched. The time
+logged covers the whole response, body included. Other timing or
+correlation middleware should follow the same pattern.
+
+At high volume most requests are unremarkable, so only a fraction of them is
+logged (ACCESS_LOG_SAMPLE_RATE). Requests that fail (status at or over
+ACCESS_LOG_ERROR_STATUS, or an exception) and slow ones (ACCESS_LOG_SLOW_MS)
+are always logged, whatever the rate.
+
+Configuration:
+- ACCESS_LOG_SAMPLE_RATE: Fraction of the other requests logged, 0 to 1 (default 1: all)
+- ACCESS_LOG_ERROR_STATUS: Responses with this status or above are always logged (default 500)
+- ACCESS_LOG_SLOW_MS: Requests taking this long or longer are always logged
+  (default 1000, 0 disables it)
+'''
+
+load_dotenv()
+
+SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1"))
+ERROR_STATUS = int(os.getenv("ACCESS_LOG_ERROR_STATUS", "500"))
+SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+
+if not 0 <= SAMPLE_RATE <= 1:
+    raise ValueError(f"Invalid ACCESS_LOG_SAMPLE_RATE={SAMPLE_RATE}, expected a value between 0 and 1")
+
+logger = get_logger(__name__)
+
+
+def is_slow(duration_ms: float) -> bool:
+    return SLOW_MS > 0 and duration_ms >= SLOW_MS
+
+
+def should_log(status: int, duration_ms: float) -> bool:
+    '''Whether the access line of a request is written.'''
+    if status >= ERROR_STATUS or is_slow(duration_ms):
+        return True
+    return SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE
+
+
+def log_access(method: str, url, status: int, duration_ms: float):
+    '''Write the access line of a request that got a response (sampling is up to the caller).'''
+    if is_slow(duration_ms):
+        logger.warning("%s %s %d %.1f ms (slow)", method, url, status, duration_ms)
+    else:
+        logger.info("%s %s %d %.1f ms", method, url, status, duration_ms)
+
+
+def log_failure(method: str, url, error: Exception, duration_ms: float):
+    '''Write the access line of a request that raised (always written).'''
+    logger.error("%s %s failed after %.1f ms: %s", method, url, duration_ms, error)
+
+
+class AccessLogMiddleware:
+    '''Write the sampled access line of every HTTP request (ASGI middleware).'''
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # URLs are only built for the records that are written
+        logger.debug("Incoming request: %s %s", scope["method"], _LazyURL(scope))
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+
+        except Exception as e:
+            log_failure(scope["method"], _LazyURL(scope), e, (time.perf_counter() - started) * 1000)
+            raise
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        if should_log(status, duration_ms):
+            log_access(scope["method"], _LazyURL(scope), status, duration_ms)
+
+
+class _LazyURL:
+    '''Full URL of a request, built when the log record is formatted.'''
+
+    __slots__ = ("scope",)
+
+    def __init__(self, scope):
+        self.scope = scope
+
+    def __str__(self):
+        return str(URL(scope=self.scope))
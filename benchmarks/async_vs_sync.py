@@ -0,0 +1,87 @@
+'''
+Throughput benchmark for the sync (threadpool) and async data layers.
+
+Start the API once per mode and point this script at it:
+
+    DB_ASYNC=false uvicorn main:app --port 8000
+    python benchmarks/async_vs_sync.py --label sync
+
+    DB_ASYNC=true uvicorn main:app --port 8000
+    python benchmarks/async_vs_sync.py --label async
+
+Each concurrency level (50, 200 and 1000 clients by default) keeps that many
+requests in flight until --requests requests have completed, then reports
+requests per second and latency percentiles. Requires httpx.
+'''
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _run_level(url: str, concurrency: int, total_requests: int, timeout: float) -> dict:
+    '''Issue total_requests GETs against url keeping `concurrency` of them in flight.'''
+    latencies = []
+    errors = 0
+    remaining = total_requests
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/component_definitions/components/1/versions",
+                        help="Endpoint to hit (default: latest version of component 1)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", default="", help="Label printed with the results (e.g. sync / async)")
+    args = parser.parse_args()
+
+    url = args.base_url.rstrip("/") + args.path
+
+    # Warm up the pool and any lazy initialization before measuring
+    await _run_level(url, 10, 100, args.timeout)
+
+    print(f"{'mode':<8} {'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        result = await _run_level(url, concurrency, max(args.requests, concurrency), args.timeout)
+        print(f"{args.label:<8} {result['concurrency']:>8} {result['requests']:>9} {result['errors']:>7} "
+              f"{result['rps']:>10.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+'''
+Storage and read latency report for full vs compact component definitions.
+
+Copies the component versions into two scratch tables, one per storage
+mode, and compares them:
+
+- full: definition stored next to default_props, validation_config and
+  service_bindings (every value twice)
+- compact: definition left NULL and assembled at read time
+  (DEFINITION_EXPRESSION, see database/migrations/002_compact_component_definitions.sql)
+
+For each table it reports the heap, TOAST and total size, the average row
+size, the WAL written by the copy and the latency of point reads by
+(component_id, version_number), the query the API runs on a cache miss.
+The real table is never modified. When it holds fewer than --rows versions,
+synthetic versions with representative payloads are added to the copies.
+Uses the same environment variables as the API (DBNAME, DBUSER, ...):
+
+    python benchmarks/component_storage_report.py
+    python benchmarks/component_storage_report.py --rows 50000 --reads 5000
+'''
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_handler import open_dedicated_connection
+from routers.data_layer.component_versions import DEFINITION_EXPRESSION, component_version_columns
+
+SCHEMA = "storage_report"
+
+# Synthetic versions: a few hundred bytes to a few KB per JSON column, like real components
+SYNTHETIC_COLUMNS = '''
+    jsonb_build_object(
+        'label', 'Field ' || n,
+        'placeholder', repeat('Type here ', 1 + mod(n, 8)),
+        'options', (SELECT jsonb_agg(jsonb_build_object('value', 'opt_' || o, 'label', 'Option ' || o))
+                    FROM generate_series(1, mod(n, 40)) AS o)) AS default_props,
+    jsonb_build_object(
+        'required', mod(n, 2) = 0,
+        'min_length', 1,
+        'max_length', 255,
+        'pattern', '^[A-Za-z0-9 ]+$',
+        'messages', jsonb_build_object('required', repeat('This field is required. ', 4))) AS validation_config,
+    jsonb_build_object(
+        'lookup', jsonb_build_object('url', 'https://services.internal/lookup/' || n, 'method', 'GET'),
+        'on_change', jsonb_build_object('url', 'https://services.internal/validate/' || n, 'method', 'POST')) AS service_bindings
+'''
+
+
+def _fill(cursor, table: str, compact: bool, rows: int) -> int:
+    '''Copy the real versions (plus synthetic ones up to `rows`) into a scratch table. Returns WAL bytes.'''
+    definition = "NULL::jsonb" if compact else DEFINITION_EXPRESSION
+
+    cursor.execute("SELECT pg_current_wal_lsn() AS lsn;")
+    started_at = cursor.fetchone()["lsn"]
+
+    cursor.execute(f'''
+        INSERT INTO {SCHEMA}.{table} (component_id, version_number, definition,
+                                      default_props, validation_config, service_bindings)
+        SELECT component_id, version_number, {definition}, default_props, validation_config, service_bindings
+        FROM form_definition.component_versions;
+    ''')
+    copied = cursor.rowcount
+
+    if copied < rows:
+        cursor.execute(f'''
+            INSERT INTO {SCHEMA}.{table} (component_id, version_number, definition,
+                                          default_props, validation_config, service_bindings)
+            SELECT -1 - n / 50, 1 + mod(n, 50), {definition}, default_props, validation_config, service_bindings
+            FROM (SELECT n, NULL::jsonb AS definition, {SYNTHETIC_COLUMNS} FROM generate_series(0, %s) AS n) AS synthetic;
+        ''', (rows - copied - 1,))
+
+    cursor.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s) AS wal;", (started_at,))
+    return int(cursor.fetchone()["wal"])
+
+
+def _sizes(cursor, table: str) -> dict:
+    cursor.execute(f'''
+        SELECT pg_relation_size(c.oid) AS heap,
+               COALESCE(pg_total_relation_size(c.reltoastrelid), 0) AS toast,
+               pg_total_relation_size(c.oid) AS total,
+               (SELECT COUNT(*) FROM {SCHEMA}.{table}) AS rows,
+               (SELECT AVG(pg_column_size(t.*)) FROM {SCHEMA}.{table} t) AS avg_row
+        FROM pg_class c
+        WHERE c.oid = '{SCHEMA}.{table}'::regclass;
+    ''')
+    return cursor.fetchone()
+
+
+def _read_latency(cursor, table: str, keys: list) -> dict:
+    '''Time point reads of the given (component_id, version_number) keys, as the API runs them.'''
+    query = f'''
+        SELECT {component_version_columns()}
+        FROM {SCHEMA}.{table}
+        WHERE component_id = %s AND version_number = %s;
+    '''
+
+    latencies = []
+    for key in keys:
+        started = time.perf_counter()
+        cursor.execute(query, key)
+        cursor.fetchone()
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def _mb(value) -> str:
+    return f"{value / 1024 / 1024:.2f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs compact component definition storage report")
+    parser.add_argument("--rows", type=int, default=20000, help="Minimum versions per table (default 20000)")
+    parser.add_argument("--reads", type=int, default=2000, help="Point reads timed per table (default 2000)")
+    args = parser.parse_args()
+
+    conn = open_dedicated_connection()
+    conn.set_session(autocommit=True)
+
+    from psycopg2.extras import RealDictCursor
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+
+        results = {}
+        for table, compact in (("full", False), ("compact", True)):
+            cursor.execute(f'''
+                CREATE TABLE {SCHEMA}.{table} (
+                    id SERIAL PRIMARY KEY,
+                    component_id INTEGER NOT NULL,
+                    version_number INTEGER NOT NULL,
+                    definition JSONB,
+                    default_props JSONB,
+                    validation_config JSONB,
+                    service_bindings JSONB,
+                    is_active BOOLEAN DEFAULT true,
+                    created_at TIMESTAMPTZ DEFAULT now(),
+                    updated_at TIMESTAMPTZ DEFAULT now(),
+                    UNIQUE(component_id, version_number)
+                );
+            ''')
+
+            wal = _fill(cursor, table, compact, args.rows)
+            cursor.execute(f"VACUUM ANALYZE {SCHEMA}.{table};")
+            results[table] = {"wal": wal, **_sizes(cursor, table)}
+
+        # Same random keys for both tables, warmed once so both are read from shared buffers
+        cursor.execute(f"SELECT component_id, version_number FROM {SCHEMA}.full;")
+        all_keys = [(row["component_id"], row["version_number"]) for row in cursor.fetchall()]
+        keys = [random.choice(all_keys) for _ in range(args.reads)]
+
+        for table in results:
+            _read_latency(cursor, table, keys[:200])
+            results[table].update(_read_latency(cursor, table, keys))
+
+        full, compact = results["full"], results["compact"]
+        print(f"versions per table: {full['rows']}")
+        print(f"{'':>14} {'full':>12} {'compact':>12} {'change':>8}")
+        for label, key, formatter in (("heap", "heap", _mb), ("toast", "toast", _mb), ("total", "total", _mb),
+                                      ("avg row", "avg_row", lambda v: f"{float(v):.0f} B"),
+                                      ("WAL written", "wal", _mb),
+                                      ("read p50", "p50_ms", lambda v: f"{v:.3f} ms"),
+                                      ("read p95", "p95_ms", lambda v: f"{v:.3f} ms"),
+                                      ("read mean", "mean_ms", lambda v: f"{v:.3f} ms")):
+            before, after = float(full[key]), float(compact[key])
+            change = f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+            print(f"{label:>14} {formatter(full[key]):>12} {formatter(compact[key]):>12} {change:>8}")
+
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
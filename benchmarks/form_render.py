@@ -0,0 +1,147 @@
+'''
+Benchmark of rendering a form: one render bundle request vs the N+1 client path.
+
+Start the API and point this script at it:
+
+    uvicorn main:app --port 8000
+    python benchmarks/form_render.py
+    python benchmarks/form_render.py --components 10 50 200 --renders 100
+
+For each size, the script creates that many components (one version each)
+and a form whose schema references all of them, then times renders done:
+
+- n+1: GET the form version, then GET every component version it references,
+  with at most --connections requests in flight (6, like a browser per host)
+- bundle: GET /forms/{id}/versions/{n}/render
+
+Start the API with CACHE_ENABLED=false to measure the database path (with the
+cache, both paths end up served from memory). The data created is deleted at
+the end. Requires httpx.
+'''
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def _create_form(client: httpx.AsyncClient, components: int) -> dict:
+    '''Create `components` components with one version each and a form version referencing them.'''
+    tag = uuid.uuid4().hex[:8]
+    component_ids = []
+
+    for index in range(components):
+        response = await client.post("/component_definitions/components",
+                                     json={"key": f"bench_{tag}_{index}", "name": f"Bench {index}", "category": "input"})
+        response.raise_for_status()
+        component_id = response.json()["component"]["id"]
+
+        response = await client.post(f"/component_definitions/components/{component_id}/versions",
+                                     json={"default_props": {"label": f"Field {index}", "placeholder": "Type here..."},
+                                           "validation_config": {"required": index % 2 == 0, "max_length": 255},
+                                           "service_bindings": {}})
+        response.raise_for_status()
+        component_ids.append(component_id)
+
+    response = await client.post("/form_definitions/forms", json={"key": f"bench_{tag}", "name": "Render benchmark"})
+    response.raise_for_status()
+    form_id = response.json()["form"]["id"]
+
+    schema = {"fields": [{"name": f"field_{index}", "component_id": component_id, "version_number": 1}
+                         for index, component_id in enumerate(component_ids)]}
+    response = await client.post(f"/form_definitions/forms/{form_id}/versions",
+                                 json={"form_id": form_id, "version_number": 0, "key": "v1", "schema": schema})
+    response.raise_for_status()
+
+    return {"form_id": form_id, "version_number": response.json()["data"]["version_number"],
+            "component_ids": component_ids}
+
+
+async def _delete_form(client: httpx.AsyncClient, form: dict):
+    await client.delete(f"/form_definitions/forms/{form['form_id']}")
+    for component_id in form["component_ids"]:
+        await client.delete(f"/component_definitions/components/{component_id}/all-versions")
+        await client.delete(f"/component_definitions/components/{component_id}")
+
+
+async def render_n_plus_one(client: httpx.AsyncClient, form: dict) -> int:
+    '''Render the way clients did before bundles. Returns the number of requests made.'''
+    response = await client.get(f"/form_definitions/forms/{form['form_id']}/versions/{form['version_number']}")
+    response.raise_for_status()
+
+    fields = response.json()["form_version"]["schema"]["fields"]
+    responses = await asyncio.gather(*(
+        client.get(f"/component_definitions/components/{field['component_id']}/versions/{field['version_number']}")
+        for field in fields))
+    for response in responses:
+        response.raise_for_status()
+
+    return 1 + len(responses)
+
+
+async def render_bundle(client: httpx.AsyncClient, form: dict) -> int:
+    '''Render with one bundle request. Returns the number of requests made.'''
+    response = await client.get(f"/form_definitions/forms/{form['form_id']}/versions/{form['version_number']}/render")
+    response.raise_for_status()
+    assert len(response.json()["components"]) == len(form["component_ids"])
+    return 1
+
+
+async def measure(render, client: httpx.AsyncClient, form: dict, renders: int) -> dict:
+    '''Time `renders` sequential renders.'''
+    latencies = []
+    requests = 0
+
+    for _ in range(renders):
+        started = time.perf_counter()
+        requests += await render(client, form)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "requests": requests // renders,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--components", type=int, nargs="+", default=[10, 50, 200],
+                        help="Components referenced by the form (default 10 50 200)")
+    parser.add_argument("--renders", type=int, default=50, help="Renders timed per path and size")
+    parser.add_argument("--connections", type=int, default=6, help="Requests in flight on the n+1 path")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        print(f"{'components':>10} {'path':>7} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8}")
+
+        for components in args.components:
+            form = await _create_form(client, components)
+            try:
+                # Warm up both paths before measuring
+                await render_n_plus_one(client, form)
+                await render_bundle(client, form)
+
+                n_plus_one = await measure(render_n_plus_one, client, form, args.renders)
+                bundle = await measure(render_bundle, client, form, args.renders)
+
+                print(f"{components:>10} {'n+1':>7} {n_plus_one['requests']:>9} "
+                      f"{n_plus_one['p50_ms']:>9.2f} {n_plus_one['p95_ms']:>9.2f}")
+                print(f"{components:>10} {'bundle':>7} {bundle['requests']:>9} "
+                      f"{bundle['p50_ms']:>9.2f} {bundle['p95_ms']:>9.2f} "
+                      f"{n_plus_one['p50_ms'] / bundle['p50_ms']:>7.1f}x")
+
+            finally:
+                await _delete_form(client, form)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
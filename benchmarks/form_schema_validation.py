@@ -0,0 +1,149 @@
+'''
+Cost of validating form version schemas on write, at a few body sizes.
+
+For each size, a form schema is generated (sections of fields with labels,
+props and validation rules, shaped like real ones) and timed through what a
+create / update request does with it:
+
+- parse: decoding the JSON body (orjson when installed)
+- meta: checking it against its meta-schema (schema_validation.py; the
+  meta-schema is compiled once, beforehand, as in the app)
+- rules: compiling the validation rules of its fields (validation_engine.py)
+
+and, for bodies over the size guard limit (body_limit.py), the time the
+middleware takes to answer 413 to the body sent in 64 KB chunks, which is
+what the request costs instead of all of the above.
+
+No database or server is needed:
+
+    python benchmarks/form_schema_validation.py
+    python benchmarks/form_schema_validation.py --sizes 10 1024 10240 --seconds 2
+'''
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body_limit import BodySizeLimitMiddleware, FORM_VERSION_MAX_BODY_BYTES, FORM_VERSION_WRITE_PATH
+from json_response import orjson
+from schema_validation import DEFAULT_VERSION, meta_validator
+from validation_engine import check_schema
+
+CHUNK_SIZE = 64 * 1024
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def _field(index: int) -> dict:
+    '''One form field, shaped like the ones stored in form_versions.schema.'''
+    return {
+        "name": f"field_{index}",
+        "label": f"Field number {index}",
+        "component_id": index % 40 + 1,
+        "version_number": index % 7 + 1,
+        "required": index % 3 == 0,
+        "props": {"placeholder": "Type here...", "options": [{"value": f"opt_{n}"} for n in range(index % 4)]},
+        "validation": {"type": "string", "min_length": 1, "max_length": 255, "pattern": "^[A-Za-z0-9 ]+$",
+                       "messages": {"pattern": "Letters, digits and spaces only."}},
+    }
+
+
+def build_body(target_kb: int) -> bytes:
+    '''A form version create body whose encoding is roughly target_kb kilobytes.'''
+    field_size = len(json.dumps(_field(1)))
+    count = max(1, target_kb * 1024 // field_size)
+    sections = [{"title": f"Section {n}", "fields": [_field(i) for i in range(n, count, 10)]} for n in range(10)]
+
+    return json.dumps({"form_id": 1, "version_number": 0, "key": "benchmark",
+                       "schema": {"title": "Benchmark", "sections": sections}}).encode()
+
+
+def guard_response_ms(body: bytes) -> float:
+    '''Time for the size guard to answer a body sent in chunks (over the limit: 413).'''
+
+    async def app(scope, receive, send):
+        # Reads the whole body, as the route would
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = BodySizeLimitMiddleware(app, FORM_VERSION_MAX_BODY_BYTES, FORM_VERSION_WRITE_PATH)
+    scope = {"type": "http", "method": "POST", "path": "/form_definitions/forms/1/versions", "headers": []}
+
+    async def run():
+        offset = 0
+        statuses = []
+
+        async def receive():
+            nonlocal offset
+            chunk = body[offset:offset + CHUNK_SIZE]
+            offset += CHUNK_SIZE
+            return {"type": "http.request", "body": chunk, "more_body": offset < len(body)}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        started = time.perf_counter()
+        await middleware(scope, receive, send)
+        assert statuses == [413]
+        return (time.perf_counter() - started) * 1000
+
+    return asyncio.run(run())
+
+
+def measure(function, argument, seconds: float) -> float:
+    '''Milliseconds per call of function(argument), run for about `seconds`.'''
+    iterations = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    while True:
+        function(argument)
+        iterations += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+
+    return (now - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Form schema validation cost benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1024, 10240],
+                        help="Body sizes in KB (default 10 1024 10240)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent per case (default 1)")
+    args = parser.parse_args()
+
+    validate = meta_validator(DEFAULT_VERSION)
+
+    print(f"meta-schema version {DEFAULT_VERSION}, size guard limit {FORM_VERSION_MAX_BODY_BYTES} bytes")
+    print(f"{'size':>8} {'bytes':>10} {'fields':>7} {'parse ms':>9} {'meta ms':>8} {'rules ms':>9} "
+          f"{'total ms':>9} {'MB/s':>6} {'413 ms':>7}")
+
+    for size in args.sizes:
+        body = build_body(size)
+        schema = loads(body)["schema"]
+        fields = sum(len(section["fields"]) for section in schema["sections"])
+
+        assert validate(schema) == []
+
+        parse = measure(loads, body, args.seconds)
+        meta = measure(validate, schema, args.seconds)
+        rules = measure(check_schema, schema, args.seconds)
+        total = parse + meta + rules
+
+        guard = f"{guard_response_ms(body):>7.2f}" if len(body) > FORM_VERSION_MAX_BODY_BYTES else f"{'-':>7}"
+
+        print(f"{size:>6}KB {len(body):>10} {fields:>7} {parse:>9.3f} {meta:>8.3f} {rules:>9.3f} "
+              f"{total:>9.3f} {len(body) / total / 1000:>6.1f} {guard}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+'''
+Micro-benchmark of response encoding for form version rows.
+
+Compares the ways an endpoint can turn a data layer row into bytes:
+
+- default: what FastAPI does with a returned dict, jsonable_encoder followed
+  by the stdlib JSONResponse.render
+- fast: FastJSONResponse.render (orjson when installed, see json_response.py)
+- raw: FastJSONResponse.render with the schema as RawJSON text (JSONB read
+  as ::text and spliced as is). The "parse" column adds what the driver
+  spends turning that text into dicts in the other two modes.
+
+Rows look like the ones returned by the data layer (ids, datetimes and a
+nested JSONB form schema) at a few schema sizes. No database or server is
+needed:
+
+    python benchmarks/json_encoding.py
+    python benchmarks/json_encoding.py --sizes 10 100 1000 --seconds 2
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from json_response import FastJSONResponse, RawJSON, orjson
+
+
+def _field(index: int) -> dict:
+    '''One form field, shaped like the ones stored in form_versions.schema.'''
+    return {
+        "name": f"field_{index}",
+        "label": f"Field number {index} — étiquette",
+        "component_id": index % 40 + 1,
+        "version_number": index % 7 + 1,
+        "required": index % 3 == 0,
+        "props": {
+            "placeholder": "Type here...",
+            "width": 0.5 + (index % 4) / 8,
+            "options": [{"value": f"opt_{n}", "label": f"Option {n}"} for n in range(index % 6)],
+        },
+        "validation": {"min_length": 1, "max_length": 255, "pattern": "^[A-Za-z0-9 ]+$"},
+        "visible_when": {"field": f"field_{max(index - 1, 0)}", "equals": True},
+    }
+
+
+def build_row(target_kb: int) -> dict:
+    '''A form version row whose schema encodes to roughly target_kb kilobytes.'''
+    field_size = len(FastJSONResponse(None).render(_field(1)))
+    count = max(1, target_kb * 1024 // field_size)
+    now = datetime.now(timezone.utc)
+
+    return {
+        "id": 1,
+        "form_id": 1,
+        "version_number": 3,
+        "key": "onboarding",
+        "schema": {"title": "Onboarding", "sections": [{"fields": [_field(i) for i in range(count)]}]},
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def encode_default(content) -> bytes:
+    return JSONResponse(None).render(jsonable_encoder(content))
+
+
+def encode_fast(content) -> bytes:
+    return FastJSONResponse(None).render(content)
+
+
+def parse_schema(text):
+    return json.loads(text)
+
+
+def measure(function, content, seconds: float) -> dict:
+    '''Run function(content) repeatedly for about `seconds`.'''
+    iterations = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    while True:
+        function(content)
+        iterations += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+
+    elapsed = now - started
+    return {"per_second": iterations / elapsed, "ms": elapsed / iterations * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response encoding micro-benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Schema sizes in KB (default 10 100 1000)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent per case (default 1)")
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'size':>8} {'bytes':>10} {'parse ms':>9} {'default ms':>11} {'fast ms':>9} {'raw ms':>8} {'speedup':>8}")
+
+    for size in args.sizes:
+        row = {"status": "success", "form_version": build_row(size)}
+
+        # Both paths must produce the same document
+        assert orjson is None or orjson.loads(encode_default(row)) == orjson.loads(encode_fast(row))
+
+        # Same row with the schema as Postgres sends it for schema::text
+        schema_text = json.dumps(row["form_version"]["schema"])
+        raw_row = {"status": "success", "form_version": dict(row["form_version"], schema=RawJSON(schema_text))}
+        assert json.loads(encode_fast(raw_row)) == json.loads(encode_fast(row))
+
+        parse = measure(parse_schema, schema_text, args.seconds)
+        default = measure(encode_default, row, args.seconds)
+        fast = measure(encode_fast, row, args.seconds)
+        raw = measure(encode_fast, raw_row, args.seconds)
+
+        # Speedup of the raw path over the original one (driver parse + default encoding)
+        print(f"{size:>6}KB {len(encode_fast(row)):>10} {parse['ms']:>9.3f} {default['ms']:>11.3f} {fast['ms']:>9.3f} "
+              f"{raw['ms']:>8.3f} {(parse['ms'] + default['ms']) / raw['ms']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+'''
+Request-latency cost of logging, synchronous handlers against the queue.
+
+Simulates the logging a request does (the request middleware lines and a few
+data layer lines, one of them dumping a definition) from several threads at
+once, with the handlers of setup_logging() writing to a temporary directory:
+
+- sync: the text, JSON and console handlers attached to the root logger, so
+  formatting, writes and flushes happen on the request thread (LOG_ASYNC=false)
+- drop / block: the bounded queue and its listener thread (LOG_ASYNC=true),
+  with each queue full policy
+
+Each simulated request also waits --io-ms (untimed), standing for its
+database round trips: that idle time is when the listener catches up. With
+--io-ms 0 the offered load exceeds what one thread can write, and the drop
+policy sheds records while block makes the requests wait.
+
+Reports the time spent logging per request (mean, p50, p99) and the records
+written or dropped. The console handler writes to /dev/null unless --console
+is given (a real terminal or pipe is slower).
+
+    python benchmarks/logging_overhead.py
+    python benchmarks/logging_overhead.py --requests 20000 --threads 16 --io-ms 0
+'''
+
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as app_logging
+
+DEFINITION = {"default_props": {"label": "Email", "placeholder": "name@example.com", "width": 0.5},
+              "validation_config": {"required": True, "pattern": "^[^@]+@[^@]+$", "max_length": 255},
+              "service_bindings": {"lookup": {"url": "https://example.com/lookup", "timeout": 2}}}
+
+
+def simulated_request(log, index: int):
+    '''The lines a component version read logs (middleware, router, data layer).'''
+    log.info(f"Incoming request: GET http://testserver/component_definitions/components/{index}/versions/1")
+    log.info(f"Retrieving version 1 of component {index}")
+    log.info(f"Component version found: {DEFINITION}")
+    log.info(f"Response status: 200 for GET http://testserver/component_definitions/components/{index}/versions/1")
+
+
+def run(mode: str, requests: int, threads: int, io_seconds: float, console: bool) -> dict:
+    '''Log `requests` simulated requests from `threads` threads, timing each one.'''
+    with tempfile.TemporaryDirectory() as log_dir:
+        os.environ.update(LOG_DIR=log_dir, LOG_ASYNC="false" if mode == "sync" else "true",
+                          LOG_QUEUE_FULL_POLICY="block" if mode == "block" else "drop",
+                          LOG_IN_CONSOLE="true", LOG_IN_JSON="true", LOG_LEVEL="INFO")
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if console else devnull):
+            app_logging.setup_logging()
+            log = app_logging.get_logger("benchmark")
+            timings = [[] for _ in range(threads)]
+
+            def worker(number):
+                for index in range(number, requests, threads):
+                    started = time.perf_counter()
+                    simulated_request(log, index)
+                    timings[number].append(time.perf_counter() - started)
+                    time.sleep(io_seconds)
+
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            stats = app_logging.get_logging_stats()
+
+            # Write what is still queued before counting the lines
+            app_logging.stop_logging()
+            with open(os.path.join(log_dir, "app.log")) as log_file:
+                written = sum(1 for _ in log_file)
+
+    samples = sorted(sample for thread_timings in timings for sample in thread_timings)
+    return {
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+        "requests_per_second": requests / elapsed,
+        "written": written,
+        "dropped": stats.get("dropped", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging latency benchmark")
+    parser.add_argument("--requests", type=int, default=10000, help="Simulated requests (default 10000)")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent request threads (default 8)")
+    parser.add_argument("--io-ms", type=float, default=5.0,
+                        help="Untimed wait per request standing for its database work (default 5)")
+    parser.add_argument("--console", action="store_true", help="Write the console handler to stdout")
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args.requests, args.threads, args.io_ms / 1000, args.console)
+               for mode in ("sync", "drop", "block")}
+
+    print(f"{args.requests} requests x 4 records, {args.threads} threads, {args.io_ms} ms of I/O per request")
+    print(f"{'mode':>6} {'mean us':>8} {'p50 us':>8} {'p99 us':>8} {'req/s':>9} {'written':>8} {'dropped':>8}")
+    for mode, result in results.items():
+        print(f"{mode:>6} {result['mean_us']:>8.1f} {result['p50_us']:>8.1f} {result['p99_us']:>8.1f} "
+              f"{result['requests_per_second']:>9,.0f} {result['written']:>8} {result['dropped']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+'''
+Per-request overhead of the request logging middleware.
+
+The same FastAPI app is built three times:
+
+- none: no request middleware
+- base: the former log_requests, registered with @app.middleware("http")
+  (Starlette's BaseHTTPMiddleware)
+- asgi: AccessLogMiddleware from access_log.py (plain ASGI)
+- metrics: AccessLogMiddleware and MetricsMiddleware from metrics.py
+
+and called directly through ASGI (no server, no client) on three routes:
+
+- small: a tiny JSON document
+- all-versions: a large JSON list shaped like the all-versions response of a
+  component with many versions (--versions)
+- stream: an NDJSON StreamingResponse in many chunks, like the exports
+
+Log records are filtered out by level, so the numbers are the cost of the
+middleware machinery itself (tasks, streams, copies), not of writing logs.
+
+    python benchmarks/middleware_overhead.py
+    python benchmarks/middleware_overhead.py --versions 5000 --seconds 2
+'''
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from access_log import AccessLogMiddleware
+from metrics import MetricsMiddleware
+from json_response import FastJSONResponse, dumps
+
+logger = logging.getLogger("benchmark")
+
+
+def build_versions(count: int) -> list:
+    '''Component version rows, as the all-versions endpoint returns them.'''
+    now = datetime.now(timezone.utc)
+    return [{
+        "id": number,
+        "component_id": 1,
+        "version_number": number,
+        "default_props": {"label": f"Label {number}", "placeholder": "Type here...", "width": 0.5,
+                          "options": [{"value": f"opt_{n}", "label": f"Option {n}"} for n in range(8)]},
+        "validation_config": {"required": True, "min_length": 1, "max_length": 255, "pattern": "^[A-Za-z ]+$"},
+        "service_bindings": {"lookup": {"url": "https://example.com/lookup", "timeout": 2}},
+        "is_active": number == count,
+        "created_at": now,
+        "updated_at": now,
+    } for number in range(1, count + 1)]
+
+
+def build_app(variant: str, versions: list, stream_lines: int) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    if variant == "base":
+        @app.middleware("http")
+        async def log_requests(request, call_next):
+            logger.info(f"Incoming request: {request.method} {request.url}")
+            try:
+                response = await call_next(request)
+                logger.info(f"Response status: {response.status_code} for {request.method} {request.url}")
+                return response
+            except Exception as e:
+                logger.error(f"Error processing request: {str(e)}")
+                raise
+
+    elif variant in ("asgi", "metrics"):
+        app.add_middleware(AccessLogMiddleware)
+        if variant == "metrics":
+            app.add_middleware(MetricsMiddleware)
+
+    line = dumps(versions[0]) + b"\n"
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/all-versions")
+    async def all_versions():
+        return FastJSONResponse({"status": "success", "versions": versions})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for _ in range(stream_lines):
+                yield line
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+async def call(app, path: str) -> int:
+    '''One GET through the ASGI interface; returns the body size.'''
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"benchmark")], "client": ("127.0.0.1", 50000), "server": ("benchmark", 80),
+    }
+    done = asyncio.Event()
+    received = False
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server: the client only goes away once the response is sent
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    return size
+
+
+async def measure(app, path: str, seconds: float) -> dict:
+    '''Call path repeatedly for about `seconds`.'''
+    size = await call(app, path)
+    iterations = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    while True:
+        await call(app, path)
+        iterations += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+
+    return {"us": (now - started) / iterations * 1e6, "size": size}
+
+
+async def run(args):
+    versions = build_versions(args.versions)
+    variants = ("none", "base", "asgi", "metrics")
+    apps = {variant: build_app(variant, versions, args.stream_lines) for variant in variants}
+
+    print(f"{'route':>13} {'bytes':>10} {'none us':>9}" + "".join(f" {variant + ' +us':>12}" for variant in variants[1:]))
+    for path in ("/small", "/all-versions", "/stream"):
+        results = {variant: await measure(app, path, args.seconds) for variant, app in apps.items()}
+        none = results["none"]["us"]
+        print(f"{path:>13} {results['none']['size']:>10} {none:>9.1f}" +
+              "".join(f" {results[variant]['us'] - none:>12.1f}" for variant in variants[1:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request middleware overhead benchmark")
+    parser.add_argument("--versions", type=int, default=2000, help="Versions in the all-versions response (default 2000)")
+    parser.add_argument("--stream-lines", type=int, default=2000, help="Chunks of the streamed response (default 2000)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent per case (default 1)")
+    args = parser.parse_args()
+
+    # Keep log writing out of the measure
+    logging.basicConfig(level=logging.WARNING)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
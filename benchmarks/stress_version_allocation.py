@@ -0,0 +1,109 @@
+'''
+Concurrency stress test for version number allocation.
+
+Creates a fresh component and a fresh form, then creates --versions versions
+of each from --workers threads at once through the data layer, and checks that
+the allocated version numbers are exactly 1..N: no duplicates and no gaps.
+
+Runs against the database configured in the environment (same variables as
+the API; set DB_POOL_MAX to at least --workers):
+
+    DB_POOL_MAX=32 python benchmarks/stress_version_allocation.py --versions 2000 --workers 32
+
+Exits with status 1 if any check fails.
+'''
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_handler import pooled_connection
+from models.component_models import Component, ComponentVersion
+from models.form_models import Form, FormVersion
+from routers.data_layer.components import create_component
+from routers.data_layer.component_versions import create_component_version
+from routers.data_layer.forms import create_form
+from routers.data_layer.form_versions import create_form_version
+
+
+def _check(label: str, returned: list, stored: list, expected: int) -> bool:
+    '''Compare the returned and stored version numbers against 1..expected.'''
+    wanted = list(range(1, expected + 1))
+    ok = True
+
+    for source, numbers in (("returned", sorted(returned)), ("stored", sorted(stored))):
+        duplicates = len(numbers) - len(set(numbers))
+        gaps = sorted(set(wanted) - set(numbers))
+        if numbers != wanted:
+            ok = False
+            print(f"  FAIL {label} ({source}): {len(numbers)} numbers, {duplicates} duplicates, "
+                  f"{len(gaps)} gaps (first: {gaps[:10]})")
+
+    if ok:
+        print(f"  OK   {label}: versions 1..{expected}, no duplicates, no gaps")
+    return ok
+
+
+def _stored_numbers(query: str, parent_id: int) -> list:
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, (parent_id,))
+            return [row['version_number'] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--versions", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    suffix = uuid.uuid4().hex[:8]
+    ok = True
+
+    # Component versions
+    component = create_component(Component(key=f"StressComponent_{suffix}", name="Stress test", category="custom"))
+    component_id = component['id']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        created = list(executor.map(
+            lambda i: create_component_version(component_id, ComponentVersion(default_props={"i": i})),
+            range(args.versions)))
+    elapsed = time.perf_counter() - started
+    print(f"Created {len(created)} component versions in {elapsed:.2f}s ({len(created) / elapsed:.0f}/s)")
+
+    ok &= _check("component_versions",
+                 [row['version_number'] for row in created],
+                 _stored_numbers('SELECT version_number FROM form_definition.component_versions WHERE component_id = %s;', component_id),
+                 args.versions)
+
+    # Form versions
+    form = create_form(Form(key=f"stress_form_{suffix}", name="Stress test"))
+    form_id = form['id']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        created = list(executor.map(
+            lambda i: create_form_version(form_id, FormVersion(form_id=form_id, version_number=0, key=f"v{i}", schema={"i": i})),
+            range(args.versions)))
+    elapsed = time.perf_counter() - started
+    print(f"Created {len(created)} form versions in {elapsed:.2f}s ({len(created) / elapsed:.0f}/s)")
+
+    ok &= _check("form_versions",
+                 [row['version_number'] for row in created],
+                 _stored_numbers('SELECT version_number FROM form_definition.form_versions WHERE form_id = %s;', form_id),
+                 args.versions)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
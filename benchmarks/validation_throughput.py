@@ -0,0 +1,167 @@
+'''
+Throughput benchmark of submission validation, in submissions per second on one core.
+
+Compares, for forms of a few sizes:
+
+- interpreted: the rules of every field are read and dispatched on for each
+  submission (regular expressions go through re's own cache), which is what
+  validating against the stored validation_config directly costs
+- compiled: FormValidator.validate_many from validation_engine.py, with the
+  form compiled once (as the validator cache keeps it between requests)
+- +encode: compiled validation plus encoding the /validate response, the
+  whole CPU work of a batch request besides parsing its body
+
+Half of the generated submissions are valid, the other half break one rule
+each. Fields mix the rules components usually carry (required, type,
+lengths, bounds, patterns and enums). No database or server is needed:
+
+    python benchmarks/validation_throughput.py
+    python benchmarks/validation_throughput.py --fields 5 20 100 --batch 1000 --seconds 2
+'''
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_response import FastJSONResponse
+from validation_engine import DEFAULT_MESSAGES, TYPES, compile_form
+
+# Rules of the fields, cycled through (component validation_config shapes)
+RULES = [
+    {"required": True, "type": "string", "min_length": 1, "max_length": 60, "pattern": "^[A-Za-z ]+$"},
+    {"required": True, "type": "string", "pattern": "^[^@\\s]+@[^@\\s]+\\.[a-z]{2,}$"},
+    {"type": "integer", "minimum": 18, "maximum": 120},
+    {"type": "number", "minimum": 0},
+    {"required": True, "enum": ["basic", "pro", "enterprise"]},
+    {"type": "boolean"},
+    {"type": "array", "min_length": 1, "max_length": 5},
+]
+
+VALID_VALUES = ["Ada Lovelace", "ada@example.com", 36, 12.5, "pro", True, ["a", "b"]]
+INVALID_VALUES = ["Ada 1815", "ada(at)example", 12, -1, "free", "yes", []]
+
+
+def build_form(field_count: int) -> dict:
+    '''A form schema with field_count fields carrying their own rules.'''
+    return {"title": "Benchmark", "sections": [{"fields": [
+        {"name": f"field_{i}", "label": f"Field {i}", "validation": RULES[i % len(RULES)]}
+        for i in range(field_count)
+    ]}]}
+
+
+def build_submissions(field_count: int, count: int) -> list:
+    '''count submissions, every other one with one invalid value.'''
+    submissions = []
+    for n in range(count):
+        submission = {f"field_{i}": VALID_VALUES[i % len(RULES)] for i in range(field_count)}
+        if n % 2:
+            broken = n % field_count
+            submission[f"field_{broken}"] = INVALID_VALUES[broken % len(RULES)]
+        submissions.append(submission)
+    return submissions
+
+
+def interpreted_errors(fields: list, submission: dict) -> list:
+    '''Validate a submission by walking the rules of every field.'''
+    errors = []
+
+    for field in fields:
+        name, rules = field["name"], field["validation"]
+        value = submission.get(name)
+
+        if value is None or value == "":
+            if rules.get("required"):
+                errors.append({"field": name, "rule": "required", "message": DEFAULT_MESSAGES["required"]})
+            continue
+
+        for rule in ("type", "min_length", "max_length", "minimum", "maximum", "pattern", "enum"):
+            limit = rules.get(rule)
+            if limit is None:
+                continue
+
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if rule == "type":
+                ok = isinstance(value, TYPES[limit]) and (limit not in ("number", "integer") or not isinstance(value, bool))
+            elif rule == "min_length":
+                ok = not isinstance(value, (str, list)) or len(value) >= limit
+            elif rule == "max_length":
+                ok = not isinstance(value, (str, list)) or len(value) <= limit
+            elif rule == "minimum":
+                ok = not is_number or value >= limit
+            elif rule == "maximum":
+                ok = not is_number or value <= limit
+            elif rule == "pattern":
+                ok = not isinstance(value, str) or re.search(limit, value) is not None
+            else:
+                ok = value in limit
+
+            if not ok:
+                errors.append({"field": name, "rule": rule, "message": DEFAULT_MESSAGES[rule].format(**rules)})
+
+    return errors
+
+
+def measure(function, seconds: float) -> float:
+    '''Calls of function() per second, run for about `seconds`.'''
+    iterations = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    while True:
+        function()
+        iterations += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+
+    return iterations / (now - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submission validation throughput benchmark")
+    parser.add_argument("--fields", type=int, nargs="+", default=[5, 20, 100],
+                        help="Fields per form (default 5 20 100)")
+    parser.add_argument("--batch", type=int, default=1000, help="Submissions per batch (default 1000)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent per case (default 1)")
+    args = parser.parse_args()
+
+    print(f"submissions/sec on one core, batches of {args.batch}")
+    print(f"{'fields':>7} {'compile ms':>11} {'interpreted':>12} {'compiled':>10} {'+encode':>10} {'speedup':>8}")
+
+    for field_count in args.fields:
+        schema = build_form(field_count)
+        fields = schema["sections"][0]["fields"]
+        submissions = build_submissions(field_count, args.batch)
+
+        started = time.perf_counter()
+        validator = compile_form(schema, lambda field: None)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        # Both paths must report the same errors
+        for submission in submissions[:50]:
+            assert validator.validate(submission) == interpreted_errors(fields, submission)
+
+        def interpreted():
+            for submission in submissions:
+                interpreted_errors(fields, submission)
+
+        def compiled():
+            validator.validate_many(submissions)
+
+        def encoded():
+            FastJSONResponse(None).render({"status": "success", **validator.validate_many(submissions)})
+
+        interpreted_rate = measure(interpreted, args.seconds) * args.batch
+        compiled_rate = measure(compiled, args.seconds) * args.batch
+        encoded_rate = measure(encoded, args.seconds) * args.batch
+
+        print(f"{field_count:>7} {compile_ms:>11.3f} {interpreted_rate:>12,.0f} {compiled_rate:>10,.0f} "
+              f"{encoded_rate:>10,.0f} {compiled_rate / interpreted_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import os
+import re
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+'''
+Request body size guard (ASGI middleware).
+
+Bodies of the matching requests are counted while they are received: a
+request whose Content-Length is over the limit is answered with a 413 before
+its body is read, and one sent without it (chunked) is cut off as soon as the
+bytes received pass the limit. Oversized bodies are never buffered whole nor
+parsed.
+
+Form version writes and form imports are guarded in main.py (large schemas
+are validated against their meta-schema, see schema_validation.py; imports
+also cap what their archives decompress to, see form_import.py).
+
+Configuration:
+- FORM_VERSION_MAX_BODY_BYTES: Largest form version create / update body
+  (default 5242880, 5 MB)
+- FORM_IMPORT_MAX_BODY_BYTES: Largest form import upload, as sent (default
+  52428800, 50 MB)
+'''
+
+load_dotenv()
+
+FORM_VERSION_MAX_BODY_BYTES = int(os.getenv("FORM_VERSION_MAX_BODY_BYTES", str(5 * 1024 * 1024)))
+FORM_IMPORT_MAX_BODY_BYTES = int(os.getenv("FORM_IMPORT_MAX_BODY_BYTES", str(50 * 1024 * 1024)))
+
+# Paths of the form version create and update endpoints
+FORM_VERSION_WRITE_PATH = re.compile(r"^/form_definitions/forms/\d+/versions(/\d+)?/?$")
+
+# Path of the bulk form import
+FORM_IMPORT_PATH = re.compile(r"^/form_definitions/import/?$")
+
+
+class RequestBodyTooLarge(HTTPException):
+    '''Raised from receive() when a body passes the limit while it is being read.'''
+
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Request body larger than {max_bytes} bytes.")
+
+
+class BodySizeLimitMiddleware:
+    '''Reject request bodies over max_bytes on the paths matching path_pattern.'''
+
+    def __init__(self, app, max_bytes: int, path_pattern: Optional[re.Pattern] = None,
+                 methods=("POST", "PUT", "PATCH")):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_pattern = path_pattern
+        self.methods = methods
+
+    def _guarded(self, scope) -> bool:
+        return (scope["type"] == "http" and scope["method"] in self.methods and
+                (self.path_pattern is None or self.path_pattern.match(scope["path"]) is not None))
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"Request body larger than {self.max_bytes} bytes."}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if not self._guarded(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # Declared size: answer before reading anything
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise RequestBodyTooLarge(self.max_bytes)
+
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+
+        except RequestBodyTooLarge:
+            # Raised outside of a route (routes turn it into the same 413)
+            if response_started:
+                raise
+            await self._reject(send)
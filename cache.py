@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+'''
+In-process LRU cache with a time to live, used in front of the version reads.
+
+A (component_id, version_number) or (form_id, version_number) row almost never
+changes once written, so renders can be served from memory. Entries are
+grouped by their parent (component or form) id: every write to a parent
+invalidates all its entries, including the cached "latest" version.
+
+A read that races with a write could store a row that the write just
+replaced. To prevent it, readers take the parent's generation before going
+to the database and store the row only if no invalidation happened meanwhile.
+
+An entry can also depend on other parents (a resolved component depends on
+all its ancestors): it is then evicted when any of them is invalidated.
+Caches holding values derived from another cache are linked to it, and are
+invalidated and cleared along with it.
+
+Configuration:
+- CACHE_ENABLED: Turn the version cache on or off (default true)
+- CACHE_MAX_ENTRIES: Entries kept per cache before evicting the least
+  recently used one (default 10000)
+- CACHE_TTL_SECONDS: Seconds an entry is served before it is read again
+  from the database (default 300)
+- ARTIFACT_CACHE_MAX_ENTRIES: Published form artifacts kept in memory
+  (default 1000, each holds the artifact in every encoding)
+'''
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+ARTIFACT_CACHE_MAX_ENTRIES = int(os.getenv("ARTIFACT_CACHE_MAX_ENTRIES", "1000"))
+
+# Key used for the latest version of a parent
+LATEST = "latest"
+
+
+def variant(version, raw: bool = False):
+    '''Cache key of a version read with its JSON columns parsed, or as raw text.'''
+    return ("raw", version) if raw else version
+
+
+class VersionCache:
+    '''
+    Thread-safe LRU + TTL cache whose keys are (parent_id, version) tuples.
+
+    Cached rows are shared between requests and must be treated as read-only.
+    '''
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl: float = CACHE_TTL_SECONDS, enabled: bool = CACHE_ENABLED):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled and max_entries > 0
+
+        # key -> (expires_at, value), least recently used first
+        self._entries = OrderedDict()
+        # parent_id -> keys cached for that parent
+        self._keys_by_parent = {}
+        # key -> other parents the entry depends on
+        self._dependencies = {}
+        # parent_id -> sequence number of its last invalidation, and number of clears
+        self._generations = {}
+        self._sequence = 0
+        self._epoch = 0
+        # Caches derived from this one
+        self._linked = []
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "stale_writes_skipped": 0,
+        }
+
+    def link(self, cache: "VersionCache", parent_key=None):
+        """
+        Invalidate and clear another cache along with this one.
+
+        parent_key maps the parent ids of this cache to the ones of the linked
+        cache, for caches whose entries depend on parents of several kinds.
+        """
+        self._linked.append((cache, parent_key))
+
+    def _remove(self, key):
+        """Drop an entry (lock must be held)"""
+        self._entries.pop(key, None)
+        for parent_id in (key[0], *self._dependencies.pop(key, ())):
+            keys = self._keys_by_parent.get(parent_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_parent[parent_id]
+
+    def get(self, parent_id, version=LATEST):
+        """Cached row for the key, or None when missing or expired"""
+        if not self.enabled:
+            return None
+
+        key = (parent_id, version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def generation(self, parent_id=None):
+        """
+        Point in the invalidation sequence, taken before reading from the database.
+
+        The same token covers the parent and any parent the value turns out to
+        depend on, so it can be taken before they are known.
+        """
+        with self._lock:
+            return (self._epoch, self._sequence)
+
+    def set(self, parent_id, version, value, generation, depends_on=()):
+        """Store a value read at the given generation, evicted when the parent or any of depends_on changes"""
+        if not self.enabled or value is None:
+            return
+
+        key = (parent_id, version)
+        parents = (parent_id, *depends_on)
+
+        with self._lock:
+            # A parent was written after the value was read: it may be stale
+            epoch, sequence = generation
+            if epoch != self._epoch or any(self._generations.get(parent, 0) > sequence for parent in parents):
+                self._stats["stale_writes_skipped"] += 1
+                return
+
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            for parent in parents:
+                self._keys_by_parent.setdefault(parent, set()).add(key)
+            if depends_on:
+                self._dependencies[key] = tuple(depends_on)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, parent_id):
+        """Forget every entry of a parent (called after each write to it)"""
+        with self._lock:
+            self._sequence += 1
+            self._generations[parent_id] = self._sequence
+            for key in list(self._keys_by_parent.get(parent_id, ())):
+                self._remove(key)
+            self._stats["invalidations"] += 1
+
+        for cache, parent_key in self._linked:
+            cache.invalidate(parent_key(parent_id) if parent_key else parent_id)
+
+    def clear(self):
+        """Forget every entry (used after bulk writes touching many parents)"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._keys_by_parent.clear()
+            self._dependencies.clear()
+            self._stats["invalidations"] += 1
+
+        for cache, _ in self._linked:
+            cache.clear()
+
+    def stats(self) -> dict:
+        """Snapshot of the cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None,
+            })
+        return stats
+
+
+component_version_cache = VersionCache("component_versions")
+form_version_cache = VersionCache("form_versions")
+
+# Components resolved over their base_component_id chain (keyed by component id,
+# depending on every ancestor): any change to the versions of one of them evicts it
+resolved_component_cache = VersionCache("resolved_components")
+component_version_cache.link(resolved_component_cache)
+
+# Published artifacts of the form versions (keyed by form id): evicted by any write to the form
+form_artifact_cache = VersionCache("form_artifacts", max_entries=ARTIFACT_CACHE_MAX_ENTRIES)
+form_version_cache.link(form_artifact_cache)
+
+# Compiled validators of the form versions. They depend on the form and on every
+# component it references, so their parents are ("form", id) and ("component", id)
+form_validator_cache = VersionCache("form_validators")
+form_version_cache.link(form_validator_cache, lambda form_id: ("form", form_id))
+component_version_cache.link(form_validator_cache, lambda component_id: ("component", component_id))
+
+# Caches by name, as referenced by the invalidation bus (cache_bus.py)
+CACHES = {cache.name: cache for cache in (component_version_cache, form_version_cache,
+                                          resolved_component_cache, form_artifact_cache, form_validator_cache)}
+
+
+def get_cache_stats() -> dict:
+    """Get the counters of every cache"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
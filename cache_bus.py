@@ -0,0 +1,210 @@
+import json
+import os
+import select
+import socket
+import threading
+import uuid
+from dotenv import load_dotenv
+from cache import CACHES
+from db_handler import open_dedicated_connection
+from logger import get_logger
+
+'''
+Invalidation bus keeping the version caches of every worker in sync.
+
+Each worker has its own in-process caches (see cache.py), so a write handled
+by one worker would leave stale entries on the others. Write statements
+send a NOTIFY (see invalidation_cte) with the cache name and the parent id
+they changed. Postgres only delivers it if the transaction commits. Every worker
+runs a listener thread on its own connection that evicts the matching
+entries when a notification arrives.
+
+The worker that made the write has already invalidated its own cache and
+skips its own notifications. If the listener loses its connection, the
+notifications sent in the meantime are lost, so all caches are cleared
+when it reconnects.
+
+Configuration:
+- CACHE_BUS_ENABLED: Run the listener (default true)
+- CACHE_BUS_CHANNEL: Postgres channel used for the notifications
+  (default version_cache_invalidation)
+'''
+
+load_dotenv()
+
+CACHE_BUS_ENABLED = os.getenv("CACHE_BUS_ENABLED", "true").lower() == "true"
+CACHE_BUS_CHANNEL = os.getenv("CACHE_BUS_CHANNEL", "version_cache_invalidation")
+
+# Identifies the notifications sent by this process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+logger = get_logger(__name__)
+
+
+def _notice_payload(cache, parent_id) -> str:
+    return json.dumps({"origin": WORKER_ID, "cache": cache.name, "id": parent_id})
+
+
+def invalidation_cte(cache, parent_id=None):
+    '''
+    CTE announcing that a parent changed (None: everything), and its parameters.
+
+    The notice goes in the write statement itself, with no extra round trip.
+    Postgres skips a SELECT CTE that nothing reads, so it yields exactly one
+    row for the write to join without changing it. Put it first in the WITH
+    list, since its parameters come first, and read it:
+    "... FROM next_version, notified", "UPDATE ... FROM notified" or
+    "DELETE ... USING notified". It is only delivered if the transaction commits.
+    '''
+    return "notified AS (SELECT pg_notify(%s, %s) AS sent)", (CACHE_BUS_CHANNEL, _notice_payload(cache, parent_id))
+
+
+def invalidation_cte_many(cache, parent_ids):
+    '''invalidation_cte for several parents: one notice per parent, still a single row.'''
+    return ("notified AS (SELECT count(pg_notify(%s, payload)) AS sent FROM unnest(%s::text[]) AS payload)",
+            (CACHE_BUS_CHANNEL, [_notice_payload(cache, parent_id) for parent_id in parent_ids]))
+
+
+def _parent_key(value):
+    '''Parent id as cached: JSON turns tuples into lists, turn them back.'''
+    if isinstance(value, list):
+        return tuple(_parent_key(item) for item in value)
+    return value
+
+
+class CacheInvalidationListener:
+    '''Background thread applying the invalidations sent by the other workers.'''
+
+    # Seconds between checks of the stop flag, and bounds of the reconnection backoff
+    POLL_INTERVAL = 1.0
+    MIN_BACKOFF = 1.0
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, channel: str = CACHE_BUS_CHANNEL):
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "connected": False,
+            "connects": 0,
+            "connection_errors": 0,
+            "received": 0,
+            "applied": 0,
+            "ignored_own": 0,
+            "invalid": 0,
+        }
+
+    def start(self):
+        """Start listening in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the thread and close its connection"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _run(self):
+        backoff = self.MIN_BACKOFF
+
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = open_dedicated_connection()
+                conn.set_session(autocommit=True)
+
+                cursor = conn.cursor()
+                cursor.execute(f'LISTEN "{self.channel}";')
+                cursor.close()
+
+                # Anything sent while we were not listening is lost
+                with self._lock:
+                    reconnect = self._stats["connects"] > 0
+                    self._stats["connects"] += 1
+                    self._stats["connected"] = True
+                if reconnect:
+                    for cache in CACHES.values():
+                        cache.clear()
+
+                logger.info(f"Listening for cache invalidations on channel '{self.channel}'")
+                backoff = self.MIN_BACKOFF
+
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([conn], [], [], self.POLL_INTERVAL)
+                    if not ready:
+                        continue
+
+                    conn.poll()
+                    while conn.notifies:
+                        self._apply(conn.notifies.pop(0).payload)
+
+            except Exception as e:
+                self._count("connection_errors")
+                logger.warning(f"Cache invalidation listener error, retrying in {backoff} seconds: {str(e)}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+            finally:
+                with self._lock:
+                    self._stats["connected"] = False
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+    def _apply(self, payload: str):
+        """Evict the entries named by a notification"""
+        self._count("received")
+
+        try:
+            message = json.loads(payload)
+            cache = CACHES[message["cache"]]
+        except (ValueError, KeyError, TypeError):
+            self._count("invalid")
+            logger.warning(f"Ignoring malformed cache invalidation: {payload}")
+            return
+
+        # The sender already invalidated its own cache
+        if message.get("origin") == WORKER_ID:
+            self._count("ignored_own")
+            return
+
+        if message.get("id") is None:
+            cache.clear()
+        else:
+            cache.invalidate(_parent_key(message["id"]))
+
+        self._count("applied")
+
+    def stats(self) -> dict:
+        """Snapshot of the listener counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({"channel": self.channel, "worker_id": WORKER_ID})
+        return stats
+
+
+_listener = CacheInvalidationListener()
+
+def start_cache_listener():
+    """Start the invalidation listener (called on startup)"""
+    if CACHE_BUS_ENABLED:
+        _listener.start()
+
+def stop_cache_listener():
+    """Stop the invalidation listener (called on shutdown)"""
+    _listener.stop()
+
+def get_cache_bus_stats() -> dict:
+    """Get the invalidation listener counters"""
+    return _listener.stats()
@@ -0,0 +1,229 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from logger import get_logger
+
+'''
+Process pool for CPU-bound work (schema checks, submission validation,
+deep merging of component chains, compression of published artifacts).
+
+Pure Python work run on the request threads holds the GIL: a large batch
+being validated slows down every other request of the worker. With the pool
+enabled that work runs in separate processes, so the event loop and the
+threadpool only wait for it.
+
+Tasks are module level functions whose arguments and results are pickled
+(compiled validators travel as their rules, see validation_engine.py). The
+number of tasks submitted and not finished is bounded: past it, requests are
+rejected with a 503 instead of queueing without limit. A request waits for
+its task up to the timeout (504 after it); a task already running in a
+worker is not interrupted, and keeps counting against the bound until it
+ends.
+
+With no workers configured the same calls run on the caller's thread (the
+threadpool for async callers), as before the pool existed.
+
+Configuration:
+- CPU_POOL_WORKERS: Worker processes (default 0: no pool)
+- CPU_POOL_MAX_PENDING: Tasks queued or running at once, past which new ones
+  are rejected (default 4 per worker)
+- CPU_POOL_TIMEOUT: Seconds a request waits for its task (default 30)
+'''
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+
+class CpuPoolBusyError(HTTPException):
+    '''Raised when the pool already has its maximum number of pending tasks.'''
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+
+class CpuPoolTimeoutError(HTTPException):
+    '''Raised when a task does not finish within the pool timeout.'''
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=504, detail=detail)
+
+
+def _timed_call(function, args):
+    '''Run a task in a worker, reporting when it started and how long it ran.'''
+    started_at = time.time()
+    started = time.perf_counter()
+    result = function(*args)
+    return result, started_at, time.perf_counter() - started
+
+
+class CpuPool:
+    '''Bounded process pool shared by the requests of a worker.'''
+
+    def __init__(self):
+        self.workers = int(os.getenv("CPU_POOL_WORKERS", "0"))
+        self.max_pending = int(os.getenv("CPU_POOL_MAX_PENDING", str(4 * max(self.workers, 1))))
+        self.timeout = float(os.getenv("CPU_POOL_TIMEOUT", "30"))
+
+        if self.workers < 0 or self.max_pending < 1:
+            raise ValueError(
+                f"Invalid CPU pool configuration: CPU_POOL_WORKERS={self.workers}, "
+                f"CPU_POOL_MAX_PENDING={self.max_pending}"
+            )
+
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        # Counters exposed through stats()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "inline": 0,
+            "max_pending_seen": 0,
+            "queue_time_total": 0.0,
+            "run_time_total": 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self):
+        '''Start the worker processes (spawned: the parent has threads and open connections).'''
+        with self._lock:
+            if self.enabled and self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                # Spawn the processes now rather than on the first task
+                self._executor.submit(int)
+                logger.info(f"CPU pool started with {self.workers} worker processes")
+            return self._executor
+
+    def stop(self):
+        '''Stop the worker processes, dropping the tasks not started yet.'''
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, future, executor, submitted_at: float):
+        '''Release the slot of a task and record how it went (called from the executor).'''
+        with self._lock:
+            self._pending -= 1
+
+            if future.cancelled():
+                return
+
+            error = future.exception()
+            if error is None:
+                _, started_at, run_time = future.result()
+                self._stats["completed"] += 1
+                self._stats["queue_time_total"] += max(started_at - submitted_at, 0.0)
+                self._stats["run_time_total"] += run_time
+                return
+
+            self._stats["failed"] += 1
+
+            # A worker died: start a new executor on the next task
+            if isinstance(error, BrokenProcessPool) and self._executor is executor:
+                logger.error("A CPU pool worker process died, restarting the pool")
+                self._executor = None
+
+    def submit(self, function, *args):
+        '''Queue a task, or raise CpuPoolBusyError when the pool is full.'''
+        executor = self._executor or self.start()
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise CpuPoolBusyError(f"Too many CPU-bound tasks pending ({self.max_pending}), try again later.")
+
+            self._pending += 1
+            self._stats["submitted"] += 1
+            self._stats["max_pending_seen"] = max(self._stats["max_pending_seen"], self._pending)
+
+        submitted_at = time.time()
+        try:
+            future = executor.submit(_timed_call, function, args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        future.add_done_callback(lambda done: self._finished(done, executor, submitted_at))
+        return future
+
+    def _timed_out(self, function):
+        with self._lock:
+            self._stats["timeouts"] += 1
+        logger.warning(f"CPU-bound task {function.__qualname__} did not finish within {self.timeout} seconds")
+        return CpuPoolTimeoutError(f"The operation did not finish within {self.timeout} seconds.")
+
+    def call(self, function, *args):
+        '''Run function(*args) in the pool and wait for its result (for threaded callers).'''
+        if not self.enabled:
+            with self._lock:
+                self._stats["inline"] += 1
+            return function(*args)
+
+        future = self.submit(function, *args)
+        try:
+            return future.result(timeout=self.timeout)[0]
+        except FutureTimeoutError:
+            future.cancel()
+            raise self._timed_out(function)
+
+    async def run(self, function, *args):
+        '''Run function(*args) in the pool without blocking the event loop.'''
+        if not self.enabled:
+            with self._lock:
+                self._stats["inline"] += 1
+            return await run_in_threadpool(function, *args)
+
+        future = self.submit(function, *args)
+        try:
+            # Cancelling the awaited future cancels the task if it has not started
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            return result[0]
+        except asyncio.TimeoutError:
+            raise self._timed_out(function)
+
+    def stats(self) -> dict:
+        '''Snapshot of the pool counters.'''
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout": self.timeout,
+                "pending": self._pending,
+                "running": self._executor is not None,
+            })
+        return stats
+
+
+cpu_pool = CpuPool()
+
+def start_cpu_pool():
+    '''Start the worker processes ahead of the first task (no-op without workers).'''
+    cpu_pool.start()
+
+def stop_cpu_pool():
+    '''Stop the worker processes.'''
+    cpu_pool.stop()
+
+def get_cpu_pool_stats() -> dict:
+    '''Get the CPU pool counters.'''
+    return cpu_pool.stats()
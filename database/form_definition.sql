@@ -7,6 +7,7 @@ CREATE TABLE form_definition.forms (
     key              TEXT    UNIQUE NOT NULL,    -- human-readable identifier
     name             TEXT    NOT NULL,
     description      TEXT,
+    last_version_number INTEGER NOT NULL DEFAULT 0,  -- last version number handed out
     created_at       TIMESTAMPTZ DEFAULT now(),
     updated_at       TIMESTAMPTZ DEFAULT now()
 );
@@ -19,11 +20,38 @@ COMMENT ON COLUMN form_definition.forms.id IS 'Auto-incrementing primary key ide
 COMMENT ON COLUMN form_definition.forms.key IS 'Human-readable identifier for the form (e.g. "contact_form")';
 COMMENT ON COLUMN form_definition.forms.name IS 'Display name of the form';
 COMMENT ON COLUMN form_definition.forms.description IS 'Detailed description of the form';
+COMMENT ON COLUMN form_definition.forms.last_version_number IS 'Last version number allocated to this form (incremented atomically when a version is created)';
 COMMENT ON COLUMN form_definition.forms.created_at IS 'Timestamp when the form was created';
 COMMENT ON COLUMN form_definition.forms.updated_at IS 'Timestamp when the form was last updated';
 
 
 
+-- form_artifacts: published form versions, precompiled and addressed by content hash
+CREATE TABLE form_definition.form_artifacts (
+    content_hash     TEXT PRIMARY KEY,           -- sha256 of body
+    body             BYTEA  NOT NULL,            -- serialized render bundle (JSON)
+    body_gzip        BYTEA  NOT NULL,            -- body compressed with gzip
+    body_brotli      BYTEA,                      -- body compressed with brotli (NULL if unavailable)
+    created_at       TIMESTAMPTZ DEFAULT now()
+);
+
+-- Already compressed: store out of line without trying to compress again
+ALTER TABLE form_definition.form_artifacts
+    ALTER COLUMN body_gzip SET STORAGE EXTERNAL,
+    ALTER COLUMN body_brotli SET STORAGE EXTERNAL;
+
+-- Table comment
+COMMENT ON TABLE form_definition.form_artifacts IS 'Published form versions (form version plus every component it references), serialized and compressed once, addressed by content hash.';
+
+-- Column comments
+COMMENT ON COLUMN form_definition.form_artifacts.content_hash IS 'SHA-256 of the uncompressed body (hex)';
+COMMENT ON COLUMN form_definition.form_artifacts.body IS 'Render bundle serialized as JSON';
+COMMENT ON COLUMN form_definition.form_artifacts.body_gzip IS 'Body compressed with gzip';
+COMMENT ON COLUMN form_definition.form_artifacts.body_brotli IS 'Body compressed with brotli, NULL when brotli was not available at publish time';
+COMMENT ON COLUMN form_definition.form_artifacts.created_at IS 'Timestamp when the artifact was first published';
+
+
+
 -- form_versions: specific versions of a form
 CREATE TABLE form_definition.form_versions (
     id               SERIAL PRIMARY KEY,
@@ -32,6 +60,7 @@ CREATE TABLE form_definition.form_versions (
     key              TEXT    NOT NULL,           -- version key (e.g. "v1", "2025-10")
     schema           JSONB  NOT NULL,            -- JSON definition for this version
     is_active        BOOLEAN DEFAULT FALSE,
+    artifact_hash    TEXT REFERENCES form_definition.form_artifacts(content_hash),  -- published artifact
     created_at       TIMESTAMPTZ DEFAULT now(),
     updated_at       TIMESTAMPTZ DEFAULT now(),
     UNIQUE(form_id, version_number),
@@ -48,6 +77,7 @@ COMMENT ON COLUMN form_definition.form_versions.version_number IS 'Sequential ve
 COMMENT ON COLUMN form_definition.form_versions.key IS 'Human-readable version key (e.g. "v1", "2025-10")';
 COMMENT ON COLUMN form_definition.form_versions.schema IS 'JSON schema definition for this form version';
 COMMENT ON COLUMN form_definition.form_versions.is_active IS 'Indicates if this version is the currently active version for the form';
+COMMENT ON COLUMN form_definition.form_versions.artifact_hash IS 'Content hash of the published artifact of this version (NULL until published, reset when the version changes)';
 COMMENT ON COLUMN form_definition.form_versions.created_at IS 'Timestamp when the form version was created';
 COMMENT ON COLUMN form_definition.form_versions.updated_at IS 'Timestamp when the form version was last updated';
 
@@ -110,6 +140,7 @@ CREATE TABLE form_definition.components (
         ON DELETE RESTRICT                 -- Prevent deleting a base component if others depend on it
         ON UPDATE CASCADE,                 -- If ID changes (rare), update children
     category TEXT NOT NULL,                -- "input", "choice", "layout", "custom"
+    last_version_number INTEGER NOT NULL DEFAULT 0,  -- last version number handed out
     created_at TIMESTAMPTZ DEFAULT now(),
     updated_at TIMESTAMPTZ DEFAULT now()
 );
@@ -124,6 +155,7 @@ COMMENT ON COLUMN form_definition.components.name IS 'Display name of the compon
 COMMENT ON COLUMN form_definition.components.description IS 'Component description';
 COMMENT ON COLUMN form_definition.components.base_component_id IS 'Specifies the id of the base component this component inherits from, if any';
 COMMENT ON COLUMN form_definition.components.category IS 'Category of the component (e.g. "input", "choice", "layout", "custom")';
+COMMENT ON COLUMN form_definition.components.last_version_number IS 'Last version number allocated to this component (incremented atomically when a version is created)';
 COMMENT ON COLUMN form_definition.components.created_at IS 'Timestamp when the component was created';
 COMMENT ON COLUMN form_definition.components.updated_at IS 'Timestamp when the component was last updated';
 
@@ -133,13 +165,14 @@ CREATE TABLE form_definition.component_versions (
     id SERIAL PRIMARY KEY,
     component_id INTEGER NOT NULL REFERENCES form_definition.components(id),
     version_number INTEGER NOT NULL,
-    definition JSONB NOT NULL,         -- Full merged definition
+    definition JSONB,                  -- Full merged definition (NULL: assembled from the columns below)
     default_props JSONB,               -- Optional defaults at this version
     validation_config JSONB,           -- Validation rules for this version
     service_bindings JSONB,            -- Behavior endpoints for this version
     is_active BOOLEAN DEFAULT true,
     created_at TIMESTAMPTZ DEFAULT now(),
-    updated_at TIMESTAMPTZ DEFAULT now()
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    UNIQUE(component_id, version_number)
 );
 
 -- Table comments
@@ -149,7 +182,7 @@ COMMENT ON TABLE form_definition.component_versions IS 'Base definitions for reu
 COMMENT ON COLUMN form_definition.component_versions.id IS 'Auto-incrementing primary key identifier';
 COMMENT ON COLUMN form_definition.component_versions.component_id IS 'Foreign key referencing the parent component';
 COMMENT ON COLUMN form_definition.component_versions.version_number IS 'Sequential version number for the component';
-COMMENT ON COLUMN form_definition.component_versions.definition IS 'Full component definition stored as JSON (consolidates all properties)';
+COMMENT ON COLUMN form_definition.component_versions.definition IS 'Full component definition stored as JSON (consolidates all properties). NULL in compact storage: assembled at read time from default_props, validation_config and service_bindings';
 COMMENT ON COLUMN form_definition.component_versions.default_props IS 'Default properties for the component stored as JSON';
 COMMENT ON COLUMN form_definition.component_versions.validation_config IS 'Built-in validation rules for the component stored as JSON';
 COMMENT ON COLUMN form_definition.component_versions.service_bindings IS 'Default service endpoints for the component stored as JSON';
@@ -186,5 +219,6 @@ COMMENT ON COLUMN form_definition.form_services.updated_at IS 'Timestamp when th
 
 -- useful indexes (optional)
 CREATE INDEX idx_form_versions_form_id ON form_definition.form_versions(form_id);
+CREATE INDEX idx_form_versions_artifact_hash ON form_definition.form_versions(artifact_hash);
 CREATE INDEX idx_workflow_steps_workflow_id ON form_definition.workflow_steps(workflow_id);
 CREATE INDEX idx_component_versions_component_id ON form_definition.component_versions(component_id);
@@ -0,0 +1,44 @@
+-- Per-parent version counters
+--
+-- Version numbers are allocated by incrementing a counter on the parent row
+-- (forms / components) in the same statement that inserts the version, which
+-- serializes concurrent creates on the parent's row lock instead of racing on
+-- SELECT MAX(version_number) + 1.
+
+-- Counter columns
+ALTER TABLE form_definition.forms
+    ADD COLUMN IF NOT EXISTS last_version_number INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE form_definition.components
+    ADD COLUMN IF NOT EXISTS last_version_number INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN form_definition.forms.last_version_number IS 'Last version number allocated to this form (incremented atomically when a version is created)';
+COMMENT ON COLUMN form_definition.components.last_version_number IS 'Last version number allocated to this component (incremented atomically when a version is created)';
+
+-- Backfill the counters from the existing versions
+UPDATE form_definition.forms f
+SET last_version_number = v.max_version
+FROM (
+    SELECT form_id, MAX(version_number) AS max_version
+    FROM form_definition.form_versions
+    GROUP BY form_id
+) v
+WHERE v.form_id = f.id;
+
+UPDATE form_definition.components c
+SET last_version_number = v.max_version
+FROM (
+    SELECT component_id, MAX(version_number) AS max_version
+    FROM form_definition.component_versions
+    GROUP BY component_id
+) v
+WHERE v.component_id = c.id;
+
+-- component_versions never had this constraint. If this fails, list the
+-- duplicated numbers with:
+--   SELECT component_id, version_number, COUNT(*)
+--   FROM form_definition.component_versions
+--   GROUP BY component_id, version_number HAVING COUNT(*) > 1;
+ALTER TABLE form_definition.component_versions
+    ADD CONSTRAINT component_versions_component_id_version_number_key
+    UNIQUE (component_id, version_number);
@@ -0,0 +1,31 @@
+-- Compact storage of component definitions
+--
+-- component_versions.definition only repeats default_props, validation_config
+-- and service_bindings, so every value was stored (and TOASTed, and written to
+-- the WAL) twice. In compact storage the column is left NULL and the data layer
+-- assembles the same document at read time with jsonb_build_object (see
+-- DEFINITION_EXPRESSION in routers/data_layer/component_versions.py).
+--
+-- Reads handle both kinds of rows, so this can run while the API is up.
+-- Once it has run, set COMPONENT_DEFINITION_STORAGE=compact so new versions
+-- are written compact as well.
+
+ALTER TABLE form_definition.component_versions
+    ALTER COLUMN definition DROP NOT NULL;
+
+COMMENT ON COLUMN form_definition.component_versions.definition IS 'Full component definition stored as JSON (consolidates all properties). NULL in compact storage: assembled at read time from default_props, validation_config and service_bindings';
+
+-- Only clear the definitions that are exactly what would be assembled, so
+-- rows whose definition was edited by hand keep it
+UPDATE form_definition.component_versions
+SET definition = NULL
+WHERE definition IS NOT NULL
+  AND definition = jsonb_build_object(
+        'default_props', COALESCE(NULLIF(default_props, 'null'::jsonb), '{}'::jsonb),
+        'validation_config', COALESCE(NULLIF(validation_config, 'null'::jsonb), '{}'::jsonb),
+        'service_bindings', COALESCE(NULLIF(service_bindings, 'null'::jsonb), '{}'::jsonb));
+
+-- The UPDATE leaves the old row versions behind: the space is reused by later
+-- writes after a plain VACUUM, but is only returned to the OS by a rewrite
+-- (takes an ACCESS EXCLUSIVE lock on the table while it runs):
+--   VACUUM (FULL, ANALYZE) form_definition.component_versions;
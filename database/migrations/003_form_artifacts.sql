@@ -0,0 +1,37 @@
+-- Published form artifacts
+--
+-- Publishing a form version serializes it once, together with every
+-- component version its schema references, and stores the JSON with its
+-- gzip and brotli compressions, addressed by the SHA-256 of the JSON.
+-- form_versions.artifact_hash points to the artifact of the version, and the
+-- artifact endpoint serves those bytes as they are.
+
+CREATE TABLE IF NOT EXISTS form_definition.form_artifacts (
+    content_hash     TEXT PRIMARY KEY,           -- sha256 of body
+    body             BYTEA  NOT NULL,            -- serialized render bundle (JSON)
+    body_gzip        BYTEA  NOT NULL,            -- body compressed with gzip
+    body_brotli      BYTEA,                      -- body compressed with brotli (NULL if unavailable)
+    created_at       TIMESTAMPTZ DEFAULT now()
+);
+
+-- Already compressed: store out of line without trying to compress again
+ALTER TABLE form_definition.form_artifacts
+    ALTER COLUMN body_gzip SET STORAGE EXTERNAL,
+    ALTER COLUMN body_brotli SET STORAGE EXTERNAL;
+
+COMMENT ON TABLE form_definition.form_artifacts IS 'Published form versions (form version plus every component it references), serialized and compressed once, addressed by content hash.';
+COMMENT ON COLUMN form_definition.form_artifacts.content_hash IS 'SHA-256 of the uncompressed body (hex)';
+COMMENT ON COLUMN form_definition.form_artifacts.body IS 'Render bundle serialized as JSON';
+COMMENT ON COLUMN form_definition.form_artifacts.body_gzip IS 'Body compressed with gzip';
+COMMENT ON COLUMN form_definition.form_artifacts.body_brotli IS 'Body compressed with brotli, NULL when brotli was not available at publish time';
+COMMENT ON COLUMN form_definition.form_artifacts.created_at IS 'Timestamp when the artifact was first published';
+
+ALTER TABLE form_definition.form_versions
+    ADD COLUMN IF NOT EXISTS artifact_hash TEXT REFERENCES form_definition.form_artifacts(content_hash);
+
+COMMENT ON COLUMN form_definition.form_versions.artifact_hash IS 'Content hash of the published artifact of this version (NULL until published, reset when the version changes)';
+
+CREATE INDEX IF NOT EXISTS idx_form_versions_artifact_hash ON form_definition.form_versions(artifact_hash);
+
+-- Existing versions are published the next time they are written, or with
+-- POST /form_definitions/forms/{form_id}/versions/{version_number}/publish
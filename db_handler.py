@@ -1,12 +1,26 @@
 # db.py
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+import asyncio
+import hashlib
 import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from functools import lru_cache
 from dotenv import load_dotenv
+from logger import get_logger
+from metrics import QUERY_DURATION, QUERY_ROWS, QUERY_ERRORS, SLOW_QUERIES, QUERY_INFO
 
 '''
-Singleton implementation for database connection.
-Ensures that only one connection to the database is created and reused.
+Thread-safe connection pool for the database.
+Connections are checked out per request and returned to the pool when the
+request is done with them, so the TCP + authentication handshake is only paid
+when the pool has to grow.
 
 Uses environment variables for configuration:
 - DBNAME: Name of the database
@@ -15,63 +29,669 @@ Uses environment variables for configuration:
 - HOST: Database host
 - PORT: Database port
 
-If some variable is not present, raises an EnvironmentError.
+Optional pool configuration:
+- DB_POOL_MIN: Connections opened on startup (default 1)
+- DB_POOL_MAX: Maximum number of open connections (default 10)
+- DB_POOL_TIMEOUT: Seconds to wait for a free connection (default 30)
+- DB_POOL_HEALTHCHECK_IDLE: Idle seconds after which a connection is pinged
+  on checkout before being handed out (default 30, 0 pings on every checkout)
+- DB_ASYNC: Serve the data layer through the async (psycopg 3) pool
+  instead of running the sync data layer on the threadpool (default false)
+
+If some required variable is not present, raises an EnvironmentError.
+
+Pooled connections hand out instrumented cursors (sync and async): every
+execute() is timed and accounted, with its row count, under the fingerprint
+of its statement (literals and parameters replaced by ?, lists of them
+collapsed), so the same query is aggregated whatever its arguments. Very
+long statements (execute_values pages) are fingerprinted from their
+beginning only. The aggregates are exposed through get_query_stats() and as db_* metrics (see
+metrics.py). Server-side (named) cursors are only timed on execute, not on
+their fetches.
+
+Statements slower than DB_SLOW_QUERY_MS are logged as warnings, with their
+normalized text (never their parameters). A sample of the slow SELECTs
+(DB_EXPLAIN_SAMPLE_RATE) is run again under EXPLAIN (ANALYZE, BUFFERS) and
+the plan added to the log; that run happens in a savepoint rolled back right
+after, so it changes nothing, but it costs the statement once more.
+
+Optional query instrumentation configuration:
+- DB_QUERY_STATS: Instrument the cursors (default true)
+- DB_QUERY_STATS_MAX: Distinct statements tracked; the following ones are
+  accounted together as "other" (default 500)
+- DB_SLOW_QUERY_MS: Statements taking this long or longer are logged
+  (default 500, 0 disables it)
+- DB_EXPLAIN_SAMPLE_RATE: Fraction of the slow SELECTs whose plan is logged,
+  0 to 1 (default 0: none)
 '''
 
 load_dotenv()
 
-class DatabaseConnection:
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+DB_QUERY_STATS = os.getenv("DB_QUERY_STATS", "true").lower() == "true"
+DB_QUERY_STATS_MAX = int(os.getenv("DB_QUERY_STATS_MAX", "500"))
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+DB_EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_EXPLAIN_SAMPLE_RATE", "0"))
+
+if not 0 <= DB_EXPLAIN_SAMPLE_RATE <= 1:
+    raise ValueError(f"Invalid DB_EXPLAIN_SAMPLE_RATE={DB_EXPLAIN_SAMPLE_RATE}, expected a value between 0 and 1")
+
+logger = get_logger(__name__)
+
+
+def _validate_environment_variables():
+    """Validate that all required environment variables exist"""
+    required_vars = ["DBNAME", "DBUSER", "PASSWORD", "HOST", "PORT"]
+    missing_vars = []
+
+    for var in required_vars:
+        if not os.getenv(var):
+            missing_vars.append(var)
+
+    if missing_vars:
+        raise EnvironmentError(
+            f"Missing required environment variables: {', '.join(missing_vars)}"
+        )
+
+
+def _connection_settings() -> dict:
+    """Connection keyword arguments shared by the sync and async pools"""
+    _validate_environment_variables()
+
+    return {
+        "dbname": os.getenv("DBNAME"),
+        "user": os.getenv("DBUSER"),
+        "password": os.getenv("PASSWORD"),
+        "host": os.getenv("HOST"),
+        "port": os.getenv("PORT"),
+    }
+
+
+class PoolTimeoutError(Exception):
+    '''Raised when no connection becomes available within the pool timeout.'''
+
+
+# Statement -> fingerprint, in order: comments, literals and parameters, lists of them, spaces
+_NORMALIZE = [
+    (re.compile(r"--[^\n]*|/\*.*?\*/", re.S), " "),
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|\$\d+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+# Accounts the statements past DB_QUERY_STATS_MAX
+OTHER_QUERY_ID = "other"
+
+# Length of the normalized text in the query label of db_query_info (in full in get_query_stats())
+QUERY_LABEL_MAX_CHARS = 200
+
+# Longer statements (e.g. the pages of execute_values, their rows inlined) are
+# fingerprinted from their beginning only, and not cached
+FINGERPRINT_MAX_CHARS = 8192
+_REPEATED_GROUPS = re.compile(r"(\((?:[^()]|\([^()]*\))*\))(?:\s*,\s*\1)+")
+
+
+def _fingerprint(text: str) -> tuple:
+    # Empty statements are sent by the async pool to check its connections
+    text = text.strip().rstrip(";").strip() or "(empty statement)"
+    return hashlib.sha1(text.encode()).hexdigest()[:16], text
+
+
+def _normalize(query: str) -> str:
+    for pattern, replacement in _NORMALIZE:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+@lru_cache(maxsize=1024)
+def _cached_fingerprint(query: str) -> tuple:
+    return _fingerprint(_normalize(query))
+
+
+def query_fingerprint(query: str) -> tuple:
+    """Short id and normalized text of a statement (the same whatever its literals and parameters)"""
+    if len(query) <= FINGERPRINT_MAX_CHARS:
+        return _cached_fingerprint(query)
+
+    # Wherever the cut falls, every page of the same statement gets the same id: drop the
+    # literal cut in two (complete ones are ? by now), the repeated rows and the last partial one
+    text = _normalize(query[:FINGERPRINT_MAX_CHARS]).split("'", 1)[0]
+    last = None
+    for last in _REPEATED_GROUPS.finditer(text):
+        pass
+    if last is not None:
+        text = _REPEATED_GROUPS.sub(r"\1", text[:last.end()])
+    else:
+        text = text[:text.rfind(")") + 1] or text
+    return _fingerprint(text + " ...")
+
+
+def _query_text(query, context) -> str:
+    """SQL of a statement as passed to execute() (string, bytes or composed SQL)"""
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode()
+    return query.as_string(context)
+
+
+class QueryStats:
+    '''Execution counters of the statements, per fingerprint.'''
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def record(self, query_id: str, text: str, duration: float, rows: int, failed: bool, slow: bool) -> str:
+        """Account one execution; returns the id it was accounted under"""
+        with self._lock:
+            query = self._queries.get(query_id)
+
+            if query is None:
+                if len(self._queries) >= self.max_queries:
+                    query_id, text = OTHER_QUERY_ID, "(other statements)"
+                    query = self._queries.get(query_id)
+
+                if query is None:
+                    query = self._queries[query_id] = {
+                        "query": text, "calls": 0, "errors": 0, "slow": 0, "rows": 0,
+                        "time_total": 0.0, "time_max": 0.0,
+                    }
+                    QUERY_INFO.set(1, query_id, text[:QUERY_LABEL_MAX_CHARS])
+
+            query["calls"] += 1
+            query["errors"] += failed
+            query["slow"] += slow
+            query["rows"] += rows
+            query["time_total"] += duration
+            query["time_max"] = max(query["time_max"], duration)
+
+        return query_id
+
+    def stats(self, limit: int = None) -> list:
+        """The statements by total execution time, longest first"""
+        with self._lock:
+            queries = [{"query_id": query_id, **query} for query_id, query in self._queries.items()]
+
+        queries.sort(key=lambda query: query["time_total"], reverse=True)
+        for query in queries:
+            query["time_mean"] = query["time_total"] / query["calls"]
+        return queries[:limit] if limit is not None else queries
+
+
+_query_stats = QueryStats(DB_QUERY_STATS_MAX)
+
+
+def _record_statement(query: str, duration: float, rows: int, failed: bool = False) -> tuple:
+    """Account one execution; returns its query id, normalized text and whether it was slow"""
+    query_id, text = query_fingerprint(query)
+    slow = DB_SLOW_QUERY_MS > 0 and duration * 1000 >= DB_SLOW_QUERY_MS
+    rows = max(rows, 0)
+
+    query_id = _query_stats.record(query_id, text, duration, rows, failed, slow)
+
+    QUERY_DURATION.observe(duration, query_id)
+    QUERY_ROWS.inc(query_id, amount=rows)
+    if failed:
+        QUERY_ERRORS.inc(query_id)
+    if slow:
+        SLOW_QUERIES.inc(query_id)
+
+    logger.debug("Query %s took %.2f ms, %d rows", query_id, duration * 1000, rows)
+    return query_id, text, slow
+
+
+def _explain_sampled(text: str) -> bool:
+    """Whether the plan of a slow statement is captured (SELECTs only: ANALYZE runs the statement)"""
+    return (DB_EXPLAIN_SAMPLE_RATE > 0 and text[:6].upper() == "SELECT" and
+            random.random() < DB_EXPLAIN_SAMPLE_RATE)
+
+
+def _log_slow_query(query_id: str, text: str, duration: float, rows: int, plan: str = None):
+    if plan is None:
+        logger.warning("Slow query %s: %.1f ms, %d rows: %s", query_id, duration * 1000, max(rows, 0), text)
+    else:
+        logger.warning("Slow query %s: %.1f ms, %d rows: %s\n%s", query_id, duration * 1000, max(rows, 0), text, plan)
+
+
+def _explain(conn, query: str, vars) -> str:
+    """EXPLAIN (ANALYZE, BUFFERS) of a statement in the current transaction, undone right after"""
+    if conn.autocommit or conn.info.transaction_status != extensions.TRANSACTION_STATUS_INTRANS:
+        return None
+
+    # Plain cursor: not accounted, plan lines as tuples
+    cursor = conn.cursor(cursor_factory=extensions.cursor)
+    try:
+        cursor.execute("SAVEPOINT query_explain")
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, vars)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            # Whatever ANALYZE did is undone, and a failed EXPLAIN does not abort the transaction
+            cursor.execute("ROLLBACK TO SAVEPOINT query_explain")
+            cursor.execute("RELEASE SAVEPOINT query_explain")
+
+    except psycopg2.Error as e:
+        logger.debug("Could not explain the slow query: %s", e)
+        return None
+
+    finally:
+        cursor.close()
+
+
+class InstrumentedCursor(RealDictCursor):
+    '''RealDictCursor timing and accounting every statement (see the module docstring).'''
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            _record_statement(_query_text(query, self), time.perf_counter() - started, 0, failed=True)
+            raise
+
+        duration = time.perf_counter() - started
+        text = _query_text(query, self)
+        query_id, normalized, slow = _record_statement(text, duration, self.rowcount)
+
+        if slow:
+            plan = None
+            if self.name is None and _explain_sampled(normalized):
+                plan = _explain(self.connection, text, vars)
+            _log_slow_query(query_id, normalized, duration, self.rowcount, plan)
+
+        return result
+
+
+@lru_cache(maxsize=None)
+def _instrumented_async_cursor():
+    '''Async counterpart of InstrumentedCursor (psycopg 3 is only imported with the async pool).'''
+    from psycopg import AsyncCursor, Error
+    from psycopg.rows import tuple_row
+
+    async def explain(conn, query: str, params) -> str:
+        try:
+            # Savepoint (or transaction) rolled back on exit
+            async with conn.transaction(force_rollback=True):
+                cursor = AsyncCursor(conn, row_factory=tuple_row)
+                try:
+                    await cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+                    rows = await cursor.fetchall()
+                finally:
+                    await cursor.close()
+            return "\n".join(row[0] for row in rows)
+
+        except Error as e:
+            logger.debug("Could not explain the slow query: %s", e)
+            return None
+
+    class InstrumentedAsyncCursor(AsyncCursor):
+        async def execute(self, query, params=None, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await super().execute(query, params, **kwargs)
+            except Exception:
+                _record_statement(_query_text(query, self.connection), time.perf_counter() - started, 0, failed=True)
+                raise
+
+            duration = time.perf_counter() - started
+            text = _query_text(query, self.connection)
+            query_id, normalized, slow = _record_statement(text, duration, self.rowcount)
+
+            if slow:
+                plan = await explain(self.connection, text, params) if _explain_sampled(normalized) else None
+                _log_slow_query(query_id, normalized, duration, self.rowcount, plan)
+
+            return result
+
+    return InstrumentedAsyncCursor
+
+
+class DatabasePool:
     _instance = None
-    _connection = None
-    
+
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(DatabaseConnection, cls).__new__(cls)
+            cls._instance = super(DatabasePool, cls).__new__(cls)
+            cls._instance._initialized = False
         return cls._instance
-    
-    def _validate_environment_variables(self):
-        """Validate that all required environment variables exist"""
-        required_vars = ["DBNAME", "DBUSER", "PASSWORD", "HOST", "PORT"]
-        missing_vars = []
-        
-        for var in required_vars:
-            if not os.getenv(var):
-                missing_vars.append(var)
-        
-        if missing_vars:
-            raise EnvironmentError(
-                f"Missing required environment variables: {', '.join(missing_vars)}"
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.min_size = int(os.getenv("DB_POOL_MIN", "1"))
+        self.max_size = int(os.getenv("DB_POOL_MAX", "10"))
+        self.timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.healthcheck_idle = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+
+        if self.min_size < 0 or self.max_size < 1 or self.min_size > self.max_size:
+            raise ValueError(
+                f"Invalid pool size configuration: DB_POOL_MIN={self.min_size}, DB_POOL_MAX={self.max_size}"
             )
-    
+
+        # Idle connections, paired with the time they were returned
+        self._idle = deque()
+        self._in_use = set()
+        self._opened = 0
+        self._lock = threading.Condition()
+        self._closed = False
+
+        # Counters exposed through stats()
+        self._stats = {
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "timeouts": 0,
+            "healthcheck_failures": 0,
+        }
+
+        self._initialized = True
+
+    def _connect(self):
+        """Open a new physical connection to the database"""
+        return psycopg2.connect(cursor_factory=InstrumentedCursor if DB_QUERY_STATS else RealDictCursor,
+                                **_connection_settings())
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        """Check a connection before handing it out"""
+        if conn.closed:
+            return False
+
+        # Recently used connections are trusted without a round trip
+        if time.monotonic() - idle_since < self.healthcheck_idle:
+            return True
+
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1;")
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a connection and forget about it (lock must be held)"""
+        try:
+            if not conn.closed:
+                conn.close()
+        finally:
+            self._opened -= 1
+            self._stats["connections_discarded"] += 1
+            self._lock.notify()
+
     def get_connection(self):
-        """Get database connection (singleton)"""
-        if self._connection is None or self._connection.closed:
-            self._validate_environment_variables()
-            
-            self._connection = psycopg2.connect(
-                dbname=os.getenv("DBNAME"),
-                user=os.getenv("DBUSER"),
-                password=os.getenv("PASSWORD"),
-                host=os.getenv("HOST"),
-                port=os.getenv("PORT"),
-                cursor_factory=RealDictCursor
-            )
-        
-        return self._connection
-    
-    def close_connection(self):
-        """Close the database connection"""
-        if self._connection and not self._connection.closed:
-            self._connection.close()
-            self._connection = None
-
-# For backward compatibility, you can keep the original function names
-_db_connection = DatabaseConnection()
+        """Check out a connection from the pool, waiting if the pool is exhausted"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+
+                elif self._opened < self.max_size:
+                    # Reserve the slot, connect outside of the lock
+                    self._opened += 1
+                    conn, idle_since = None, None
+
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout} seconds"
+                        )
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    started = time.monotonic()
+                    self._lock.wait(remaining)
+                    self._stats["wait_time_total"] += time.monotonic() - started
+                    continue
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                        self._lock.notify()
+                    raise
+
+                with self._lock:
+                    self._stats["connections_created"] += 1
+
+            elif not self._is_healthy(conn, idle_since):
+                with self._lock:
+                    self._stats["healthcheck_failures"] += 1
+                    self._discard(conn)
+                continue
+
+            with self._lock:
+                self._in_use.add(conn)
+                self._stats["checkouts"] += 1
+
+            return conn
+
+    def release_connection(self, conn):
+        """Return a connection to the pool, leaving it in a clean state"""
+        if conn is None:
+            return
+
+        keep = not conn.closed
+
+        # Never hand out a connection with an open (or failed) transaction
+        if keep:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                keep = False
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    keep = False
+
+        with self._lock:
+            self._in_use.discard(conn)
+
+            if keep and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+            else:
+                self._discard(conn)
+
+    def close_all(self):
+        """Close every idle connection and stop handing out new ones"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
+
+    def reopen(self):
+        """Allow checkouts again after close_all()"""
+        with self._lock:
+            self._closed = False
+
+    def warm_up(self):
+        """Open connections up to the configured minimum size"""
+        while True:
+            # Reserve one slot at a time, connect outside of the lock
+            with self._lock:
+                if self._opened >= self.min_size:
+                    return
+                self._opened += 1
+
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                    self._lock.notify()
+                raise
+
+            with self._lock:
+                self._stats["connections_created"] += 1
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+
+    def stats(self) -> dict:
+        """Snapshot of the pool usage counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "open": self._opened,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+            })
+        return stats
+
+
+_db_pool = DatabasePool()
 
 def get_connection():
-    """Get database connection (singleton)"""
-    return _db_connection.get_connection()
+    """Check out a connection from the pool"""
+    return _db_pool.get_connection()
+
+def release_connection(conn):
+    """Return a connection to the pool"""
+    _db_pool.release_connection(conn)
+
+@contextmanager
+def pooled_connection():
+    """Context manager that checks out a connection and always returns it"""
+    conn = _db_pool.get_connection()
+    try:
+        yield conn
+    finally:
+        _db_pool.release_connection(conn)
+
+def get_db():
+    """FastAPI dependency yielding a pooled connection for the request"""
+    with pooled_connection() as conn:
+        yield conn
+
+def get_pool_stats() -> dict:
+    """Get the pool usage counters"""
+    return _db_pool.stats()
+
+def get_query_stats(limit: int = None) -> list:
+    """Get the execution counters of the statements, longest total time first"""
+    return _query_stats.stats(limit)
+
+def open_pool():
+    """Open the minimum number of connections (called on startup)"""
+    _db_pool.reopen()
+    _db_pool.warm_up()
+
+def close_pool():
+    """Close all pooled connections (called on shutdown)"""
+    _db_pool.close_all()
+
+def open_dedicated_connection():
+    """Open a connection outside of the pool (for long-lived listeners)"""
+    return psycopg2.connect(**_connection_settings())
+
+
+class AsyncDatabasePool:
+    '''
+    Async counterpart of DatabasePool, backed by psycopg 3's AsyncConnectionPool.
+
+    Rows are returned as dicts (same shape as RealDictCursor) so the async data
+    layer returns exactly what the sync one does. psycopg 3 is only imported
+    when the pool is opened, so sync-only deployments do not need it installed.
+    '''
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncDatabasePool, cls).__new__(cls)
+            cls._instance._pool = None
+            cls._instance._open_lock = asyncio.Lock()
+        return cls._instance
+
+    async def open(self):
+        """Create the pool and open its minimum number of connections"""
+        if self._pool is not None:
+            return
+
+        # Concurrent first requests (when startup could not open it) open a single pool
+        async with self._open_lock:
+            if self._pool is not None:
+                return
+
+            from psycopg.rows import dict_row
+            from psycopg_pool import AsyncConnectionPool
+
+            kwargs = {**_connection_settings(), "row_factory": dict_row}
+            if DB_QUERY_STATS:
+                kwargs["cursor_factory"] = _instrumented_async_cursor()
+
+            pool = AsyncConnectionPool(
+                kwargs=kwargs,
+                min_size=_db_pool.min_size,
+                max_size=_db_pool.max_size,
+                timeout=_db_pool.timeout,
+                check=AsyncConnectionPool.check_connection,
+                open=False,
+            )
+            await pool.open()
+            self._pool = pool
+
+    async def close(self):
+        """Close every connection of the pool"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check out a connection, returning it to the pool on exit"""
+        if self._pool is None:
+            await self.open()
+
+        async with self._pool.connection() as conn:
+            yield conn
+
+    def stats(self) -> dict:
+        """Snapshot of the pool usage counters"""
+        if self._pool is None:
+            return {}
+        return self._pool.get_stats()
+
+
+_async_db_pool = AsyncDatabasePool()
+
+def async_connection():
+    """Async context manager that checks out a connection from the async pool"""
+    return _async_db_pool.connection()
+
+def get_async_pool_stats() -> dict:
+    """Get the async pool usage counters"""
+    return _async_db_pool.stats()
+
+async def open_async_pool():
+    """Open the async pool (called on startup when DB_ASYNC is enabled)"""
+    await _async_db_pool.open()
 
-def close_connection():
-    """Close the database connection"""
-    _db_connection.close_connection()
\ No newline at end of file
+async def close_async_pool():
+    """Close the async pool (called on shutdown)"""
+    await _async_db_pool.close()
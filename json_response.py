@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+'''
+Fast JSON encoding for API responses.
+
+Rows come out of the data layer as dicts holding datetimes and nested JSONB
+documents (form schemas can be large). FastJSONResponse encodes them in one
+pass with orjson, which handles datetimes, UUIDs and dict subclasses such as
+RealDictRow natively, instead of walking them with jsonable_encoder first and
+then running the stdlib encoder.
+
+Endpoints returning rows should return FastJSONResponse(...) themselves: when
+an endpoint returns a plain dict FastAPI still runs jsonable_encoder before
+the response class. It is also the default response class of the app, so
+every other response goes through the same encoder.
+
+orjson is optional: without it the stdlib encoder is used, with the same
+output for the types the data layer returns.
+
+JSONB columns can also be read as text (column::text) and wrapped in RawJSON:
+the text Postgres sent is then spliced into the response body as is, with no
+parse into Python objects and no re-encode. The read endpoints use this mode
+unless JSONB_PASSTHROUGH is set to false.
+'''
+
+load_dotenv()
+
+JSONB_PASSTHROUGH = os.getenv("JSONB_PASSTHROUGH", "true").lower() == "true"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Placeholder left by RawJSON values in the encoded body (random, so stored data cannot forge it)
+_RAW_MARKER = f"__raw_json_{uuid.uuid4().hex}_"
+_RAW_PATTERN = re.compile(rb'"' + _RAW_MARKER.encode() + rb'(\d+)"')
+
+
+class RawJSON:
+    '''JSON text that is already encoded (e.g. a JSONB column read as ::text).'''
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self):
+        return f"RawJSON({self.text[:40]!r})"
+
+    def load(self):
+        """Parse the text (for the few callers that need the Python objects)"""
+        return json.loads(self.text)
+
+
+def raw_json_columns(row, columns):
+    '''Wrap the given text columns of a row in RawJSON (NULLs stay None).'''
+    if row is None:
+        return None
+
+    row = dict(row)
+    for column in columns:
+        if row.get(column) is not None:
+            row[column] = RawJSON(row[column])
+    return row
+
+
+def _default(value):
+    '''Encode the types neither encoder handles natively.'''
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    # Only reached by the stdlib encoder
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    '''Encode content as compact UTF-8 JSON, splicing RawJSON values in verbatim.'''
+    fragments = []
+
+    def default(value):
+        # Leave a placeholder string, replaced by the raw text once encoded
+        if isinstance(value, RawJSON):
+            fragments.append(value.text.encode("utf-8"))
+            return f"{_RAW_MARKER}{len(fragments) - 1}"
+        return _default(value)
+
+    if orjson is not None:
+        body = orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(content, default=default, ensure_ascii=False,
+                          allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    if not fragments:
+        return body
+
+    return _RAW_PATTERN.sub(lambda match: fragments[int(match.group(1))], body)
+
+
+class FastJSONResponse(JSONResponse):
+    '''JSONResponse rendered with orjson (stdlib json when it is not installed).'''
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,14 +1,55 @@
+import atexit
 import logging
 import json
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 from datetime import datetime
 from dotenv import load_dotenv
 
+'''
+Application logging: plain text and JSON rotating files, and the console.
+
+With LOG_ASYNC (the default) request threads do not write logs themselves:
+records go through a bounded in-memory queue to a listener thread, which
+formats them, writes them to the handlers in batches (one flush per handler
+and batch) and rotates the files. A request only pays for putting the record
+in the queue.
+
+When the queue is full, records are dropped (LOG_QUEUE_FULL_POLICY=drop) or
+the logging thread waits for room up to LOG_QUEUE_BLOCK_TIMEOUT seconds and
+drops the record after it (block). Warnings and errors always wait, so a
+burst of info records does not cost the errors around it. Drops are counted, reported in the logs
+as soon as there is room again, and exposed through get_logging_stats().
+
+Configuration:
+- ENVIRONMENT: Deployment environment (default development)
+- LOG_LEVEL: Root log level (default INFO)
+- LOG_DIR: Directory of the log files (default logs)
+- LOG_IN_JSON: Also write JSON lines to app.json.log (default true)
+- LOG_IN_CONSOLE: Also write to stdout (default true)
+- LOG_ASYNC: Write logs from a listener thread (default true)
+- LOG_QUEUE_SIZE: Records waiting to be written at most (default 10000)
+- LOG_QUEUE_FULL_POLICY: drop or block when the queue is full (default drop)
+- LOG_QUEUE_BLOCK_TIMEOUT: Seconds to wait for room with block (default 1)
+- LOG_BATCH_SIZE: Records written per batch at most (default 500)
+- LOG_PAYLOAD_MAX_CHARS: Length payload() truncates logged documents to (default 2000)
+
+Records still queued at exit are written by stop_logging(), registered with atexit.
+
+Pass values to log as arguments ("... %s", value) rather than in f-strings:
+they are only formatted when the level is enabled. Documents (definitions,
+schemas) go through payload(), which also serializes and truncates them only
+then.
+'''
+
 # Load environment variables from .env file
 load_dotenv()
 
+PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+
 class JSONFormatter(logging.Formatter):
     def format(self, record):
         log_record = {
@@ -20,17 +61,150 @@ class JSONFormatter(logging.Formatter):
             "function": record.funcName,
             "line": record.lineno,
         }
-        
+
         # Add exception info if present
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
-        
+
         return json.dumps(log_record)
-    
+
+
+class LazyPayload:
+    '''Log argument serialized (as JSON, truncated) only if the record is emitted.'''
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        text = json.dumps(self.value, default=str)
+        if len(text) > PAYLOAD_MAX_CHARS:
+            return f"{text[:PAYLOAD_MAX_CHARS]}... ({len(text)} characters)"
+        return text
+
+
+def payload(value) -> LazyPayload:
+    '''Wrap a document logged as an argument, e.g. logger.debug("Definition: %s", payload(definition)).'''
+    return LazyPayload(value)
+
+
+class _BatchFlushMixin:
+    '''Handler whose flush is deferred while a batch is being written.'''
+
+    in_batch = False
+
+    def flush(self):
+        if not self.in_batch:
+            super().flush()
+
+
+class BatchedRotatingFileHandler(_BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BoundedQueueHandler(QueueHandler):
+    '''QueueHandler over a bounded queue, dropping or waiting when it is full.'''
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False, block_timeout: float = 1.0):
+        super().__init__(log_queue)
+        self.block = block
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Only merge the arguments (they may change once the call returns):
+        # formatting, exception included, is left to the listener thread
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.block or record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    '''QueueListener writing the records waiting in the queue in batches.'''
+
+    def __init__(self, log_queue: queue.Queue, queue_handler: BoundedQueueHandler, *handlers, batch_size: int = 500):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+        self.batch_size = batch_size
+        self.batches = 0
+        self._reported_drops = 0
+
+    def enqueue_sentinel(self):
+        # Wait for room: the sentinel must not be dropped
+        self.queue.put(self._sentinel)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, records):
+        for handler in self.handlers:
+            handler.in_batch = True
+            try:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            finally:
+                handler.in_batch = False
+                handler.flush()
+        self.batches += 1
+
+    def _report_drops(self):
+        dropped = self.queue_handler.dropped
+        if dropped > self._reported_drops:
+            record = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                       f"Dropped {dropped - self._reported_drops} log records (logging queue full)",
+                                       None, None)
+            self._reported_drops = dropped
+            self._write([record])
+
+    def _monitor(self):
+        while True:
+            batch = self._next_batch()
+            stop = any(record is self._sentinel for record in batch)
+            records = [record for record in batch if record is not self._sentinel]
+
+            if records:
+                self._write(records)
+            self._report_drops()
+
+            for _ in batch:
+                self.queue.task_done()
+
+            if stop:
+                break
+
+
+_listener = None
+
 
 def setup_logging():
     '''Setup application logging in JSON format'''
 
+    global _listener
+
     # Set environment from configuration
     environment = os.getenv("ENVIRONMENT", "development")
 
@@ -43,6 +217,16 @@ def setup_logging():
     log_in_json = os.getenv("LOG_IN_JSON", "true").lower() == "true"
     log_in_console = os.getenv("LOG_IN_CONSOLE", "true").lower() == "true"
 
+    # Queue between the request threads and the writing thread
+    log_async = os.getenv("LOG_ASYNC", "true").lower() == "true"
+    queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    queue_full_policy = os.getenv("LOG_QUEUE_FULL_POLICY", "drop").lower()
+    block_timeout = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "1"))
+    batch_size = int(os.getenv("LOG_BATCH_SIZE", "500"))
+
+    if queue_full_policy not in ("drop", "block"):
+        raise ValueError(f"Invalid LOG_QUEUE_FULL_POLICY={queue_full_policy}, expected drop or block")
+
     # Create path if it doesn't exist
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
@@ -51,12 +235,15 @@ def setup_logging():
     logger = logging.getLogger()
     logger.setLevel(log_level)
 
-    # Clear any existing handlers
+    # Stop the writing thread of a previous setup, then clear any existing handlers
+    stop_logging()
     if logger.hasHandlers():
         logger.handlers.clear()
 
+    handlers = []
+
     # File handler with plain text format
-    text_file_handler = RotatingFileHandler(
+    text_file_handler = BatchedRotatingFileHandler(
         filename=os.path.join(log_dir, "app.log"),
         maxBytes=10*1024*1024,  # 10 MB
         backupCount=5
@@ -64,14 +251,15 @@ def setup_logging():
     text_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
     )
-    
+
     # Format file as plain text
     text_file_handler.setFormatter(text_formatter)
+    handlers.append(text_file_handler)
 
     # If JSON logging is enabled
     if log_in_json:
         # File habndler with JSON Format
-        file_handler = RotatingFileHandler(
+        file_handler = BatchedRotatingFileHandler(
             filename=os.path.join(log_dir, "app.json.log"),
             maxBytes=10*1024*1024,  # 10 MB
             backupCount=5
@@ -79,27 +267,65 @@ def setup_logging():
 
         # Format file as JSON
         file_handler.setFormatter(JSONFormatter())
+        handlers.append(file_handler)
 
     # If logging in console is enabled
     if log_in_console:
         # Console handler with simple format
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = BatchedStreamHandler(sys.stdout)
         console_formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         console_handler.setFormatter(console_formatter)
+        handlers.append(console_handler)
+
+    # Add handlers to the logger (behind the queue when writing asynchronously)
+    if log_async:
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = BoundedQueueHandler(log_queue, block=queue_full_policy == "block", block_timeout=block_timeout)
+        logger.addHandler(queue_handler)
 
-    # Add handlers to the logger
-    logger.addHandler(text_file_handler)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+        _listener = BatchingQueueListener(log_queue, queue_handler, *handlers, batch_size=batch_size)
+        _listener.start()
+
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     # Set level for external libraries to WARNING to reduce noise
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
+def stop_logging():
+    '''Write the queued records and stop the writing thread (no-op when logging synchronously)'''
+    global _listener
+
+    listener, _listener = _listener, None
+    if listener is not None:
+        logging.getLogger().removeHandler(listener.queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+# Records still queued when the process exits are written, not lost with the daemon thread
+atexit.register(stop_logging)
+
+def get_logging_stats() -> dict:
+    '''Get the counters of the logging queue'''
+    if _listener is None:
+        return {"async": False}
+
+    queue_handler = _listener.queue_handler
+    return {
+        "async": True,
+        "policy": "block" if queue_handler.block else "drop",
+        "queue_size": _listener.queue.maxsize,
+        "queued": _listener.queue.qsize(),
+        "dropped": queue_handler.dropped,
+        "batches": _listener.batches,
+    }
+
 def get_logger(name: str) -> logging.Logger:
     '''Get a logger instance by name'''
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -1,16 +1,39 @@
 # main.py
 from fastapi import FastAPI, HTTPException
 from routers import test_api, form_definition_api,  component_definition_api, component_version_api
-from routers import form_versions_api
+from routers import form_versions_api, export_api, metrics_api
 import logging
 from logger import setup_logging, get_logger
+from access_log import AccessLogMiddleware
+from metrics import METRICS_ENABLED, MetricsMiddleware
+from db_handler import DB_ASYNC, open_pool, close_pool, open_async_pool, close_async_pool
+from cache_bus import start_cache_listener, stop_cache_listener
+from cpu_pool import start_cpu_pool, stop_cpu_pool
+from routers.data_layer.form_artifacts import start_artifact_sweeper, stop_artifact_sweeper
+from json_response import FastJSONResponse
+from body_limit import BodySizeLimitMiddleware, FORM_VERSION_MAX_BODY_BYTES, FORM_VERSION_WRITE_PATH
+from body_limit import FORM_IMPORT_MAX_BODY_BYTES, FORM_IMPORT_PATH
 
 # Set up logging
 setup_logging()
 logger = get_logger(__name__)
 
 # Initialize FastAPI app
-app = FastAPI(title="Form API", version="0.1")
+# Responses are encoded with orjson by default (see json_response.py)
+app = FastAPI(title="Form API", version="0.1", default_response_class=FastJSONResponse)
+
+# Oversized form version writes and imports are rejected while their body is received (see body_limit.py)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=FORM_VERSION_MAX_BODY_BYTES, path_pattern=FORM_VERSION_WRITE_PATH)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=FORM_IMPORT_MAX_BODY_BYTES, path_pattern=FORM_IMPORT_PATH)
+
+# Request counts, latency and sizes per route template, served at /metrics (see metrics.py)
+# Added after the body limits, so rejected requests are counted too
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# One sampled access line per request (see access_log.py), added last so it is the
+# outermost middleware and every request gets logged, rejected ones included
+app.add_middleware(AccessLogMiddleware)
 
 # Register routers
 app.include_router(test_api.router)
@@ -18,24 +41,49 @@ app.include_router(form_definition_api.router)
 app.include_router(component_definition_api.router)
 app.include_router(component_version_api.router)  # Added router for component definitions
 app.include_router(form_versions_api.router) 
-
-# Middleware for request logging
-@app.middleware("http")
-async def log_requests(request, call_next):
-    logger.info(f"Incoming request: {request.method} {request.url}")
-    try:
-        response = await call_next(request)
-        logger.info(f"Response status: {response.status_code} for {request.method} {request.url}")
-        return response
-    
-    except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
-        raise
+app.include_router(export_api.router)
+if METRICS_ENABLED:
+    app.include_router(metrics_api.router)
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up the Form API application.")
 
+    # Open the minimum number of pooled connections ahead of the first request
+    try:
+        open_pool()
+    except Exception as e:
+        logger.warning(f"Could not warm up the database connection pool: {str(e)}")
+
+    # Open the async pool used by the native async data layer
+    if DB_ASYNC:
+        try:
+            await open_async_pool()
+        except Exception as e:
+            logger.warning(f"Could not open the async database connection pool: {str(e)}")
+
+    # Listen for cache invalidations sent by the other workers
+    start_cache_listener()
+
+    # Start the processes running CPU-bound work (when configured)
+    start_cpu_pool()
+
+    # Delete the published artifacts no form version uses anymore, periodically
+    start_artifact_sweeper()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the Form API application.")
+
+    # Stop listening for cache invalidations
+    stop_cache_listener()
+
+    # Stop the CPU pool processes
+    stop_cpu_pool()
+
+    # Stop deleting unused artifacts
+    stop_artifact_sweeper()
+
+    # Close every pooled connection
+    close_pool()
+    await close_async_pool()
@@ -0,0 +1,286 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from dotenv import load_dotenv
+
+'''
+Request and database metrics, exposed at /metrics in the Prometheus text format.
+
+MetricsMiddleware is plain ASGI (like access_log.py): per request it reads the
+clock twice, counts the body bytes sent and updates a few in-memory counters
+and histograms, keyed by method, route template and status. Nothing is
+formatted until /metrics is scraped.
+
+Routes are labelled with their template (e.g.
+/component_definitions/components/{component_id}/versions/{version_id}), never
+the actual path, so the number of series stays bounded; requests that match
+no route (404s, bodies rejected before routing) are labelled "unmatched".
+
+Metrics:
+- http_requests_total{method, route, status}: Requests answered
+- http_request_errors_total{method, route, status}: Requests answered with a
+  status of 400 or above (500 for the ones that raised)
+- http_request_duration_seconds{method, route}: Latency histogram, the whole
+  response body included
+- http_response_size_bytes{method, route}: Response body size histogram
+- http_requests_in_flight: Requests being processed
+
+Database statements, per query fingerprint (see db_handler.py):
+- db_query_duration_seconds{query_id}: Statement execution time histogram
+- db_query_rows_total{query_id}: Rows returned or affected
+- db_query_errors_total{query_id}: Statements that raised
+- db_slow_queries_total{query_id}: Statements over DB_SLOW_QUERY_MS
+- db_query_info{query_id, query}: Beginning (200 characters) of the normalized
+  text of each query_id (always 1), in full at /testapi/db-queries
+
+Values are kept per process: with several workers, each one reports its own
+(scrape them separately or aggregate them).
+
+Configuration:
+- METRICS_ENABLED: Collect metrics and serve /metrics (default true)
+- METRICS_LATENCY_BUCKETS: Upper bounds of the latency buckets, in seconds, comma
+  separated (default 0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10)
+- METRICS_SIZE_BUCKETS: Upper bounds of the response size buckets, in bytes, comma
+  separated (default 100,1000,10000,100000,1000000,10000000)
+- METRICS_QUERY_BUCKETS: Upper bounds of the statement time buckets, in seconds, comma
+  separated (default 0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5)
+'''
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _buckets(variable: str, default: str) -> tuple:
+    bounds = tuple(sorted(float(bound) for bound in os.getenv(variable, default).split(",") if bound.strip()))
+    if not bounds:
+        raise ValueError(f"Invalid {variable}, expected comma separated numbers")
+    return bounds
+
+
+LATENCY_BUCKETS = _buckets("METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10")
+SIZE_BUCKETS = _buckets("METRICS_SIZE_BUCKETS", "100,1000,10000,100000,1000000,10000000")
+QUERY_BUCKETS = _buckets("METRICS_QUERY_BUCKETS", "0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _sample(name: str, labelnames: tuple, labels: tuple, value, extra: str = "") -> str:
+    pairs = [f'{labelname}="{_escape(label)}"' for labelname, label in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return f"{name}{{{','.join(pairs)}}} {_format_value(value)}" if pairs else f"{name} {_format_value(value)}"
+
+
+class Metric(ABC):
+    '''A named metric with one series per combination of label values.'''
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels: tuple):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    @abstractmethod
+    def samples(self) -> list:
+        '''Lines of the exposition format, one per sample of every series.'''
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            try:
+                self._series[labels] += amount
+            except KeyError:
+                self._check(labels)
+                self._series[labels] = amount
+
+    def samples(self) -> list:
+        with self._lock:
+            series = sorted(self._series.items())
+        return [_sample(self.name, self.labelnames, labels, value) for labels, value in series]
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            try:
+                self._series[labels] += amount
+            except KeyError:
+                self._check(labels)
+                self._series[labels] = amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        self._check(labels)
+        with self._lock:
+            self._series[labels] = value
+
+    def samples(self) -> list:
+        with self._lock:
+            series = sorted(self._series.items())
+        if not series and not self.labelnames:
+            series = [((), 0)]
+        return [_sample(self.name, self.labelnames, labels, value) for labels, value in series]
+
+
+class Histogram(Metric):
+    '''Counts of observations per bucket (upper bounds), with their sum.'''
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        # Per series: [count per bucket (the last one is +Inf)..., sum]
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                self._check(labels)
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> list:
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+
+        lines = []
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                lines.append(_sample(f"{self.name}_bucket", self.labelnames, labels, cumulative,
+                                     f'le="{_format_value(float(bound))}"'))
+            lines.append(_sample(f"{self.name}_sum", self.labelnames, labels, values[-1]))
+            lines.append(_sample(f"{self.name}_count", self.labelnames, labels, cumulative))
+        return lines
+
+
+class Registry:
+    '''The metrics rendered by /metrics, in registration order.'''
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requests answered.", ("method", "route", "status")))
+ERRORS = REGISTRY.register(Counter(
+    "http_request_errors_total", "Requests answered with a status of 400 or above.", ("method", "route", "status")))
+LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to answer a request, body included.", ("method", "route"),
+    buckets=LATENCY_BUCKETS))
+RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "http_response_size_bytes", "Size of the response bodies.", ("method", "route"), buckets=SIZE_BUCKETS))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests being processed."))
+
+QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Time to execute a statement.", ("query_id",), buckets=QUERY_BUCKETS))
+QUERY_ROWS = REGISTRY.register(Counter(
+    "db_query_rows_total", "Rows returned or affected by the statements.", ("query_id",)))
+QUERY_ERRORS = REGISTRY.register(Counter(
+    "db_query_errors_total", "Statements that raised.", ("query_id",)))
+SLOW_QUERIES = REGISTRY.register(Counter(
+    "db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS.", ("query_id",)))
+QUERY_INFO = REGISTRY.register(Gauge(
+    "db_query_info", "Normalized text of each query_id.", ("query_id", "query")))
+
+
+def route_template(scope) -> str:
+    '''Path template of the route that handled a request ("unmatched" when none did).'''
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    '''Count, time and measure every HTTP request (ASGI middleware).'''
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        started = time.perf_counter()
+
+        async def measured_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, measured_send)
+
+        finally:
+            duration = time.perf_counter() - started
+            IN_FLIGHT.dec()
+
+            method = scope["method"]
+            route = route_template(scope)
+            status_label = str(status)
+
+            REQUESTS.inc(method, route, status_label)
+            if status >= 400:
+                ERRORS.inc(method, route, status_label)
+            LATENCY.observe(duration, method, route)
+            RESPONSE_SIZE.observe(size, method, route)
+
+
+def render_metrics() -> str:
+    '''All the metrics, in the Prometheus text exposition format.'''
+    return REGISTRY.render()
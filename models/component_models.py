@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class Component(BaseModel):
@@ -25,4 +25,11 @@ class ComponentVersion(BaseModel):
     
     is_active: bool = True
     created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
\ No newline at end of file
+    updated_at: Optional[datetime] = None
+
+# Largest batch accepted by the bulk creation endpoint
+MAX_VERSIONS_PER_BATCH = 1000
+
+class ComponentVersionBatch(BaseModel):
+    versions: List[ComponentVersion] = Field(max_length=MAX_VERSIONS_PER_BATCH)   # Each item must set component_id
+    report_errors: bool = False               # Skip invalid items and report them instead of failing the batch
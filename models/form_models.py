@@ -14,3 +14,23 @@ class FormVersion(BaseModel):
     schema: dict
     is_active: bool = True
 
+
+class FormVersionImport(BaseModel):
+    version_number: Optional[int] = None    # Defaults to the position in the versions list (1-based)
+    key: str
+    schema: dict
+    is_active: bool = True
+
+
+class FormImport(BaseModel):
+    key: str
+    name: str
+    description: str | None = None
+    versions: List[FormVersionImport] = Field(default_factory=list)
+
+
+# Largest batch accepted by the validate endpoints
+MAX_SUBMISSIONS_PER_BATCH = 10000
+
+class SubmissionBatch(BaseModel):
+    submissions: List[dict] = Field(max_length=MAX_SUBMISSIONS_PER_BATCH)   # Field name -> value, one object per submission
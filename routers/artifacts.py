@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import os
+from typing import Optional
+from fastapi import Response
+from dotenv import load_dotenv
+from routers.etags import etag_matches, not_modified
+
+'''
+Helpers for published form artifacts.
+
+Publishing serializes a form version once and compresses the result with
+gzip and, when the brotli package is installed, brotli. The artifact is
+addressed by the SHA-256 of the uncompressed bytes, which its ETags are
+derived from: identical publications share one artifact.
+
+Serving picks the best encoding the client accepts and returns the stored
+bytes as they are, with no serialization or compression per request.
+
+Configuration:
+- ARTIFACT_GZIP_LEVEL: gzip compression level used when publishing (default 9)
+- ARTIFACT_BROTLI_QUALITY: brotli quality used when publishing (default 5;
+  past it brotli gets much slower for a few percent smaller output)
+'''
+
+load_dotenv()
+
+ARTIFACT_GZIP_LEVEL = int(os.getenv("ARTIFACT_GZIP_LEVEL", "9"))
+ARTIFACT_BROTLI_QUALITY = int(os.getenv("ARTIFACT_BROTLI_QUALITY", "5"))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Stored variant of each content coding, in order of preference
+ENCODINGS = (("br", "body_brotli"), ("gzip", "body_gzip"), ("identity", "body"))
+
+
+def build_artifact(body: bytes) -> dict:
+    '''Hash and compressed variants of a serialized form version (run in the CPU pool).'''
+    return {
+        "content_hash": hashlib.sha256(body).hexdigest(),
+        "body": body,
+        # mtime=0 keeps the output (and so the stored bytes) deterministic
+        "body_gzip": gzip.compress(body, compresslevel=ARTIFACT_GZIP_LEVEL, mtime=0),
+        "body_brotli": brotli.compress(body, quality=ARTIFACT_BROTLI_QUALITY) if brotli is not None else None,
+    }
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> dict:
+    '''Content codings of an Accept-Encoding header with their q-values.'''
+    accepted = {}
+
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    return accepted
+
+
+def choose_encoding(artifact: dict, accept_encoding: Optional[str]):
+    '''(content coding, stored column) to send, the most compressed variant the client accepts.'''
+    accepted = accepted_encodings(accept_encoding)
+
+    for coding, column in ENCODINGS:
+        if artifact.get(column) is None:
+            continue
+        quality = accepted.get(coding, accepted.get("*", 1.0 if coding == "identity" else 0.0))
+        if quality > 0:
+            return coding, column
+
+    return "identity", "body"
+
+
+def artifact_etag(artifact: dict, coding: str = "identity") -> str:
+    '''Strong ETag of an artifact as sent with a content coding (each coding is a different representation).'''
+    suffix = "" if coding == "identity" else f"-{coding}"
+    return f'"{artifact["content_hash"]}{suffix}"'
+
+
+def artifact_response(artifact: dict, accept_encoding: Optional[str] = None,
+                      if_none_match: Optional[str] = None) -> Response:
+    '''Response serving the stored bytes of an artifact (or an empty 304).'''
+    coding, column = choose_encoding(artifact, accept_encoding)
+    etag = artifact_etag(artifact, coding)
+
+    # The client has the same content, whatever the coding it got it in
+    if any(etag_matches(if_none_match, artifact_etag(artifact, other)) for other, _ in ENCODINGS):
+        return not_modified(etag)
+
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+
+    return Response(content=artifact[column], media_type="application/json", headers=headers)
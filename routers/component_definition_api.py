@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 from models.component_models import Component
-from db_handler import get_connection, close_connection
-from routers.data_layer.components import create_component, update_component, get_component_by_id, list_components_from_db, delete_component_from_db
+from routers.data_layer import components
+from routers.data_layer.aio import components as async_components
+from routers.data_layer.dispatch import DataLayer
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_after
+from json_response import FastJSONResponse
 
 router = APIRouter(prefix="/component_definitions", tags=["Components"])
 
+# Data layer (native async when DB_ASYNC is enabled, threadpool otherwise)
+components_db = DataLayer(components, async_components)
+
 @router.get("/test", summary="Test endpoint for component definitions")
-def test_component_endpoint():
+async def test_component_endpoint():
     """
     A simple test endpoint to verify that the component definitions router is working.
     """
@@ -14,24 +21,24 @@ def test_component_endpoint():
 
 
 @router.post("/components", summary="Create or update a component definition")
-def create_or_update_component(component: Component, component_id: int = None):
+async def create_or_update_component(component: Component, component_id: int = None):
     '''
     Endpoint to create or update a component definition.
     '''
     try:
         if component_id:
             # Update existing component logic here
-            updated_component = update_component(component_id, component)
+            updated_component = await components_db.update_component(component_id, component)
 
             # Return info
-            return {"status": "Component updated", "component_id": component_id, "component": component}
+            return FastJSONResponse({"status": "Component updated", "component_id": component_id, "component": component})
         
         else:
             # Create new component logic here
-            new_component = create_component(component)
+            new_component = await components_db.create_component(component)
             
             # Return info
-            return {"status": "Component created", "component": new_component}
+            return FastJSONResponse({"status": "Component created", "component": new_component})
     
     except HTTPException:
         raise
@@ -41,16 +48,16 @@ def create_or_update_component(component: Component, component_id: int = None):
 
 
 @router.get("/components/{component_id}", summary="Retrieve a component definition by ID")
-def get_component(component_id: int):
+async def get_component(component_id: int):
     '''
     Endpoint to retrieve a component definition by its ID.
     '''
     try:
         # Get the component by ID
-        component = get_component_by_id(component_id)
+        component = await components_db.get_component_by_id(component_id)
         
         # return component details
-        return component
+        return FastJSONResponse(component)
     
     except HTTPException:
         raise
@@ -60,13 +67,23 @@ def get_component(component_id: int):
     
 
 @router.get("/components", summary="List all component definitions")
-def list_components():
+async def list_components(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+    ):
     '''
-    Endpoint to list all component definitions.
+    Endpoint to list the component definitions, one page at a time.
+
+    Components are ordered by id. Pass the `next_after` token of a response as
+    `after` to read the next page; it is null on the last page.
     '''
+
+    # Validate the page token before touching the database
+    after_id = decode_after(after)
+
     try:
-        components = list_components_from_db()
-        return {"status": "success", "components": components}
+        components, next_after = await components_db.list_components_from_db(limit, after_id)
+        return FastJSONResponse({"status": "success", "components": components, "next_after": next_after})
 
     except HTTPException as e:
         raise
@@ -76,14 +93,14 @@ def list_components():
 
 
 @router.delete("/components/{component_id}", summary="Delete a component definition by ID")
-def delete_component(component_id: int):
+async def delete_component(component_id: int):
     '''
     Endpoint to delete a component definition by its ID.
     '''
     try:
         # Deletion logic here
         # Assuming a delete_component_from_db function exists in the data layer
-        message = delete_component_from_db(component_id)
+        message = await components_db.delete_component_from_db(component_id)
         return message
     
     except HTTPException:
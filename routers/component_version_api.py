@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from models.component_models import ComponentVersion
-from routers.data_layer.component_versions import create_component_version, update_component_version
-from routers.data_layer.component_versions import get_component_version_from_db, get_latest_component_version_from_db
-from routers.data_layer.component_versions import get_all_versions_from_db
-from routers.data_layer.component_versions import delete_component_version_from_db, delete_lastest_version_from_db, delete_all_versions_from_db
+from fastapi import APIRouter, HTTPException, Query, Request
+from models.component_models import ComponentVersion, ComponentVersionBatch
+from routers.data_layer import component_versions
+from routers.data_layer.aio import component_versions as async_component_versions
+from routers.data_layer import component_resolution
+from routers.data_layer.aio import component_resolution as async_component_resolution
+from routers.data_layer.dispatch import DataLayer
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_after
+from routers.etags import version_etag, etag_matches, not_modified
+from json_response import FastJSONResponse, JSONB_PASSTHROUGH
 from logger import get_logger
 from typing import Optional
 
@@ -13,9 +17,13 @@ logger = get_logger(__name__)
 # Initialize the API router
 router = APIRouter(prefix="/component_definitions/components", tags=["Component Versions"])
 
+# Data layer (native async when DB_ASYNC is enabled, threadpool otherwise)
+component_versions_db = DataLayer(component_versions, async_component_versions)
+component_resolution_db = DataLayer(component_resolution, async_component_resolution)
+
 # Test method
 @router.get("/test", summary="Test endpoint for component versions")
-def test_component_version_endpoint():
+async def test_component_version_endpoint():
     """
     A simple test endpoint to verify that the component versions router is working.
     """
@@ -28,7 +36,7 @@ def test_component_version_endpoint():
 
 @router.post("/{component_id}/versions", summary="Create a new component version")
 @router.post("/{component_id}/versions/{version_id}", summary="Update a component version")
-def create_or_update_component_version(component_id: int, 
+async def create_or_update_component_version(component_id: int, 
                                        component_version: ComponentVersion,
                                        version_id: Optional[int] = None):
     '''
@@ -52,22 +60,22 @@ def create_or_update_component_version(component_id: int,
         if update_version:
             # Update existing component version logic here
             logger.info("Updating an existing version...")
-            updated_version = update_component_version(component_id, version_id, component_version)
+            updated_version = await component_versions_db.update_component_version(component_id, version_id, component_version)
 
-            return {"status": "Component version updated",
-                    "version_number": component_version.version_number,
-                    "component_version": updated_version}
+            return FastJSONResponse({"status": "Component version updated",
+                                     "version_number": component_version.version_number,
+                                     "component_version": updated_version})
             # return {"status": "OK"}
         
         else:
             # Log the start of the creation process
             logger.info("Creating new component version...")
             # Create new component version logic here
-            new_version = create_component_version(component_id, component_version)
+            new_version = await component_versions_db.create_component_version(component_id, component_version)
             logger.info(f"Component version successfully created with ID: {new_version['id']}")
             # Return info
-            return {"status": "Component version created",
-                    "component_version": new_version}
+            return FastJSONResponse({"status": "Component version created",
+                                     "component_version": new_version})
             # return {"status": "OK"}
     
     except HTTPException:
@@ -79,19 +87,63 @@ def create_or_update_component_version(component_id: int,
         raise HTTPException(status_code=500, detail=f"Error processing component version: {str(e)}")
     
 
+@router.post("/versions/bulk", summary="Create many component versions at once", status_code=201)
+async def bulk_create_component_versions(batch: ComponentVersionBatch):
+    '''
+    Endpoint to create many component versions, for one or more components, in a single transaction.
+
+    Every item must set component_id. Version numbers are allocated in bulk: versions of
+    the same component get consecutive numbers in the order they are sent.
+    By default any invalid item rejects the whole batch. With report_errors set, invalid
+    items are skipped and returned in "errors" (with their index in the request).
+    Batches of more than MAX_VERSIONS_PER_BATCH (1000) versions are rejected with a 422.
+    '''
+
+    logger.info(f"Bulk creating {len(batch.versions)} component versions")
+
+    try:
+        result = await component_versions_db.bulk_create_component_versions(batch.versions, batch.report_errors)
+
+        return FastJSONResponse({"status": "Component versions created",
+                                 "created_count": len(result["created"]),
+                                 "component_versions": result["created"],
+                                 "errors": result["errors"]},
+                                status_code=201)
+
+    except HTTPException:
+        logger.warning("HTTPException occurred while bulk creating component versions.")
+        raise
+
+    except Exception as e:
+        logger.error(f"Error bulk creating component versions: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing component versions: {str(e)}")
+
+
 @router.get("/{component_id}/versions/{version_id}", summary="Obtain a particular version of a component")
-def get_component_version(component_id: int, version_id: int):
+async def get_component_version(component_id: int, version_id: int, request: Request):
     '''
     Endpoint to get a particular version of a component
+
+    The response carries an ETag. If the If-None-Match header matches it,
+    returns an empty 304 without reading the definition.
     '''
 
     logger.info(f"Obtaining version {version_id} of component with id {component_id}")
 
     try:
-        component = get_component_version_from_db(component_id, version_id)
+        # Conditional GET: only the id and last update are needed to answer it
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            stamp = await component_versions_db.get_component_version_stamp(component_id, version_id)
+            etag = version_etag(stamp)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
 
-        return {"status": "Component version obtained",
-                "component_version": component}
+        component = await component_versions_db.get_component_version_from_db(component_id, version_id, raw=JSONB_PASSTHROUGH)
+
+        return FastJSONResponse({"status": "Component version obtained",
+                                 "component_version": component},
+                                headers={"ETag": version_etag(component)})
 
     except HTTPException:
         logger.warning("HTTPException occurred while obtaining component version.")
@@ -103,39 +155,62 @@ def get_component_version(component_id: int, version_id: int):
 
 
 @router.get("/{component_id}/all-versions", summary="Obtain all versions of a component")
-def get_version_list(component_id: int):
+async def get_version_list(component_id: int,
+                           limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                           after: Optional[str] = None):
     '''
-    Endpoint to get all versions for a component.
+    Endpoint to get the versions of a component, newest first, one page at a time.
+
+    Pass the `next_after` token of a response as `after` to read the next page;
+    it is null on the last page.
     '''
 
     logger.info(f"Getting all versions for component id {component_id}")
 
+    # Validate the page token before touching the database
+    after_version = decode_after(after)
+
     try:
-        versions = get_all_versions_from_db(component_id)
+        versions, next_after = await component_versions_db.get_all_versions_from_db(component_id, limit, after_version,
+                                                                                raw=JSONB_PASSTHROUGH)
 
-        return {"status": "Obtained all versions",
-                "versions": versions }
+        return FastJSONResponse({"status": "Obtained all versions",
+                                 "versions": versions,
+                                 "next_after": next_after})
 
     except HTTPException:
         logger.warning("HTTPException while obtaining all versions of the component.")
+        raise
 
     except Exception as e:
         logger.error(f"Error obtaining version list for component {component_id}: {str(e)}")
 
 
 @router.get("/{component_id}/versions", summary="Obtain latest version of a component")
-def get_latest_version_from_db(component_id: int):
+async def get_latest_version_from_db(component_id: int, request: Request):
     '''
     Endpoint to obtain the latest version of a component
+
+    The response carries an ETag (it changes when a version is added, updated
+    or deleted). If the If-None-Match header matches it, returns an empty 304.
     '''
 
     logger.info(f"Obtaining latest version for component id {component_id}")
 
     try:
-        component = get_latest_component_version_from_db(component_id)
+        # Conditional GET: only the id and last update are needed to answer it
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            stamp = await component_versions_db.get_component_version_stamp(component_id)
+            etag = version_etag(stamp)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
 
-        return {"status": "Component version obtained",
-                "component": component}
+        component = await component_versions_db.get_latest_component_version_from_db(component_id, raw=JSONB_PASSTHROUGH)
+
+        return FastJSONResponse({"status": "Component version obtained",
+                                 "component": component},
+                                headers={"ETag": version_etag(component)})
 
     except HTTPException:
         logger.warning("HTTPException while obtaining the latest version...")
@@ -145,9 +220,37 @@ def get_latest_version_from_db(component_id: int):
         logger.error(f"Error obtaining latest version of component {component_id}: {str(e)}")
 
 
+@router.get("/{component_id}/versions/{version_id}/resolved", summary="Obtain a version of a component resolved over its base components")
+@router.get("/{component_id}/resolved", summary="Obtain the latest active version of a component resolved over its base components")
+async def get_resolved_component(component_id: int, version_id: Optional[int] = None):
+    '''
+    Endpoint to get a component version with everything it inherits through base_component_id.
+
+    default_props, validation_config and service_bindings are deep merged from the
+    root base component down to this one (nearer components win). Base components
+    contribute their latest active version; "chain" lists the versions used.
+    '''
+
+    logger.info(f"Resolving version {version_id or 'latest'} of component with id {component_id}")
+
+    try:
+        resolved = await component_resolution_db.get_resolved_component_from_db(component_id, version_id)
+
+        return FastJSONResponse({"status": "Component resolved",
+                                 "component": resolved})
+
+    except HTTPException:
+        logger.warning("HTTPException occurred while resolving component.")
+        raise
+
+    except Exception as e:
+        logger.error(f"Error resolving component {component_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error resolving component: {str(e)}")
+
+
 @router.delete("/{component_id}/versions/{version_id}", summary="Delete a specific version of a component")
 @router.delete("/{component_id}/versions", summary="Delete the latest version of a component")
-def delete_component_version(component_id: int, version_id: int = None):
+async def delete_component_version(component_id: int, version_id: int = None):
     '''
     Endpoint to delete a particular version of a component (without eliminating the component).
 
@@ -162,7 +265,7 @@ def delete_component_version(component_id: int, version_id: int = None):
             logger.info(f"Deleting version {version_id} of component with id {component_id}")
             
             # Call delete
-            mensaje = delete_component_version_from_db(component_id, version_id)
+            mensaje = await component_versions_db.delete_component_version_from_db(component_id, version_id)
             
             # Return result
             return mensaje
@@ -174,7 +277,7 @@ def delete_component_version(component_id: int, version_id: int = None):
             logger.info(f"Deleting latest version of component with id {component_id}")
             
             # Call delete
-            message = delete_lastest_version_from_db(component_id)
+            message = await component_versions_db.delete_lastest_version_from_db(component_id)
             
             # Return message
             return message
@@ -188,7 +291,7 @@ def delete_component_version(component_id: int, version_id: int = None):
 
 
 @router.delete("/{component_id}/all-versions", summary="Delete all versions of a component")
-def delete_all_versions(component_id: int):
+async def delete_all_versions(component_id: int):
     '''
     Method to delete all the versions of a particular component.
     '''
@@ -199,7 +302,7 @@ def delete_all_versions(component_id: int):
         logger.info(f"Deleting all versions for component id {component_id}")
 
         # Call database method        
-        message = delete_all_versions_from_db(component_id)
+        message = await component_versions_db.delete_all_versions_from_db(component_id)
 
         # Return response message.
         return message
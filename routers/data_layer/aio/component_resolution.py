@@ -0,0 +1,68 @@
+from db_handler import async_connection
+from fastapi import HTTPException
+from typing import Optional
+from logger import get_logger
+from cache import resolved_component_cache, LATEST
+from cpu_pool import cpu_pool
+from routers.data_layer.component_resolution import check_chain, merge_chain, resolution_query
+
+'''
+Async mirror of routers/data_layer/component_resolution.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+logger = get_logger(__name__)
+
+
+async def get_resolved_component_from_db(component_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve the definition of a component version merged with those of its base components.
+
+    Without version_number, the latest active version of the component is resolved.
+    '''
+
+    logger.info(f"Resolving component_id={component_id} version_number={version_number}")
+
+    # Served from the cache until a member of the chain changes
+    version = version_number if version_number is not None else LATEST
+    cached = resolved_component_cache.get(component_id, version)
+    if cached is not None:
+        return cached
+    generation = resolved_component_cache.generation(component_id)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Read the chain and the version of each member in one round trip
+            params = (component_id, version_number) if version_number is not None else (component_id,)
+            await cursor.execute(resolution_query(version_number), params)
+
+            chain = [dict(member) for member in await cursor.fetchall()]
+            check_chain(component_id, version_number, chain)
+
+        except HTTPException:
+            raise
+
+        # If an exception occurs
+        except Exception as e:
+            logger.error(f"Error resolving component {component_id}: {str(e)}", exc_info=True)
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error resolving component: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+    # Deep merge in the CPU pool, once the connection is back in the pool (rows sent as plain dicts)
+    resolved = await cpu_pool.run(merge_chain, component_id, chain)
+
+    # Keep it until the component or one of its ancestors changes
+    ancestors = [member['component_id'] for member in resolved['chain'][:-1]]
+    resolved_component_cache.set(component_id, version, resolved, generation, depends_on=ancestors)
+
+    return resolved
@@ -0,0 +1,570 @@
+from db_handler import async_connection
+from fastapi import HTTPException
+from models.component_models import ComponentVersion
+import json
+from logger import get_logger, payload
+from json_response import raw_json_columns
+from cache import component_version_cache, LATEST, variant
+from cache_bus import invalidation_cte
+from typing import Optional
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, split_page
+from routers.data_layer.component_versions import COMPONENT_VERSION_JSON_COLUMNS, component_version_columns, stored_definition
+
+'''
+Async mirror of routers/data_layer/component_versions.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+logger = get_logger(__name__)
+
+
+async def create_component_version(component_id: int, component_version: ComponentVersion):
+    """
+    Handle creation of new component version in the database.
+
+    Takes a ComponentVersion object as input and inserts it into the database.
+    Returns the newly created component version details.
+    """
+
+    # Log the start of the process
+    logger.info("Starting component version creation.")
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            definition = {
+                "default_props": component_version.default_props or {},
+                "validation_config": component_version.validation_config or {},
+                "service_bindings": component_version.service_bindings or {}
+            }
+
+            logger.debug("Component definition to be inserted: %s", payload(definition))
+
+            # Allocate the next version number and insert the version in a single statement.
+            # Incrementing the counter locks the component row, so concurrent creates for
+            # the same component queue up instead of reading the same MAX(version_number).
+            # The same statement tells the other workers to drop their cached versions (sent on commit).
+            notice, notice_params = invalidation_cte(component_version_cache, component_id)
+            await cursor.execute(f'''
+                WITH {notice},
+                next_version AS (
+                    UPDATE form_definition.components
+                    SET last_version_number = last_version_number + 1
+                    WHERE id = %s
+                    RETURNING id, last_version_number
+                )
+                INSERT INTO form_definition.component_versions (
+                           component_id,
+                           version_number,
+                           definition,
+                           default_props,
+                           validation_config,
+                           service_bindings,
+                           is_active,
+                           created_at,
+                           updated_at)
+                SELECT id, last_version_number, %s, %s, %s, %s, True, now(), now()
+                FROM next_version, notified
+                RETURNING {component_version_columns()};
+            ''', (*notice_params,
+                  component_id,
+                  stored_definition(definition),
+                  json.dumps(component_version.default_props),
+                  json.dumps(component_version.validation_config),
+                  json.dumps(component_version.service_bindings),
+                  ))
+
+            # Fetch the newly created component version
+            new_component_version = await cursor.fetchone()
+
+            # No row means the component does not exist
+            if new_component_version is None:
+                raise HTTPException(status_code=404, detail=f"Component with ID {component_id} not found.")
+
+            # Update input with the allocated version number. If the user provided one, it is ignored.
+            component_version.version_number = new_component_version['version_number']
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the cached versions of the component
+            component_version_cache.invalidate(component_id)
+
+            # Log the result of the creation
+            logger.info(f"Successfully created component version with ID: {new_component_version['id']}")
+
+            # Return the new component version details
+            return new_component_version
+
+        except HTTPException:
+            await conn.rollback()
+            raise
+
+        # If an exception occurs
+        except Exception as e:
+            # Log error
+            logger.error(f"Error creating component version: {str(e)}", exc_info=True)
+
+            # Rollback the transaction in case of error
+            await conn.rollback()
+
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error creating component version: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+# Method to update a component version
+async def update_component_version(component_id: int,
+                                   version_number: int,
+                                   component_version: ComponentVersion):
+    """
+    Handle updating an existing component version in the database.
+
+    Takes a component version ID and a ComponentVersion object as input.
+    Updates the corresponding component version in the database.
+    Returns the updated component version details.
+    """
+
+    # Log the start of the process
+    logger.info(f"Starting update for component id {component_id} with version number: {version_number}")
+
+    # Validate if version number is present, otherwise raise error
+    if not version_number:
+        error_msg = "Component version number must be provided for update."
+        logger.error(error_msg)
+        raise Exception(error_msg)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            definition = {
+                "default_props": component_version.default_props or {},
+                "validation_config": component_version.validation_config or {},
+                "service_bindings": component_version.service_bindings or {}
+            }
+
+            logger.debug("Component definition to be updated: %s", payload(definition))
+
+            # Update the existing component version in the database, addressing the row
+            # by (component_id, version_number) so the lookup and the update are one statement.
+            # Active status does not change.
+            # Version number does not change either (it's an update, not a new version).
+            # The same statement tells the other workers to drop their cached versions (sent on commit).
+            notice, notice_params = invalidation_cte(component_version_cache, component_id)
+            await cursor.execute(f'''
+                WITH {notice}
+                UPDATE form_definition.component_versions
+                SET definition = %s,
+                    default_props = %s,
+                    validation_config = %s,
+                    service_bindings = %s,
+                    is_active = true,
+                    updated_at = now()
+                FROM notified
+                WHERE component_id = %s AND version_number = %s
+                RETURNING {component_version_columns()};
+            ''', (*notice_params,
+                  stored_definition(definition),
+                  json.dumps(component_version.default_props),
+                  json.dumps(component_version.validation_config),
+                  json.dumps(component_version.service_bindings),
+                  component_id,
+                  version_number))
+
+            # Fetch the updated component version
+            updated_component_version = await cursor.fetchone()
+
+            # No row means there is no such version for this component
+            if updated_component_version is None:
+                logger.warning(f"Component version not found for component_id={component_id} and version_number={version_number}")
+                raise HTTPException(status_code=404,
+                                    detail=f"Component version not found for component_id={component_id} and version_number={version_number}")
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the cached versions of the component
+            component_version_cache.invalidate(component_id)
+
+            # Log the result of the update
+            logger.info(f"Successfully updated component version with ID: {updated_component_version['id']}")
+
+            # Return the updated component version details
+            return updated_component_version
+
+        except HTTPException:
+            await conn.rollback()
+            raise
+
+        # If an exception occurs
+        except Exception as e:
+            # Log error
+            logger.error(f"Error updating component version ID {component_version.id}: {str(e)}", exc_info=True)
+
+            # Rollback the transaction in case of error
+            await conn.rollback()
+
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error updating component version: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+# Method to obtain a component version
+async def get_component_version_from_db(component_id: int, version_number: int, raw: bool = False):
+    '''
+    Retrieve a component version from the database by component ID and version number.
+
+    With raw, the JSON columns are returned as RawJSON text (spliced as is into the response).
+    '''
+
+    logger.info(f"Retrieving component version for component_id={component_id} and version_number={version_number}")
+
+    # Versions almost never change once written: serve them from the cache when possible
+    cached = component_version_cache.get(component_id, variant(version_number, raw))
+    if cached is not None:
+        return cached
+    generation = component_version_cache.generation(component_id)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Retrieve the component version
+            await cursor.execute(f'''
+                SELECT {component_version_columns(raw)}
+                FROM form_definition.component_versions
+                WHERE component_id = %s AND version_number = %s;
+            ''', (component_id, version_number))
+
+            component_version = await cursor.fetchone()
+
+            if component_version is None:
+                logger.error(f"Component version not found for component_id={component_id} and version_number={version_number}")
+                raise Exception(f"Component version not found for component_id={component_id} and version_number={version_number}")
+
+            if raw:
+                component_version = raw_json_columns(component_version, COMPONENT_VERSION_JSON_COLUMNS)
+
+            # Keep it for the next reads
+            component_version_cache.set(component_id, variant(version_number, raw), component_version, generation)
+
+            # Return the component version details
+            return component_version
+
+        # If an exception occurs
+        except Exception as e:
+            logger.error(f"Error retrieving component version for component_id={component_id} and version_number={version_number}: {str(e)}", exc_info=True)
+            # Raise an exception to be handled by the caller
+            raise Exception(f"Error retrieving component version: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+# Method to obtain the latest version of a component
+async def get_latest_component_version_from_db(component_id: int, raw: bool = False):
+    '''
+    Retrieve the latest component version from the database by component ID.
+
+    With raw, the JSON columns are returned as RawJSON text (spliced as is into the response).
+    '''
+
+    logger.info(f"Retrieving latest component version for component_id={component_id}")
+
+    # Serve from the cache when possible (any new version invalidates it)
+    cached = component_version_cache.get(component_id, variant(LATEST, raw))
+    if cached is not None:
+        return cached
+    generation = component_version_cache.generation(component_id)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Retrieve the latest component version
+            await cursor.execute(f'''
+                SELECT {component_version_columns(raw)}
+                FROM form_definition.component_versions
+                WHERE component_id = %s
+                ORDER BY version_number DESC
+                LIMIT 1;
+            ''', (component_id,))
+
+            component_version = await cursor.fetchone()
+
+            if component_version is None:
+                logger.error(f"No component versions found for component_id={component_id}")
+                raise Exception(f"No component versions found for component_id={component_id}")
+
+            if raw:
+                component_version = raw_json_columns(component_version, COMPONENT_VERSION_JSON_COLUMNS)
+
+            # Keep it for the next reads, both as the latest and as its own version
+            component_version_cache.set(component_id, variant(LATEST, raw), component_version, generation)
+            component_version_cache.set(component_id, variant(component_version['version_number'], raw), component_version, generation)
+
+            # Return the latest component version details
+            return component_version
+
+        # If an exception occurs
+        except Exception as e:
+            logger.error(f"Error retrieving latest component version for component_id={component_id}: {str(e)}", exc_info=True)
+            # Raise an exception to be handled by the caller
+            raise Exception(f"Error retrieving latest component version: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+# Method to obtain the id and last update of a component version (ETag checks)
+async def get_component_version_stamp(component_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve only the id and updated_at of a component version (the latest one when
+    version_number is None), so conditional GETs do not read the JSON columns.
+
+    Uses the cached row when there is one. Returns None if the version does not exist.
+    '''
+
+    version = LATEST if version_number is None else version_number
+    cached = component_version_cache.get(component_id, version) or component_version_cache.get(component_id, variant(version, True))
+    if cached is not None:
+        return cached
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # The latest version, or the one asked for
+            if version_number is None:
+                await cursor.execute('''
+                    SELECT id, version_number, updated_at
+                    FROM form_definition.component_versions
+                    WHERE component_id = %s
+                    ORDER BY version_number DESC
+                    LIMIT 1;
+                ''', (component_id,))
+            else:
+                await cursor.execute('''
+                    SELECT id, version_number, updated_at
+                    FROM form_definition.component_versions
+                    WHERE component_id = %s AND version_number = %s;
+                ''', (component_id, version_number))
+
+            return await cursor.fetchone()
+
+        except Exception as e:
+            logger.error(f"Error retrieving the stamp of version {version_number} of component {component_id}: {str(e)}")
+            raise Exception(f"Error retrieving component version: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+# Method to obtain all versions of a component
+async def get_all_versions_from_db(component_id: int, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                                   raw: bool = False):
+    '''
+    Retrieve the versions of the component, newest first, one page at a time.
+
+    Returns up to `limit` versions with a version number lower than `after`,
+    and the token for the next page (None on the last page).
+    With raw, the JSON columns are returned as RawJSON text.
+    '''
+
+    logger.info(f"Retrieving all component versions for component_id={component_id}")
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Execute query (one extra row tells whether there is a next page)
+            await cursor.execute(f'''
+                SELECT {component_version_columns(raw)}
+                FROM form_definition.component_versions
+                WHERE component_id = %s AND version_number < %s
+                ORDER BY version_number DESC
+                LIMIT %s;
+            ''', (component_id, after if after is not None else 2147483647, limit + 1))
+
+            # Get one page of versions
+            components = await cursor.fetchall()
+
+            if raw:
+                components = [raw_json_columns(row, COMPONENT_VERSION_JSON_COLUMNS) for row in components]
+
+            # Return the version list and the next page token
+            return split_page(components, limit, "version_number")
+
+        except Exception as e:
+            logger.error(f"Error retrieving the version list for component {component_id}: {str(e)}")
+            raise Exception(f"Error retrieving version list: {str(e)}")
+
+        finally:
+            await cursor.close()
+
+
+# Method to delete a specific version of a component
+async def delete_component_version_from_db(component_id: int, version_id: int):
+    '''
+    Delete a particular component version. Physical delete (row is eliminated)
+    '''
+
+    logger.info(f"Deleting from database component version {version_id} for component_id={component_id}")
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Delete row, telling the other workers to drop their cached versions (sent on commit)
+            notice, notice_params = invalidation_cte(component_version_cache, component_id)
+            await cursor.execute(f'''
+                WITH {notice}
+                DELETE FROM form_definition.component_versions
+                USING notified
+                WHERE component_id = %s
+                AND version_number = %s
+                RETURNING component_id, version_number;
+            ''', (*notice_params, component_id, version_id))
+
+            # Obtain info of deleted row
+            deleted_row = await cursor.fetchone()
+
+            # If nothing was deleted, log a warning and raise exception
+            if not deleted_row:
+                logger.warning(f"No record found for version {version_id} for component with id {component_id}")
+                raise Exception(f"Version {version_id} not found for component with ID {component_id}.")
+
+            # Log success (only happens if deletion worked)
+            logger.info(f"Successfully deleted version {version_id} of component with id {component_id}")
+
+            # Commit changes
+            await conn.commit()
+
+            # Drop the cached versions of the component
+            component_version_cache.invalidate(component_id)
+
+            # Return message
+            return {"status": "Version successfully deleted",
+                    "message": f"Version {version_id} for component {component_id} deleted."}
+
+        except Exception as e:
+            logger.error(f"Failed to delete version {version_id} of component with id {component_id}")
+            await conn.rollback()
+            raise Exception(f"Error deleting component version: {str(e)}")
+
+        finally:
+            await cursor.close()
+
+
+# Method to delete the latest version of a component
+async def delete_lastest_version_from_db(component_id: int):
+    '''
+    Delete the latest version of the component.
+
+    Uses the generic method delete_component_version_from_db which takes a component and
+    a version number. First, it retrieves the right version. If no version is found, raises exception.
+    '''
+
+    # Find latest version
+    version = await get_latest_component_version_from_db(component_id)
+
+    if not version:
+        logger.warning(f"No version was found for component id {component_id}")
+        raise Exception(f"No version found for component id {component_id}")
+
+    # Obtain the version number
+    version_number = version['version_number']
+    logger.info(f"Latest component version is {version_number}... attempting to delete.")
+
+    # Call delete method that is already generic for any version
+    return await delete_component_version_from_db(component_id, version_number)
+
+
+async def delete_all_versions_from_db(component_id: int):
+    '''
+    Delete all versions of a particular component. Physical delete (row is eliminated)
+    '''
+
+    logger.info(f"Attempting to delete all versions of component id {component_id}")
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        cursor = conn.cursor()
+
+        try:
+            # Delete rows, telling the other workers to drop their cached versions (sent on commit)
+            notice, notice_params = invalidation_cte(component_version_cache, component_id)
+            await cursor.execute(f'''
+                WITH {notice}
+                DELETE FROM form_definition.component_versions
+                USING notified
+                WHERE component_id = %s
+                RETURNING component_id, version_number;
+            ''', (*notice_params, component_id))
+
+            deleted_rows = await cursor.fetchall()
+
+            if not deleted_rows:
+                logger.warning(f"No versions found for component id {component_id}")
+                raise Exception(f"No versions found for component id {component_id}")
+
+            # Obtain number of deleted rows
+            number_of_rows = len(deleted_rows)
+
+            # Obtain version numbers
+            versions = [row['version_number'] for row in deleted_rows]
+
+            logger.info(f"A total of {number_of_rows} rows deleted")
+            logger.info(f"List of deleted versions: {versions}")
+
+            # Commit changes
+            await conn.commit()
+
+            # Drop the cached versions of the component
+            component_version_cache.invalidate(component_id)
+
+            # Return message
+            return {"status": "Version successfully deleted",
+                    "message": f"All versions for component {component_id} deleted."}
+
+        except Exception as e:
+            logger.warning(f"Delete operation failed for component with id {component_id}")
+            await conn.rollback()
+            raise Exception(f"Delete operation failed for component with id {component_id}")
+
+        finally:
+            await cursor.close()
@@ -0,0 +1,254 @@
+from db_handler import async_connection
+from models.component_models import Component
+from typing import Optional
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, split_page
+from cache import resolved_component_cache
+from cache_bus import invalidation_cte
+
+'''
+Async mirror of routers/data_layer/components.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+
+async def create_component(component: Component):
+    """
+    Handle creation of new component in the database.
+
+    Takes a Component object as input and inserts it into the database.
+    Returns the newly created component details.
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Insert the new component into the database
+            await cursor.execute('''
+                INSERT INTO form_definition.components (key, name, description, base_component_id, category, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, now(), now())
+                RETURNING id, key, name, description, base_component_id, category, created_at, updated_at;
+            ''', (component.key,
+                  component.name,
+                  component.description,
+                  getattr(component, "base_component_id", None),
+                  component.category
+                  ))
+
+            # Fetch the newly created component
+            new_component = await cursor.fetchone()
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Return the new component details
+            return new_component
+
+        # If an exception occurs
+        except Exception as e:
+            # Rollback the transaction in case of error
+            await conn.rollback()
+
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error creating component: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def update_component(component_id: int, component: Component):
+    """
+    Handle updating an existing component in the database.
+
+    Takes a component ID and a Component object as input.
+    Updates the corresponding component in the database.
+    Returns the updated component details.
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Update the existing component in the database
+            # Resolved definitions include the component: the same statement tells the other
+            # workers to drop them (sent on commit)
+            notice, notice_params = invalidation_cte(resolved_component_cache, component_id)
+            await cursor.execute(f'''
+                WITH {notice}
+                UPDATE form_definition.components
+                SET key = %s,
+                    name = %s,
+                    description = %s,
+                    updated_at = now()
+                FROM notified
+                WHERE id = %s
+                RETURNING id, key, name, description, created_at, updated_at;
+            ''', (*notice_params, component.key, component.name, component.description, component_id))
+
+            # Fetch the updated component
+            updated_component = await cursor.fetchone()
+
+            if not updated_component:
+                raise Exception(f"Component with ID {component_id} not found.")
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the resolved definitions that include it
+            resolved_component_cache.invalidate(component_id)
+
+            # Return the updated component details
+            return updated_component
+
+        # If an exception occurs
+        except Exception as e:
+            # Rollback the transaction in case of error
+            await conn.rollback()
+
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error updating component: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def get_component_by_id(component_id: int):
+    """
+    Retrieve a component from the database by its ID.
+
+    Takes a component ID as input and fetches the corresponding component from the database.
+    Returns the component details if found, otherwise raises an exception.
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Query to fetch the component by ID
+            await cursor.execute('''
+                SELECT id, key, name, description, base_component_id, category, created_at, updated_at
+                FROM form_definition.components
+                WHERE id = %s;
+            ''', (component_id,))
+
+            # Fetch the component
+            component = await cursor.fetchone()
+
+            if not component:
+                raise Exception(f"Component with ID {component_id} not found.")
+
+            # Return the component details
+            return component
+
+        # If an exception occurs
+        except Exception as e:
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error retrieving component: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def list_components_from_db(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
+    """
+    List the components in the database, one page at a time.
+
+    Fetches up to `limit` components ordered by id, starting after the component with id `after`.
+    Returns the page and the token for the next page (None on the last page).
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Query to fetch one page of components (one extra row tells whether there is a next page)
+            await cursor.execute('''
+                SELECT id, key, name, description, base_component_id, category, created_at, updated_at
+                FROM form_definition.components
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s;
+            ''', (after or 0, limit + 1))
+
+            # Return the page of components and the next page token
+            return split_page(await cursor.fetchall(), limit, "id")
+
+        # If an exception occurs
+        except Exception as e:
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error listing components: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def delete_component_from_db(component_id: int):
+    """
+    Delete a component from the database by its ID.
+
+    Takes a component ID as input and deletes the corresponding component from the database.
+    Returns a success message if deletion was successful, otherwise raises an exception.
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Execute the delete query
+            # Resolved definitions include the component: the same statement tells the other
+            # workers to drop them (sent on commit)
+            notice, notice_params = invalidation_cte(resolved_component_cache, component_id)
+            await cursor.execute(f'''
+                WITH {notice}
+                DELETE FROM form_definition.components
+                USING notified
+                WHERE id = %s
+                RETURNING id;
+            ''', (*notice_params, component_id))
+
+            # Check if any row was deleted
+            deleted_component = await cursor.fetchone()
+
+            if not deleted_component:
+                raise Exception(f"Component with ID {component_id} not found.")
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the resolved definitions that include it
+            resolved_component_cache.invalidate(component_id)
+
+            # Return a success message
+            return {"status": "success", "message": f"Component with ID {component_id} deleted."}
+
+        # If an exception occurs
+        except Exception as e:
+            # Rollback the transaction in case of error
+            await conn.rollback()
+
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error deleting component: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
@@ -0,0 +1,128 @@
+from db_handler import async_connection
+from cpu_pool import cpu_pool
+from routers.artifacts import build_artifact
+from fastapi import HTTPException
+from typing import Optional
+from logger import get_logger
+from cache import form_artifact_cache, LATEST
+from routers.data_layer.aio.form_render import get_form_render_bundle
+from routers.data_layer.form_artifacts import (STORE_ARTIFACT, artifact_from_row,
+                                               artifact_query, not_published, point_to_artifact,
+                                               publication_summary, serialize_bundle)
+
+'''
+Async mirror of routers/data_layer/form_artifacts.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+logger = get_logger(__name__)
+
+
+async def publish_form_version(form_id: int, version_number: int):
+    '''
+    Serialize a form version with its components, compress it and store it as its published artifact.
+
+    Raises a 409 when the version is written while it is being published.
+    '''
+
+    logger.info(f"Publishing version {version_number} of form {form_id}")
+
+    # Resolve the components and serialize everything once (JSON columns spliced as read)
+    bundle = await get_form_render_bundle(form_id, version_number, raw=True)
+
+    # Hash and compress it in the CPU pool (brotli and gzip are most of the cost)
+    artifact = await cpu_pool.run(build_artifact, serialize_bundle(bundle))
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Store the artifact (shared by every publication with the same content)
+            await cursor.execute(STORE_ARTIFACT, (artifact["content_hash"], artifact["body"],
+                                                  artifact["body_gzip"], artifact["body_brotli"]))
+
+            await cursor.execute(*point_to_artifact(artifact["content_hash"], form_id, version_number,
+                                                    bundle["form_version"]["updated_at"]))
+
+            if await cursor.fetchone() is None:
+                raise HTTPException(status_code=409,
+                                    detail=f"Version {version_number} of form {form_id} changed while being published.")
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the cached artifacts of the form
+            form_artifact_cache.invalidate(form_id)
+
+            logger.info(f"Version {version_number} of form {form_id} published as {artifact['content_hash']}")
+
+            return publication_summary(form_id, version_number, artifact)
+
+        except HTTPException:
+            await conn.rollback()
+            raise
+
+        # If an exception occurs
+        except Exception as e:
+            await conn.rollback()
+            logger.error(f"Error publishing version {version_number} of form {form_id}: {str(e)}", exc_info=True)
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error publishing form version: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def get_form_artifact(form_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve the published artifact of a form version.
+
+    Without version_number, the artifact of the latest published version is returned.
+    Served from the artifact cache when possible.
+    '''
+
+    # Published artifacts only change when the form is written or published again
+    version = version_number if version_number is not None else LATEST
+    cached = form_artifact_cache.get(form_id, version)
+    if cached is not None:
+        return cached
+    generation = form_artifact_cache.generation(form_id)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            params = (form_id, version_number) if version_number is not None else (form_id,)
+            await cursor.execute(artifact_query(version_number), params)
+
+            row = await cursor.fetchone()
+
+            if row is None:
+                raise not_published(form_id, version_number)
+
+            artifact = artifact_from_row(row)
+
+            # Keep it for the next reads
+            form_artifact_cache.set(form_id, version, artifact, generation)
+
+            return artifact
+
+        except HTTPException:
+            raise
+
+        # If an exception occurs
+        except Exception as e:
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error retrieving form artifact: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
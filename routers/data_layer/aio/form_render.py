@@ -0,0 +1,70 @@
+from db_handler import async_connection
+from fastapi import HTTPException
+from typing import Optional
+from logger import get_logger
+from cache import component_version_cache
+from routers.data_layer.aio.form_versions import get_form_version_from_db, get_latest_form_version_from_db
+from routers.data_layer.form_render import (batch_params, batch_query, build_bundle, cached_references,
+                                            collect_component_references, form_schema, store_batch)
+
+'''
+Async mirror of routers/data_layer/form_render.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+logger = get_logger(__name__)
+
+
+async def get_form_render_bundle(form_id: int, version_number: Optional[int] = None, raw: bool = False):
+    '''
+    Retrieve a form version and every component version its schema references.
+
+    Without version_number, the latest version of the form is used. With raw,
+    the JSON columns are returned as RawJSON text (spliced as is into the response).
+    '''
+
+    logger.info(f"Building render bundle for form_id={form_id} version_number={version_number}")
+
+    # The form version itself (served from the version cache when possible)
+    if version_number is not None:
+        form_version = await get_form_version_from_db(form_id, version_number, raw=raw)
+    else:
+        form_version = await get_latest_form_version_from_db(form_id, raw=raw)
+
+    references = collect_component_references(form_schema(form_version))
+
+    # Only the references not in the cache go to the database
+    found, misses = cached_references(references, raw)
+    if not misses:
+        return build_bundle(form_version, references, found)
+
+    generation = component_version_cache.generation()
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            logger.debug("Loading %d of %d component versions for form_id=%s", len(misses), len(references), form_id)
+
+            # Load every missing component version in one query
+            await cursor.execute(batch_query(raw), batch_params(misses))
+            store_batch(await cursor.fetchall(), found, generation, raw)
+
+            return build_bundle(form_version, references, found)
+
+        except HTTPException:
+            raise
+
+        # If an exception occurs
+        except Exception as e:
+            logger.error(f"Error building render bundle for form {form_id}: {str(e)}", exc_info=True)
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error building render bundle: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
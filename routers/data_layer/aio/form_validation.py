@@ -0,0 +1,39 @@
+from typing import Optional
+from logger import get_logger
+from cache import form_validator_cache, LATEST
+from validation_engine import FormValidator
+from routers.data_layer.aio.form_render import get_form_render_bundle
+from routers.data_layer.form_validation import compile_bundle, validator_dependencies
+
+'''
+Async mirror of routers/data_layer/form_validation.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+logger = get_logger(__name__)
+
+
+async def get_form_validator(form_id: int, version_number: Optional[int] = None) -> FormValidator:
+    '''
+    Compiled validator of a form version (of the latest version when version_number is None).
+
+    Served from the validator cache when possible.
+    '''
+
+    version = version_number if version_number is not None else LATEST
+    cached = form_validator_cache.get(("form", form_id), version)
+    if cached is not None:
+        return cached
+    generation = form_validator_cache.generation()
+
+    logger.info(f"Compiling validator for form_id={form_id} version_number={version_number}")
+
+    bundle = await get_form_render_bundle(form_id, version_number)
+    validator = compile_bundle(bundle)
+
+    # Keep it until the form or one of its components changes
+    form_validator_cache.set(("form", form_id), version, validator, generation,
+                             depends_on=validator_dependencies(bundle))
+
+    return validator
@@ -0,0 +1,303 @@
+from db_handler import async_connection
+from fastapi import HTTPException
+from models.form_models import FormVersion
+import json
+from typing import Optional
+from logger import get_logger
+from json_response import raw_json_columns
+from cache import form_version_cache, LATEST, variant
+from cache_bus import invalidation_cte
+from routers.data_layer.form_versions import FORM_VERSION_JSON_COLUMNS, form_version_columns
+
+'''
+Async mirror of routers/data_layer/form_versions.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+# Initialize logger
+logger = get_logger(__name__)
+
+
+async def create_form_version(form_id: int, form_version: FormVersion):
+    '''
+    Method to create a new version of the form in the database.
+
+    It uses the next available version number for this particular form
+    (1 if there is no previous version)
+    '''
+    logger.info(f"Starting version creation...")
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Allocate the next version number and insert the version in a single statement.
+            # Incrementing the counter locks the form row, so concurrent creates for
+            # the same form queue up instead of reading the same MAX(version_number).
+            # The same statement tells the other workers to drop their cached versions (sent on commit).
+            notice, notice_params = invalidation_cte(form_version_cache, form_id)
+            await cursor.execute(f'''
+                WITH {notice},
+                next_version AS (
+                    UPDATE form_definition.forms
+                    SET last_version_number = last_version_number + 1
+                    WHERE id = %s
+                    RETURNING id, last_version_number
+                )
+                INSERT INTO form_definition.form_versions (
+                           form_id,
+                           version_number,
+                           key,
+                           schema,
+                           is_active,
+                           created_at,
+                           updated_at)
+                SELECT id, last_version_number, %s, %s, True, now(), now()
+                FROM next_version, notified
+                RETURNING *
+            ''', (*notice_params,
+                  form_id,
+                  form_version.key,
+                  json.dumps(form_version.schema),
+                  ))
+
+            # Fetch the newly created form version and row id
+            new_version = await cursor.fetchone()
+
+            # No row means the form does not exist
+            if new_version is None:
+                raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
+
+            new_id = new_version['id']
+            next_version = new_version['version_number']
+
+            # Update input with the allocated version number
+            form_version.version_number = next_version
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the cached versions of the form
+            form_version_cache.invalidate(form_id)
+
+            # Log the result
+            logger.info(f"Row with id={new_id} created to store version {next_version} of form {form_id}")
+
+            # Return the new form version details
+            return new_version
+
+        except HTTPException:
+            await conn.rollback()
+            raise
+
+        except Exception as e:
+            logger.error(f"Error creating form version: {str(e)}")
+            await conn.rollback()
+            raise Exception(f"Error creating form version for form {form_id}")
+
+        finally:
+            logger.info("Ending execution of version creation (success or failure)...")
+            await cursor.close()
+
+
+async def update_form_version(form_id: int, version_id: int, form_version: FormVersion):
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # Update the row addressed by (form_id, version_number) in a single statement,
+            # which also tells the other workers to drop their cached versions (sent on commit)
+            notice, notice_params = invalidation_cte(form_version_cache, form_id)
+            await cursor.execute(f'''
+                WITH {notice}
+                UPDATE form_definition.form_versions
+                SET key = %s,
+                    schema = %s,
+                    is_active = true,
+                    artifact_hash = NULL,
+                    updated_at = now()
+                FROM notified
+                WHERE form_id = %s AND version_number = %s
+                RETURNING form_versions.*;
+            ''', (*notice_params,
+                  form_version.key,
+                  json.dumps(form_version.schema),
+                  form_id,
+                  version_id))
+
+            # Fetch the updated form version
+            new_version = await cursor.fetchone()
+
+            # No row means there is no such version for this form
+            if new_version is None:
+                logger.warning("Version not found.")
+                raise HTTPException(status_code=404, detail=f"Version {version_id} to update form {form_id} not found.")
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Drop the cached versions of the form
+            form_version_cache.invalidate(form_id)
+
+            # Log the results
+            logger.info(f"Version {version_id} of form {form_id} updated")
+
+            # Return the updated form version details
+            return new_version
+
+        except HTTPException:
+            await conn.rollback()
+            raise
+
+        except Exception as e:
+            await conn.rollback()
+            raise Exception(f"Error updating form version: {str(e)}")
+
+        finally:
+            await cursor.close()
+
+
+async def get_form_version_from_db(form_id: int, version_number: int, raw: bool = False):
+    '''
+    Retrieve a form version by form ID and version number.
+
+    Served from the version cache when possible. With raw, the schema is
+    returned as RawJSON text (spliced as is into the response).
+    '''
+
+    # Versions almost never change once written: serve them from the cache when possible
+    cached = form_version_cache.get(form_id, variant(version_number, raw))
+    if cached is not None:
+        return cached
+    generation = form_version_cache.generation(form_id)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            await cursor.execute(f'''
+                SELECT {form_version_columns(raw)}
+                FROM form_definition.form_versions
+                WHERE form_id = %s AND version_number = %s;
+            ''', (form_id, version_number))
+
+            form_version = await cursor.fetchone()
+
+            if form_version is None:
+                raise HTTPException(status_code=404, detail=f"Version {version_number} of form {form_id} not found.")
+
+            if raw:
+                form_version = raw_json_columns(form_version, FORM_VERSION_JSON_COLUMNS)
+
+            # Keep it for the next reads
+            form_version_cache.set(form_id, variant(version_number, raw), form_version, generation)
+
+            return form_version
+
+        except HTTPException:
+            raise
+
+        except Exception as e:
+            raise Exception(f"Error retrieving form version: {str(e)}")
+
+        finally:
+            await cursor.close()
+
+
+async def get_latest_form_version_from_db(form_id: int, raw: bool = False):
+    '''
+    Retrieve the latest version of a form.
+
+    Served from the version cache when possible (any write to the form invalidates it).
+    With raw, the schema is returned as RawJSON text.
+    '''
+
+    cached = form_version_cache.get(form_id, variant(LATEST, raw))
+    if cached is not None:
+        return cached
+    generation = form_version_cache.generation(form_id)
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            await cursor.execute(f'''
+                SELECT {form_version_columns(raw)}
+                FROM form_definition.form_versions
+                WHERE form_id = %s
+                ORDER BY version_number DESC
+                LIMIT 1;
+            ''', (form_id,))
+
+            form_version = await cursor.fetchone()
+
+            if form_version is None:
+                raise HTTPException(status_code=404, detail=f"No versions found for form {form_id}.")
+
+            if raw:
+                form_version = raw_json_columns(form_version, FORM_VERSION_JSON_COLUMNS)
+
+            # Keep it for the next reads, both as the latest and as its own version
+            form_version_cache.set(form_id, variant(LATEST, raw), form_version, generation)
+            form_version_cache.set(form_id, variant(form_version['version_number'], raw), form_version, generation)
+
+            return form_version
+
+        except HTTPException:
+            raise
+
+        except Exception as e:
+            raise Exception(f"Error retrieving latest form version: {str(e)}")
+
+        finally:
+            await cursor.close()
+
+
+async def get_form_version_stamp(form_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve only the id and updated_at of a form version (the latest one when
+    version_number is None), so conditional GETs do not read the schema.
+
+    Uses the cached row when there is one. Returns None if the version does not exist.
+    '''
+
+    version = LATEST if version_number is None else version_number
+    cached = form_version_cache.get(form_id, version) or form_version_cache.get(form_id, variant(version, True))
+    if cached is not None:
+        return cached
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # The latest version, or the one asked for
+            if version_number is None:
+                await cursor.execute('''
+                    SELECT id, version_number, updated_at
+                    FROM form_definition.form_versions
+                    WHERE form_id = %s
+                    ORDER BY version_number DESC
+                    LIMIT 1;
+                ''', (form_id,))
+            else:
+                await cursor.execute('''
+                    SELECT id, version_number, updated_at
+                    FROM form_definition.form_versions
+                    WHERE form_id = %s AND version_number = %s;
+                ''', (form_id, version_number))
+
+            return await cursor.fetchone()
+
+        except Exception as e:
+            raise Exception(f"Error retrieving form version: {str(e)}")
+
+        finally:
+            await cursor.close()
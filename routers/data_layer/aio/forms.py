@@ -0,0 +1,234 @@
+from models.form_models import Form
+from db_handler import async_connection
+from fastapi import HTTPException
+from typing import Optional
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, split_page
+from cache import form_version_cache
+from cache_bus import invalidation_cte
+
+'''
+Async mirror of routers/data_layer/forms.py (psycopg 3 async pool).
+
+Same queries, same return values and same errors as the sync module.
+'''
+
+
+async def create_form(form: Form):
+    """
+    Handle creation of new form in the database.
+
+    Takes a Form object as input and inserts it into the database.
+    Returns the newly created form details.
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Insert the new form into the database
+            await cursor.execute('''
+                INSERT INTO form_definition.forms (key, name, description, created_at, updated_at)
+                VALUES (%s, %s, %s, now(), now())
+                RETURNING id, key, name, description, created_at, updated_at;
+            ''', (form.key, form.name, form.description))
+
+            # Fetch the newly created form
+            new_form = await cursor.fetchone()
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Return the new form details
+            return new_form
+
+        # If an exception occurs
+        except Exception as e:
+            # Rollback the transaction in case of error
+            await conn.rollback()
+
+            # Raise the exception to be handled by the caller
+            raise Exception(f"Error creating form: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def update_form(form_id: int, udpate_key: bool, form: Form):
+    """
+    Handle updating an existing form in the database.
+
+    Takes a form ID and a Form object as input.
+    Updates the corresponding form in the database.
+    Returns the updated form details.
+
+    Parameter update_key indicates whether to update the 'key' field or keep the existing one.
+    """
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Update the form in a single statement. The key is only replaced when
+            # update_key is set; otherwise the stored key is kept.
+            await cursor.execute('''
+                UPDATE form_definition.forms
+                SET key = CASE WHEN %s THEN %s ELSE key END,
+                    name = %s,
+                    description = %s,
+                    updated_at = now()
+                WHERE id = %s
+                RETURNING id, key, name, description, created_at, updated_at;
+            ''', (udpate_key, form.key, form.name, form.description, form_id))
+
+            # Load updated form
+            updated_form = await cursor.fetchone()
+
+            # No row means the form does not exist
+            if updated_form is None:
+                raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
+
+            # Commit the transaction
+            await conn.commit()
+
+            # Return info
+            return updated_form
+
+        # If an exception occurs
+        except HTTPException:
+            await conn.rollback()
+            raise
+
+        except Exception as e:
+            # Rollback the transaction
+            await conn.rollback()
+
+            # Raise an exception to be handled by the caller
+            raise Exception(f"Error updating form: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def delete_form_from_db(form_id: int):
+    '''
+    Delete a form from the database.
+
+    Receives the form ID and deletes the corresponding form.
+    Returns a success message if deletion was successful.
+    '''
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # First check if the form exists
+            await cursor.execute('SELECT id FROM form_definition.forms WHERE id = %s;', (form_id,))
+            if not await cursor.fetchone():
+                raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
+
+            # If it exists, delete it, telling the other workers to drop their cached versions (sent on commit)
+            notice, notice_params = invalidation_cte(form_version_cache, form_id)
+            await cursor.execute(f'WITH {notice} DELETE FROM form_definition.forms USING notified WHERE id = %s;',
+                                 (*notice_params, form_id))
+
+            # Commit changes
+            await conn.commit()
+
+            # The versions went with the form (ON DELETE CASCADE)
+            form_version_cache.invalidate(form_id)
+
+            return {"status": "success", "message": f"Form with id={form_id} deleted"}
+
+        except HTTPException:
+            raise
+
+        except Exception as e:
+            # Rollback in case of error
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=f"Error deleting form: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def get_form_from_db(form_id: int):
+    '''
+    Retrieve form details from the database.
+
+    Receives the form ID and returns the corresponding form details.
+    '''
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Fetch the form with the given ID
+            await cursor.execute('SELECT id, key, name, description, created_at, updated_at FROM form_definition.forms WHERE id = %s;', (form_id,))
+            form = await cursor.fetchone()
+
+            if form is None:
+                raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
+
+            return {"status": "success", "form": form}
+
+        except HTTPException:
+            raise
+
+        except Exception as e:
+            # Raise an HTTP exception
+            raise HTTPException(status_code=500, detail=f"Error retrieving form: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
+
+
+async def list_forms(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
+    '''
+    List the forms in the database, one page at a time.
+
+    Returns up to `limit` forms ordered by id, starting after the form with id `after`,
+    and the token for the next page (None on the last page).
+    '''
+
+    # Get a connection from the async pool
+    async with async_connection() as conn:
+
+        # Create a cursor
+        cursor = conn.cursor()
+
+        try:
+            # Fetch one page of forms (one extra row tells whether there is a next page)
+            await cursor.execute('''
+                SELECT id, key, name, description, created_at, updated_at
+                FROM form_definition.forms
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s;
+            ''', (after or 0, limit + 1))
+            forms, next_after = split_page(await cursor.fetchall(), limit, "id")
+
+            return {"status": "success", "forms": forms, "next_after": next_after}
+
+        except Exception as e:
+            # Raise an HTTP exception
+            raise HTTPException(status_code=500, detail=f"Error listing forms: {str(e)}")
+
+        finally:
+            # Close the cursor (the connection goes back to the pool)
+            await cursor.close()
@@ -0,0 +1,171 @@
+from db_handler import get_connection, release_connection
+from fastapi import HTTPException
+from typing import Optional
+from logger import get_logger
+from cache import resolved_component_cache, LATEST
+from cpu_pool import cpu_pool
+
+'''
+Components resolved over their base_component_id inheritance chain.
+
+A component inherits the default_props, validation_config and
+service_bindings of its base component, which inherits those of its own
+base, and so on. The whole chain and the version of each member are read
+with one recursive query, and the three documents are deep merged from the
+base down to the requested component (the closer to it, the higher the
+precedence).
+
+The requested component contributes the requested version (its latest
+active version when none is given). Every ancestor contributes its latest
+active version, or nothing when it has none.
+
+Resolved definitions are memoized per (component_id, version) in the
+resolved component cache. Entries depend on every ancestor, and the cache is
+linked to the component version cache: any write to the versions of a member
+of the chain evicts them, in this worker and, through the invalidation bus,
+in the others.
+'''
+
+logger = get_logger(__name__)
+
+# Documents merged over the chain
+RESOLVED_COLUMNS = ("default_props", "validation_config", "service_bindings")
+
+
+def resolution_query(version_number: Optional[int]):
+    '''
+    Recursive query returning the chain of a component, base first, with the version each member contributes.
+
+    The path array stops the recursion if the chain ever loops.
+    '''
+    leaf_version = "AND cv.version_number = %s" if version_number is not None else "AND cv.is_active"
+
+    return f'''
+        WITH RECURSIVE chain AS (
+            SELECT id, key, name, base_component_id, 0 AS depth, ARRAY[id] AS path
+            FROM form_definition.components
+            WHERE id = %s
+            UNION ALL
+            SELECT c.id, c.key, c.name, c.base_component_id, chain.depth + 1, chain.path || c.id
+            FROM form_definition.components c
+            JOIN chain ON c.id = chain.base_component_id
+            WHERE c.id <> ALL(chain.path)
+        )
+        SELECT chain.id AS component_id, chain.key, chain.name, chain.depth,
+               v.version_number, v.default_props, v.validation_config, v.service_bindings
+        FROM chain
+        LEFT JOIN LATERAL (
+            SELECT cv.version_number, cv.default_props, cv.validation_config, cv.service_bindings
+            FROM form_definition.component_versions cv
+            WHERE cv.component_id = chain.id
+              AND (chain.depth > 0 AND cv.is_active OR chain.depth = 0 {leaf_version})
+            ORDER BY cv.version_number DESC
+            LIMIT 1
+        ) v ON true
+        ORDER BY chain.depth DESC;
+    '''
+
+
+def deep_merge(base, override):
+    '''
+    Merge override into base, recursively for nested objects.
+
+    Values other than objects (lists included) are replaced as a whole.
+    Neither argument is modified.
+    '''
+    if not isinstance(base, dict) or not isinstance(override, dict):
+        return override
+
+    merged = dict(base)
+    for key, value in override.items():
+        merged[key] = deep_merge(merged[key], value) if key in merged else value
+    return merged
+
+
+def check_chain(component_id: int, version_number: Optional[int], chain: list):
+    '''Raise a 404 when the rows of the resolution query miss the component or the requested version.'''
+    if not chain:
+        raise HTTPException(status_code=404, detail=f"Component with ID {component_id} not found.")
+
+    if chain[-1]['version_number'] is None:
+        wanted = f"version {version_number}" if version_number is not None else "active version"
+        raise HTTPException(status_code=404, detail=f"No {wanted} found for component_id={component_id}")
+
+
+def merge_chain(component_id: int, chain: list):
+    '''
+    Build the resolved definition from the checked rows of the resolution query (base first).
+
+    CPU bound on deep chains and large documents: run through the CPU pool.
+    '''
+    resolved = {column: {} for column in RESOLVED_COLUMNS}
+    for member in chain:
+        for column in RESOLVED_COLUMNS:
+            if member[column]:
+                resolved[column] = deep_merge(resolved[column], member[column])
+
+    return {
+        "component_id": component_id,
+        "version_number": chain[-1]['version_number'],
+        "chain": [{"component_id": member['component_id'],
+                   "key": member['key'],
+                   "name": member['name'],
+                   "version_number": member['version_number']}
+                  for member in chain],
+        "definition": dict(resolved),
+        **resolved,
+    }
+
+
+def get_resolved_component_from_db(component_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve the definition of a component version merged with those of its base components.
+
+    Without version_number, the latest active version of the component is resolved.
+    '''
+
+    logger.info(f"Resolving component_id={component_id} version_number={version_number}")
+
+    # Served from the cache until a member of the chain changes
+    version = version_number if version_number is not None else LATEST
+    cached = resolved_component_cache.get(component_id, version)
+    if cached is not None:
+        return cached
+    generation = resolved_component_cache.generation(component_id)
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        # Read the chain and the version of each member in one round trip
+        params = (component_id, version_number) if version_number is not None else (component_id,)
+        cursor.execute(resolution_query(version_number), params)
+
+        chain = [dict(member) for member in cursor.fetchall()]
+        check_chain(component_id, version_number, chain)
+
+    except HTTPException:
+        raise
+
+    # If an exception occurs
+    except Exception as e:
+        logger.error(f"Error resolving component {component_id}: {str(e)}", exc_info=True)
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error resolving component: {str(e)}")
+
+    finally:
+        # Close the cursor and connection
+        cursor.close()
+        release_connection(conn)
+
+    # Deep merge in the CPU pool, once the connection is back in the pool (rows sent as plain dicts)
+    resolved = cpu_pool.call(merge_chain, component_id, chain)
+
+    # Keep it until the component or one of its ancestors changes
+    ancestors = [member['component_id'] for member in resolved['chain'][:-1]]
+    resolved_component_cache.set(component_id, version, resolved, generation, depends_on=ancestors)
+
+    return resolved
@@ -1,11 +1,49 @@
-from db_handler import get_connection, close_connection
+from db_handler import get_connection, release_connection
+from psycopg2.extras import execute_values
 from fastapi import HTTPException
 from models.component_models import ComponentVersion
+from typing import List
 import json
-from logger import get_logger
+import os
+from logger import get_logger, payload
+from json_response import raw_json_columns
+from cache import component_version_cache, LATEST, variant
+from cache_bus import invalidation_cte, invalidation_cte_many
+from typing import Optional
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, split_page
 
 logger = get_logger(__name__)
 
+# JSONB columns of component_versions (returned as raw JSON text in raw mode)
+COMPONENT_VERSION_JSON_COLUMNS = ("definition", "default_props", "validation_config", "service_bindings")
+
+# How definition is stored. "full" writes it next to default_props, validation_config
+# and service_bindings (each value twice). "compact" leaves it NULL and it is assembled
+# from those three columns at read time (see database/migrations/002_compact_component_definitions.sql).
+COMPACT_DEFINITIONS = os.getenv("COMPONENT_DEFINITION_STORAGE", "full").lower() == "compact"
+
+# The stored definition, or the one assembled from its parts on compact rows
+DEFINITION_EXPRESSION = '''COALESCE(definition, jsonb_build_object(
+    'default_props', COALESCE(NULLIF(default_props, 'null'::jsonb), '{}'::jsonb),
+    'validation_config', COALESCE(NULLIF(validation_config, 'null'::jsonb), '{}'::jsonb),
+    'service_bindings', COALESCE(NULLIF(service_bindings, 'null'::jsonb), '{}'::jsonb)))'''
+
+
+def component_version_columns(raw: bool = False) -> str:
+    '''Select list of a component version row, with the JSONB columns as text when raw.'''
+    expressions = {column: column for column in COMPONENT_VERSION_JSON_COLUMNS}
+    expressions["definition"] = DEFINITION_EXPRESSION
+
+    json_columns = ", ".join(f"({expression})::text AS {column}" if raw else f"{expression} AS {column}"
+                             for column, expression in expressions.items())
+    return f"id, component_id, version_number, {json_columns}, is_active, created_at, updated_at"
+
+
+def stored_definition(definition: dict):
+    '''Value written to the definition column (NULL in compact storage).'''
+    return None if COMPACT_DEFINITIONS else json.dumps(definition)
+
+
 def create_component_version(component_id: int, component_version: ComponentVersion):
     """
     Handle creation of new component version in the database.
@@ -24,23 +62,27 @@ def create_component_version(component_id: int, component_version: ComponentVers
     cursor = conn.cursor()
 
     try:
-        # Find next version number
-        next_version_number = _find_next_version_number(component_id, conn)
-        logger.debug(f"Next version number for component ID {component_id} is {next_version_number}") 
-        
-        # Update input with the correct next version number. If the user provided one, ignore it.
-        component_version.version_number = next_version_number
-
         definition = {
             "default_props": component_version.default_props or {},
             "validation_config": component_version.validation_config or {},
             "service_bindings": component_version.service_bindings or {}
         }
         
-        logger.debug(f"Component definition to be inserted: {definition}")
-
-        # Insert the new component version into the database
-        cursor.execute('''
+        logger.debug("Component definition to be inserted: %s", payload(definition))
+
+        # Allocate the next version number and insert the version in a single statement.
+        # Incrementing the counter locks the component row, so concurrent creates for
+        # the same component queue up instead of reading the same MAX(version_number).
+        # The same statement tells the other workers to drop their cached versions (sent on commit).
+        notice, notice_params = invalidation_cte(component_version_cache, component_id)
+        cursor.execute(f'''
+            WITH {notice},
+            next_version AS (
+                UPDATE form_definition.components
+                SET last_version_number = last_version_number + 1
+                WHERE id = %s
+                RETURNING id, last_version_number
+            )
             INSERT INTO form_definition.component_versions (
                        component_id,
                        version_number,
@@ -51,29 +93,43 @@ def create_component_version(component_id: int, component_version: ComponentVers
                        is_active,
                        created_at,
                        updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, True, now(), now())
-            RETURNING id, component_id, version_number, definition,
-                       default_props, validation_config, service_bindings, is_active, created_at, updated_at;
-        ''', (component_id,
-              component_version.version_number,
-              json.dumps(definition),
+            SELECT id, last_version_number, %s, %s, %s, %s, True, now(), now()
+            FROM next_version, notified
+            RETURNING {component_version_columns()};
+        ''', (*notice_params,
+              component_id,
+              stored_definition(definition),
               json.dumps(component_version.default_props),
               json.dumps(component_version.validation_config),
-              json.dumps(component_version.service_bindings), 
+              json.dumps(component_version.service_bindings),
               ))
 
         # Fetch the newly created component version
         new_component_version = cursor.fetchone()
 
+        # No row means the component does not exist
+        if new_component_version is None:
+            raise HTTPException(status_code=404, detail=f"Component with ID {component_id} not found.")
+
+        # Update input with the allocated version number. If the user provided one, it is ignored.
+        component_version.version_number = new_component_version['version_number']
+
         # Commit the transaction
         conn.commit()
 
+        # Drop the cached versions of the component
+        component_version_cache.invalidate(component_id)
+
         # Log the result of the creation
         logger.info(f"Successfully created component version with ID: {new_component_version['id']}")
 
         # Return the new component version details
         return new_component_version
 
+    except HTTPException:
+        conn.rollback()
+        raise
+
     # If an exception occurs
     except Exception as e:
         # Log error
@@ -88,30 +144,155 @@ def create_component_version(component_id: int, component_version: ComponentVers
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
-        logger.debug("Database connection closed.")
+        release_connection(conn)
+        logger.debug("Database connection returned to the pool.")
+
 
+# Method to create many component versions at once
+def bulk_create_component_versions(versions: List[ComponentVersion], report_errors: bool = False):
+    """
+    Handle creation of many component versions, for one or more components, in one transaction.
+
+    Version numbers are allocated in bulk: the counters of every component involved are
+    locked (in id order, so concurrent batches cannot deadlock), bumped by the number of
+    new versions in one statement, and all rows are inserted with one batched INSERT.
+    Versions of the same component get consecutive numbers in the order they were sent.
+
+    Items without a component_id fail the whole batch with a 422, and items pointing to a
+    missing component with a 404, unless report_errors is set: then they are skipped and
+    listed in "errors".
+    Returns the created rows and the per-item errors.
+    """
+
+    logger.info(f"Starting bulk creation of {len(versions)} component versions.")
+
+    errors = []
+
+    # Items without a parent component can be rejected before going to the database
+    valid_items = []
+    for index, component_version in enumerate(versions):
+        if component_version.component_id is None:
+            errors.append({"index": index, "component_id": None, "detail": "component_id is required"})
+        else:
+            valid_items.append((index, component_version))
+
+    if errors and not report_errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    # Get the connection to the database
+    conn = get_connection()
 
-# Internal helper to find next version number
-def _find_next_version_number(component_id: int, conn) -> int:
-    '''Find the next available version number for a given component ID.'''
+    # Create a cursor
     cursor = conn.cursor()
+
     try:
-        # Find next version number
+        component_ids = sorted({item.component_id for _, item in valid_items})
+
+        # Lock the counters of every component involved, always in the same order
         cursor.execute('''
-            SELECT COALESCE(MAX(version_number), 0) + 1 AS next_version
-            FROM form_definition.component_versions
-            WHERE component_id = %s;
-        ''', (component_id,))
-        result = cursor.fetchone()
-        return result['next_version']
-    
-    # If there is an error, raise exception
+            SELECT id, last_version_number
+            FROM form_definition.components
+            WHERE id = ANY(%s)
+            ORDER BY id
+            FOR UPDATE;
+        ''', (component_ids,))
+        last_numbers = {row['id']: row['last_version_number'] for row in cursor.fetchall()}
+
+        # Allocate consecutive numbers per component, in request order
+        rows = []
+        for index, component_version in valid_items:
+            component_id = component_version.component_id
+
+            if component_id not in last_numbers:
+                errors.append({"index": index, "component_id": component_id,
+                               "detail": f"Component with ID {component_id} not found."})
+                continue
+
+            last_numbers[component_id] += 1
+            component_version.version_number = last_numbers[component_id]
+
+            definition = {
+                "default_props": component_version.default_props or {},
+                "validation_config": component_version.validation_config or {},
+                "service_bindings": component_version.service_bindings or {}
+            }
+
+            rows.append((component_id,
+                         component_version.version_number,
+                         stored_definition(definition),
+                         json.dumps(component_version.default_props),
+                         json.dumps(component_version.validation_config),
+                         json.dumps(component_version.service_bindings)))
+
+        # Report errors in request order
+        errors.sort(key=lambda error: error["index"])
+
+        if errors and not report_errors:
+            raise HTTPException(status_code=404, detail=errors)
+
+        created = []
+
+        if rows:
+            # Store the new counters in one statement, which also tells the other
+            # workers to drop the cached versions of those components (sent on commit)
+            used_ids = sorted({row[0] for row in rows})
+            notice, notice_params = invalidation_cte_many(component_version_cache, used_ids)
+            cursor.execute(f'''
+                WITH {notice}
+                UPDATE form_definition.components AS c
+                SET last_version_number = v.last_version_number
+                FROM unnest(%s::int[], %s::int[]) AS v(id, last_version_number), notified
+                WHERE c.id = v.id;
+            ''', (*notice_params, used_ids, [last_numbers[component_id] for component_id in used_ids]))
+
+            # Insert every version with batched multi-row INSERTs
+            created = execute_values(cursor, f'''
+                INSERT INTO form_definition.component_versions (
+                           component_id,
+                           version_number,
+                           definition,
+                           default_props,
+                           validation_config,
+                           service_bindings,
+                           is_active,
+                           created_at,
+                           updated_at)
+                VALUES %s
+                RETURNING {component_version_columns()};
+            ''', rows,
+                template="(%s, %s, %s::jsonb, %s::jsonb, %s::jsonb, %s::jsonb, True, now(), now())",
+                page_size=1000,
+                fetch=True)
+
+        # Commit the transaction
+        conn.commit()
+
+        # Drop the cached versions of every component that got new versions
+        for component_id in {row[0] for row in rows}:
+            component_version_cache.invalidate(component_id)
+
+        logger.info(f"Bulk created {len(created)} component versions ({len(errors)} items rejected).")
+
+        return {"created": created, "errors": errors}
+
+    except HTTPException:
+        conn.rollback()
+        raise
+
+    # If an exception occurs
     except Exception as e:
-        raise Exception(f"Error finding next version number: {str(e)}")
-    
+        logger.error(f"Error in bulk creation of component versions: {str(e)}", exc_info=True)
+
+        # Rollback the whole batch
+        conn.rollback()
+
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error creating component versions: {str(e)}")
+
     finally:
+        # Close the cursor and connection
         cursor.close()
+        release_connection(conn)
 
 
 # Method to update a component version
@@ -148,48 +329,59 @@ def update_component_version(component_id: int,
             "service_bindings": component_version.service_bindings or {}
         }
 
-        logger.debug(f"Component definition to be updated: {definition}")
+        logger.debug("Component definition to be updated: %s", payload(definition))
 
-        # Get id of the record to update
-        record_id = _get_record_id(component_id, version_number, conn)
-        logger.debug(f"Record ID to be updated: {record_id}")
-
-        # Update the existing component version in the database
+        # Update the existing component version in the database, addressing the row
+        # by (component_id, version_number) so the lookup and the update are one statement.
         # Active status does not change.
         # Version number does not change either (it's an update, not a new version).
-        cursor.execute('''
+        # The same statement tells the other workers to drop their cached versions (sent on commit).
+        notice, notice_params = invalidation_cte(component_version_cache, component_id)
+        cursor.execute(f'''
+            WITH {notice}
             UPDATE form_definition.component_versions
-            SET component_id = %s,
-                version_number = %s,
-                definition = %s,
+            SET definition = %s,
                 default_props = %s,
                 validation_config = %s,
                 service_bindings = %s,
                 is_active = true,
                 updated_at = now()
-            WHERE id = %s
-            RETURNING id, component_id, version_number, definition,
-                      default_props, validation_config, service_bindings, is_active, created_at, updated_at;
-        ''', (component_id,
-              version_number,
-              json.dumps(definition),
+            FROM notified
+            WHERE component_id = %s AND version_number = %s
+            RETURNING {component_version_columns()};
+        ''', (*notice_params,
+              stored_definition(definition),
               json.dumps(component_version.default_props),
               json.dumps(component_version.validation_config),
               json.dumps(component_version.service_bindings),
-              record_id))
+              component_id,
+              version_number))
 
         # Fetch the updated component version
         updated_component_version = cursor.fetchone()
 
+        # No row means there is no such version for this component
+        if updated_component_version is None:
+            logger.warning(f"Component version not found for component_id={component_id} and version_number={version_number}")
+            raise HTTPException(status_code=404,
+                                detail=f"Component version not found for component_id={component_id} and version_number={version_number}")
+
         # Commit the transaction
         conn.commit()
 
+        # Drop the cached versions of the component
+        component_version_cache.invalidate(component_id)
+
         # Log the result of the update
         logger.info(f"Successfully updated component version with ID: {updated_component_version['id']}")
 
         # Return the updated component version details
         return updated_component_version
 
+    except HTTPException:
+        conn.rollback()
+        raise
+
     # If an exception occurs
     except Exception as e:
         # Log error
@@ -204,47 +396,25 @@ def update_component_version(component_id: int,
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
-# Helper method to get record ID
-def _get_record_id(component_id: int, version_number: int, conn) -> int:
-    '''
-    Internal helper to get the database record ID for a given component ID and version number.
-    '''
-
-    cursor = conn.cursor()
-
-    try:
-        # Retrieve the record ID
-        cursor.execute('''
-            SELECT id FROM form_definition.component_versions
-            WHERE component_id = %s AND version_number = %s;
-        ''', (component_id, version_number))
-
-        record = cursor.fetchone()
-
-        if record is None:
-            raise Exception(f"Component version not found for component_id={component_id} and version_number={version_number}")
-
-        return record['id']
-
-    # If an exception occurs
-    except Exception as e:
-        raise Exception(f"Error retrieving record ID: {str(e)}")
-    
-    finally:
-        cursor.close()  
-        
-
 # Method to obtain a component version
-def get_component_version_from_db(component_id: int, version_number: int):
+def get_component_version_from_db(component_id: int, version_number: int, raw: bool = False):
     '''
     Retrieve a component version from the database by component ID and version number.
+
+    With raw, the JSON columns are returned as RawJSON text (spliced as is into the response).
     '''
 
     logger.info(f"Retrieving component version for component_id={component_id} and version_number={version_number}")
 
+    # Versions almost never change once written: serve them from the cache when possible
+    cached = component_version_cache.get(component_id, variant(version_number, raw))
+    if cached is not None:
+        return cached
+    generation = component_version_cache.generation(component_id)
+
     # Get the connection to the database
     conn = get_connection()
 
@@ -252,11 +422,10 @@ def get_component_version_from_db(component_id: int, version_number: int):
     cursor = conn.cursor()
 
     try:
-        logger.debug(f"Executing query to retrieve component version for component_id={component_id} and version_number={version_number}")
+        logger.debug("Executing query to retrieve component version for component_id=%s and version_number=%s", component_id, version_number)
         # Retrieve the component version
-        cursor.execute('''
-            SELECT id, component_id, version_number, definition,
-                   default_props, validation_config, service_bindings, is_active, created_at, updated_at
+        cursor.execute(f'''
+            SELECT {component_version_columns(raw)}
             FROM form_definition.component_versions
             WHERE component_id = %s AND version_number = %s;
         ''', (component_id, version_number))
@@ -267,6 +436,12 @@ def get_component_version_from_db(component_id: int, version_number: int):
             logger.error(f"Component version not found for component_id={component_id} and version_number={version_number}")
             raise Exception(f"Component version not found for component_id={component_id} and version_number={version_number}")
 
+        if raw:
+            component_version = raw_json_columns(component_version, COMPONENT_VERSION_JSON_COLUMNS)
+
+        # Keep it for the next reads
+        component_version_cache.set(component_id, variant(version_number, raw), component_version, generation)
+
         # Return the component version details
         return component_version
 
@@ -279,17 +454,25 @@ def get_component_version_from_db(component_id: int, version_number: int):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 # Method to obtain the latest version of a component
-def get_latest_component_version_from_db(component_id: int):
+def get_latest_component_version_from_db(component_id: int, raw: bool = False):
     '''
     Retrieve the latest component version from the database by component ID.
+
+    With raw, the JSON columns are returned as RawJSON text (spliced as is into the response).
     '''
 
     logger.info(f"Retrieving latest component version for component_id={component_id}")
 
+    # Serve from the cache when possible (any new version invalidates it)
+    cached = component_version_cache.get(component_id, variant(LATEST, raw))
+    if cached is not None:
+        return cached
+    generation = component_version_cache.generation(component_id)
+
     # Get the connection to the database
     conn = get_connection()
 
@@ -297,11 +480,10 @@ def get_latest_component_version_from_db(component_id: int):
     cursor = conn.cursor()
 
     try:
-        logger.debug(f"Executing query to retrieve latest component version for component_id={component_id}")
+        logger.debug("Executing query to retrieve latest component version for component_id=%s", component_id)
         # Retrieve the latest component version
-        cursor.execute('''
-            SELECT id, component_id, version_number, definition,
-                   default_props, validation_config, service_bindings, is_active, created_at, updated_at
+        cursor.execute(f'''
+            SELECT {component_version_columns(raw)}
             FROM form_definition.component_versions
             WHERE component_id = %s
             ORDER BY version_number DESC
@@ -314,6 +496,13 @@ def get_latest_component_version_from_db(component_id: int):
             logger.error(f"No component versions found for component_id={component_id}")
             raise Exception(f"No component versions found for component_id={component_id}")
 
+        if raw:
+            component_version = raw_json_columns(component_version, COMPONENT_VERSION_JSON_COLUMNS)
+
+        # Keep it for the next reads, both as the latest and as its own version
+        component_version_cache.set(component_id, variant(LATEST, raw), component_version, generation)
+        component_version_cache.set(component_id, variant(component_version['version_number'], raw), component_version, generation)
+
         # Return the latest component version details
         return component_version
 
@@ -326,13 +515,66 @@ def get_latest_component_version_from_db(component_id: int):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
+
+
+# Method to obtain the id and last update of a component version (ETag checks)
+def get_component_version_stamp(component_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve only the id and updated_at of a component version (the latest one when
+    version_number is None), so conditional GETs do not read the JSON columns.
+
+    Uses the cached row when there is one. Returns None if the version does not exist.
+    '''
+
+    version = LATEST if version_number is None else version_number
+    cached = component_version_cache.get(component_id, version) or component_version_cache.get(component_id, variant(version, True))
+    if cached is not None:
+        return cached
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        # The latest version, or the one asked for
+        if version_number is None:
+            cursor.execute('''
+                SELECT id, version_number, updated_at
+                FROM form_definition.component_versions
+                WHERE component_id = %s
+                ORDER BY version_number DESC
+                LIMIT 1;
+            ''', (component_id,))
+        else:
+            cursor.execute('''
+                SELECT id, version_number, updated_at
+                FROM form_definition.component_versions
+                WHERE component_id = %s AND version_number = %s;
+            ''', (component_id, version_number))
+
+        return cursor.fetchone()
+
+    except Exception as e:
+        logger.error(f"Error retrieving the stamp of version {version_number} of component {component_id}: {str(e)}")
+        raise Exception(f"Error retrieving component version: {str(e)}")
+
+    finally:
+        cursor.close()
+        release_connection(conn)
 
 
 # Method to obtain all versions of a component
-def get_all_versions_from_db(component_id: int):
+def get_all_versions_from_db(component_id: int, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                             raw: bool = False):
     '''
-    Retrieve all versions for the component
+    Retrieve the versions of the component, newest first, one page at a time.
+
+    Returns up to `limit` versions with a version number lower than `after`,
+    and the token for the next page (None on the last page).
+    With raw, the JSON columns are returned as RawJSON text.
     '''
 
     logger.info(f"Retrieving all component versions for component_id={component_id}")
@@ -344,18 +586,18 @@ def get_all_versions_from_db(component_id: int):
     cursor = conn.cursor()
 
     try:
-        logger.debug(f"Executing query to retrieve latest component version for component_id={component_id}")
+        logger.debug("Executing query to retrieve latest component version for component_id=%s", component_id)
 
-        # Execute query
-        cursor.execute('''
-            SELECT id, component_id, version_number, definition,
-                   default_props, validation_config, service_bindings, is_active, created_at, updated_at
+        # Execute query (one extra row tells whether there is a next page)
+        cursor.execute(f'''
+            SELECT {component_version_columns(raw)}
             FROM form_definition.component_versions
-            WHERE component_id = %s
+            WHERE component_id = %s AND version_number < %s
             ORDER BY version_number DESC
-        ''', (component_id,))
+            LIMIT %s;
+        ''', (component_id, after if after is not None else 2147483647, limit + 1))
 
-        # Get all versions
+        # Get one page of versions
         components = cursor.fetchall()
 
         # Check if the list is empty and raise exception
@@ -363,8 +605,11 @@ def get_all_versions_from_db(component_id: int):
             logger.error(f"No component versions found for component_id={component_id}")
             raise Exception(f"No component versions found for component_id={component_id}")
 
-        # Return the version list
-        return components
+        if raw:
+            components = [raw_json_columns(row, COMPONENT_VERSION_JSON_COLUMNS) for row in components]
+
+        # Return the version list and the next page token
+        return split_page(components, limit, "version_number")
 
     except Exception as e:
         logger.error(f"Error retrieving the version list for component {component_id}: {str(e)}")
@@ -372,7 +617,7 @@ def get_all_versions_from_db(component_id: int):
     
     finally:
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 # Method to delete a specific version of a component
@@ -392,13 +637,16 @@ def delete_component_version_from_db(component_id: int, version_id: int):
     try:
         logger.info(f"Executing DELETE for version {version_id} of compoent with id {component_id}")
 
-        # Delete row
-        cursor.execute('''
-            DELETE FROM form_definition.component_versions 
-            WHERE component_id = %s 
+        # Delete row, telling the other workers to drop their cached versions (sent on commit)
+        notice, notice_params = invalidation_cte(component_version_cache, component_id)
+        cursor.execute(f'''
+            WITH {notice}
+            DELETE FROM form_definition.component_versions
+            USING notified
+            WHERE component_id = %s
             AND version_number = %s
             RETURNING component_id, version_number;
-        ''', (component_id, version_id))
+        ''', (*notice_params, component_id, version_id))
 
         # Obtain info of deleted row
         deleted_row = cursor.fetchone()
@@ -415,6 +663,9 @@ def delete_component_version_from_db(component_id: int, version_id: int):
         # Commit changes
         conn.commit()
 
+        # Drop the cached versions of the component
+        component_version_cache.invalidate(component_id)
+
         # Return message
         return {"status": "Version successfully deleted", 
                 "message": f"Version {version_id} for component {component_id} deleted."}
@@ -425,7 +676,7 @@ def delete_component_version_from_db(component_id: int, version_id: int):
     
     finally:
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 # Method to delete the latest version of a component
@@ -466,12 +717,15 @@ def delete_all_versions_from_db(component_id: int):
     try:
         logger.info(f"Deleting all versions for component id {component_id}")
 
-        # Delete rows
-        cursor.execute('''
-            DELETE FROM form_definition.component_versions 
-            WHERE component_id = %s 
+        # Delete rows, telling the other workers to drop their cached versions (sent on commit)
+        notice, notice_params = invalidation_cte(component_version_cache, component_id)
+        cursor.execute(f'''
+            WITH {notice}
+            DELETE FROM form_definition.component_versions
+            USING notified
+            WHERE component_id = %s
             RETURNING component_id, version_number;
-        ''', (component_id, ))
+        ''', (*notice_params, component_id))
 
         deleted_rows = cursor.fetchall()
 
@@ -491,6 +745,9 @@ def delete_all_versions_from_db(component_id: int):
         # Commit changes
         conn.commit()
 
+        # Drop the cached versions of the component
+        component_version_cache.invalidate(component_id)
+
         # Return message
         return {"status": "Version successfully deleted", 
                 "message": f"All versions for component {component_id} deleted."}
@@ -501,4 +758,4 @@ def delete_all_versions_from_db(component_id: int):
 
     finally:
         cursor.close()
-        close_connection()     
\ No newline at end of file
+        release_connection(conn)
\ No newline at end of file
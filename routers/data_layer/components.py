@@ -1,6 +1,10 @@
-from db_handler import get_connection, close_connection
+from db_handler import get_connection, release_connection
 from fastapi import HTTPException
 from models.component_models import Component
+from typing import Optional
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, split_page
+from cache import resolved_component_cache
+from cache_bus import invalidation_cte
 import json
 
 def create_component(component: Component):
@@ -50,7 +54,7 @@ def create_component(component: Component):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 def update_component(component_id: int, component: Component):
@@ -70,15 +74,20 @@ def update_component(component_id: int, component: Component):
 
     try:
         # Update the existing component in the database
-        cursor.execute('''
+        # Resolved definitions include the component: the same statement tells the other
+        # workers to drop them (sent on commit)
+        notice, notice_params = invalidation_cte(resolved_component_cache, component_id)
+        cursor.execute(f'''
+            WITH {notice}
             UPDATE form_definition.components
             SET key = %s,
                 name = %s,
                 description = %s,
                 updated_at = now()
+            FROM notified
             WHERE id = %s
             RETURNING id, key, name, description, created_at, updated_at;
-        ''', (component.key, component.name, component.description, component_id))
+        ''', (*notice_params, component.key, component.name, component.description, component_id))
 
         # Fetch the updated component
         updated_component = cursor.fetchone()
@@ -89,6 +98,9 @@ def update_component(component_id: int, component: Component):
         # Commit the transaction
         conn.commit()
 
+        # Drop the resolved definitions that include it
+        resolved_component_cache.invalidate(component_id)
+
         # Return the updated component details
         return updated_component
 
@@ -103,7 +115,7 @@ def update_component(component_id: int, component: Component):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 def get_component_by_id(component_id: int):
@@ -145,14 +157,15 @@ def get_component_by_id(component_id: int):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
-def list_components_from_db():
+def list_components_from_db(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
     """
-    List all components in the database.
+    List the components in the database, one page at a time.
 
-    Fetches all components from the database and returns them as a list.
+    Fetches up to `limit` components ordered by id, starting after the component with id `after`.
+    Returns the page and the token for the next page (None on the last page).
     """
 
     # Get the connection to the database
@@ -162,17 +175,17 @@ def list_components_from_db():
     cursor = conn.cursor()
 
     try:
-        # Query to fetch all components
+        # Query to fetch one page of components (one extra row tells whether there is a next page)
         cursor.execute('''
             SELECT id, key, name, description, base_component_id, category, created_at, updated_at
-            FROM form_definition.components;
-        ''')
-
-        # Fetch all components
-        components = cursor.fetchall()
+            FROM form_definition.components
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s;
+        ''', (after or 0, limit + 1))
 
-        # Return the list of components
-        return components
+        # Return the page of components and the next page token
+        return split_page(cursor.fetchall(), limit, "id")
 
     # If an exception occurs
     except Exception as e:
@@ -182,7 +195,7 @@ def list_components_from_db():
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 def delete_component_from_db(component_id: int):
@@ -201,11 +214,16 @@ def delete_component_from_db(component_id: int):
 
     try:
         # Execute the delete query
-        cursor.execute('''
+        # Resolved definitions include the component: the same statement tells the other
+        # workers to drop them (sent on commit)
+        notice, notice_params = invalidation_cte(resolved_component_cache, component_id)
+        cursor.execute(f'''
+            WITH {notice}
             DELETE FROM form_definition.components
+            USING notified
             WHERE id = %s
             RETURNING id;
-        ''', (component_id,))
+        ''', (*notice_params, component_id))
 
         # Check if any row was deleted
         deleted_component = cursor.fetchone()
@@ -216,6 +234,9 @@ def delete_component_from_db(component_id: int):
         # Commit the transaction
         conn.commit()
 
+        # Drop the resolved definitions that include it
+        resolved_component_cache.invalidate(component_id)
+
         # Return a success message
         return {"status": "success", "message": f"Component with ID {component_id} deleted."}
 
@@ -230,4 +251,4 @@ def delete_component_from_db(component_id: int):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
\ No newline at end of file
+        release_connection(conn)
\ No newline at end of file
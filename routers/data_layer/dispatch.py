@@ -0,0 +1,36 @@
+from fastapi.concurrency import run_in_threadpool
+from db_handler import DB_ASYNC
+
+'''
+Glue between the routers and the two data layer implementations.
+
+Routers are async end to end and always await data layer calls. With DB_ASYNC
+enabled, calls go to the native async mirror in routers/data_layer/aio.
+Otherwise (or for functions that only exist in the sync layer) the sync
+function runs on the threadpool, exactly as a sync endpoint would.
+'''
+
+
+class DataLayer:
+    '''Awaitable view over a sync data layer module and its async mirror.'''
+
+    def __init__(self, sync_module, async_module=None):
+        self._sync_module = sync_module
+        self._async_module = async_module
+
+    def __getattr__(self, name):
+        # Prefer the native async implementation when enabled
+        if DB_ASYNC and self._async_module is not None and hasattr(self._async_module, name):
+            function = getattr(self._async_module, name)
+
+        else:
+            sync_function = getattr(self._sync_module, name)
+
+            async def function(*args, **kwargs):
+                return await run_in_threadpool(sync_function, *args, **kwargs)
+
+            function.__name__ = name
+
+        # Resolve each name only once
+        setattr(self, name, function)
+        return function
@@ -0,0 +1,108 @@
+from db_handler import get_connection, release_connection
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import os
+import uuid
+from logger import get_logger
+from routers.data_layer.component_versions import component_version_columns
+
+'''
+Streaming exports of whole tables as NDJSON (one JSON document per line).
+
+Rows are read through psycopg2 named (server-side) cursors, so Postgres keeps
+the result set and the client pulls EXPORT_ITERSIZE rows per round trip.
+Lines are grouped into chunks of about EXPORT_CHUNK_BYTES before being handed
+to the response, so memory stays flat regardless of the number of rows.
+'''
+
+logger = get_logger(__name__)
+
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "2000"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+
+def _json_default(value):
+    '''Encode the column types json does not handle natively.'''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stream_ndjson(query: str, label: str):
+    '''
+    Generator running query on a server-side cursor and yielding NDJSON chunks.
+
+    The connection is checked out when iteration starts and returned to the
+    pool when the generator finishes or is closed (e.g. the client went away).
+    '''
+    logger.info(f"Starting {label} export")
+
+    conn = get_connection()
+
+    # Named cursor => server-side cursor, fetched itersize rows at a time
+    cursor = conn.cursor(name=f"export_{label}_{uuid.uuid4().hex}")
+    cursor.itersize = EXPORT_ITERSIZE
+
+    exported = 0
+
+    try:
+        cursor.execute(query)
+
+        chunk = []
+        chunk_size = 0
+
+        for row in cursor:
+            line = json.dumps(row, default=_json_default) + "\n"
+            chunk.append(line)
+            chunk_size += len(line)
+            exported += 1
+
+            # Hand over one chunk at a time, not one row at a time
+            if chunk_size >= EXPORT_CHUNK_BYTES:
+                yield "".join(chunk)
+                chunk = []
+                chunk_size = 0
+
+        if chunk:
+            yield "".join(chunk)
+
+        logger.info(f"Finished {label} export: {exported} rows")
+
+    except Exception as e:
+        logger.error(f"Error exporting {label} after {exported} rows: {str(e)}")
+        raise
+
+    finally:
+        # Close the cursor and return the connection to the pool
+        cursor.close()
+        release_connection(conn)
+
+
+def export_components():
+    '''Stream every row of form_definition.components as NDJSON.'''
+    return _stream_ndjson('''
+        SELECT id, key, name, description, base_component_id, category, created_at, updated_at
+        FROM form_definition.components
+        ORDER BY id;
+    ''', "components")
+
+
+def export_component_versions():
+    '''Stream every row of form_definition.component_versions as NDJSON.'''
+    return _stream_ndjson(f'''
+        SELECT {component_version_columns()}
+        FROM form_definition.component_versions
+        ORDER BY id;
+    ''', "component_versions")
+
+
+def export_form_versions():
+    '''Stream every row of form_definition.form_versions as NDJSON.'''
+    return _stream_ndjson('''
+        SELECT id, form_id, version_number, key, schema, is_active, created_at, updated_at
+        FROM form_definition.form_versions
+        ORDER BY id;
+    ''', "form_versions")
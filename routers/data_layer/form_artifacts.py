@@ -0,0 +1,319 @@
+from db_handler import get_connection, release_connection
+from fastapi import HTTPException
+from typing import Optional
+import os
+import threading
+from dotenv import load_dotenv
+from logger import get_logger
+from json_response import dumps
+from cache import form_artifact_cache, LATEST
+from cache_bus import invalidation_cte
+from cpu_pool import cpu_pool
+from routers.artifacts import build_artifact
+from routers.data_layer.form_render import get_form_render_bundle
+
+'''
+Publication of form versions as precompiled artifacts.
+
+Publishing builds the render bundle of a form version (the version and every
+component version it references, see form_render.py), serializes it once and
+stores it with its compressions in form_artifacts, addressed by content hash.
+form_versions.artifact_hash then points to it. Reads return those bytes as
+they are: no JSON is parsed or serialized per request.
+
+An artifact is a snapshot: changing a component version the form references
+does not change it until the form version is published again. Writing the
+form version resets its artifact.
+
+Artifacts no version points to anymore (the version was written, deleted or
+published again) are deleted by a periodic sweep, one worker at a time.
+
+Configuration:
+- FORM_ARTIFACTS_PUBLISH_ON_WRITE: Publish form versions once they are
+  created or updated, after the response is sent (default true)
+- FORM_ARTIFACTS_SWEEP_INTERVAL: Seconds between two deletions of the unused
+  artifacts (default 900, 0 disables them)
+'''
+
+load_dotenv()
+
+PUBLISH_ON_WRITE = os.getenv("FORM_ARTIFACTS_PUBLISH_ON_WRITE", "true").lower() == "true"
+SWEEP_INTERVAL = float(os.getenv("FORM_ARTIFACTS_SWEEP_INTERVAL", "900"))
+
+logger = get_logger(__name__)
+
+# Statements shared with the async mirror
+STORE_ARTIFACT = '''
+    INSERT INTO form_definition.form_artifacts (content_hash, body, body_gzip, body_brotli)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (content_hash) DO UPDATE
+    SET body_brotli = COALESCE(form_artifacts.body_brotli, EXCLUDED.body_brotli);
+'''
+
+
+def point_to_artifact(content_hash: str, form_id: int, version_number: int, updated_at):
+    '''
+    Statement and parameters pointing a form version to its artifact, telling the
+    other workers to drop their cached artifacts of the form (sent on commit).
+
+    Only if the version is still the one serialized (a concurrent write publishes its own).
+    '''
+    notice, notice_params = invalidation_cte(form_artifact_cache, form_id)
+    return f'''
+        WITH {notice}
+        UPDATE form_definition.form_versions
+        SET artifact_hash = %s
+        FROM notified
+        WHERE form_id = %s AND version_number = %s AND updated_at = %s
+        RETURNING form_versions.id;
+    ''', (*notice_params, content_hash, form_id, version_number, updated_at)
+
+DELETE_UNUSED_ARTIFACTS = '''
+    DELETE FROM form_definition.form_artifacts a
+    WHERE NOT EXISTS (SELECT 1 FROM form_definition.form_versions v WHERE v.artifact_hash = a.content_hash);
+'''
+
+
+def artifact_query(version_number: Optional[int]) -> str:
+    '''Query reading the published artifact of a form version (or of the latest published one).'''
+    where = "AND fv.version_number = %s" if version_number is not None else "AND fv.artifact_hash IS NOT NULL"
+
+    return f'''
+        SELECT fv.version_number, a.content_hash, a.body, a.body_gzip, a.body_brotli
+        FROM form_definition.form_versions fv
+        JOIN form_definition.form_artifacts a ON a.content_hash = fv.artifact_hash
+        WHERE fv.form_id = %s {where}
+        ORDER BY fv.version_number DESC
+        LIMIT 1;
+    '''
+
+
+def serialize_bundle(bundle: dict) -> bytes:
+    '''Body of an artifact: the /render response body of a render bundle.'''
+    return dumps({"status": "success", **bundle})
+
+
+def publication_summary(form_id: int, version_number: int, artifact: dict) -> dict:
+    '''What publish_form_version returns.'''
+    return {
+        "form_id": form_id,
+        "version_number": version_number,
+        "content_hash": artifact["content_hash"],
+        "size": len(artifact["body"]),
+        "gzip_size": len(artifact["body_gzip"]),
+        "brotli_size": len(artifact["body_brotli"]) if artifact["body_brotli"] is not None else None,
+    }
+
+
+def artifact_from_row(row) -> dict:
+    '''Artifact read from the database, with the byte columns as bytes.'''
+    return {
+        "version_number": row['version_number'],
+        "content_hash": row['content_hash'],
+        "body": bytes(row['body']),
+        "body_gzip": bytes(row['body_gzip']),
+        "body_brotli": bytes(row['body_brotli']) if row['body_brotli'] is not None else None,
+    }
+
+
+def not_published(form_id: int, version_number: Optional[int]) -> HTTPException:
+    '''404 raised when there is no artifact to serve.'''
+    if version_number is not None:
+        return HTTPException(status_code=404, detail=f"Version {version_number} of form {form_id} is not published.")
+    return HTTPException(status_code=404, detail=f"Form {form_id} has no published version.")
+
+
+def publish_form_version(form_id: int, version_number: int):
+    '''
+    Serialize a form version with its components, compress it and store it as its published artifact.
+
+    Raises a 409 when the version is written while it is being published.
+    '''
+
+    logger.info(f"Publishing version {version_number} of form {form_id}")
+
+    # Resolve the components and serialize everything once (JSON columns spliced as read)
+    bundle = get_form_render_bundle(form_id, version_number, raw=True)
+
+    # Hash and compress it in the CPU pool (brotli and gzip are most of the cost)
+    artifact = cpu_pool.call(build_artifact, serialize_bundle(bundle))
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        # Store the artifact (shared by every publication with the same content)
+        cursor.execute(STORE_ARTIFACT, (artifact["content_hash"], artifact["body"],
+                                        artifact["body_gzip"], artifact["body_brotli"]))
+
+        cursor.execute(*point_to_artifact(artifact["content_hash"], form_id, version_number,
+                                          bundle["form_version"]["updated_at"]))
+
+        if cursor.fetchone() is None:
+            raise HTTPException(status_code=409,
+                                detail=f"Version {version_number} of form {form_id} changed while being published.")
+
+        # Commit the transaction
+        conn.commit()
+
+        # Drop the cached artifacts of the form
+        form_artifact_cache.invalidate(form_id)
+
+        logger.info(f"Version {version_number} of form {form_id} published as {artifact['content_hash']}")
+
+        return publication_summary(form_id, version_number, artifact)
+
+    except HTTPException:
+        conn.rollback()
+        raise
+
+    # If an exception occurs
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error publishing version {version_number} of form {form_id}: {str(e)}", exc_info=True)
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error publishing form version: {str(e)}")
+
+    finally:
+        # Close the cursor and connection
+        cursor.close()
+        release_connection(conn)
+
+
+def delete_unused_artifacts() -> int:
+    '''
+    Delete the artifacts no form version points to anymore, returning how many.
+
+    Skipped (0) while another worker is at it. Best effort: a publication
+    reusing one of them concurrently makes the sweep fail until the next one.
+    '''
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        # One sweep at a time across the workers (released with the transaction)
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('form_definition.form_artifacts')) AS locked;")
+
+        if not cursor.fetchone()['locked']:
+            conn.rollback()
+            return 0
+
+        cursor.execute(DELETE_UNUSED_ARTIFACTS)
+        deleted = cursor.rowcount
+
+        # Commit the transaction
+        conn.commit()
+
+        if deleted:
+            logger.info(f"Deleted {deleted} unused form artifacts")
+
+        return deleted
+
+    # If an exception occurs
+    except Exception as e:
+        conn.rollback()
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error deleting unused form artifacts: {str(e)}")
+
+    finally:
+        # Close the cursor and connection
+        cursor.close()
+        release_connection(conn)
+
+
+class UnusedArtifactSweeper:
+    '''Background thread running delete_unused_artifacts every SWEEP_INTERVAL seconds.'''
+
+    def __init__(self, interval: float = SWEEP_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="form-artifact-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                delete_unused_artifacts()
+            except Exception as e:
+                logger.warning(str(e))
+
+
+_sweeper = UnusedArtifactSweeper()
+
+def start_artifact_sweeper():
+    """Start deleting the unused artifacts periodically (called on startup)"""
+    _sweeper.start()
+
+def stop_artifact_sweeper():
+    """Stop the periodic deletion of unused artifacts (called on shutdown)"""
+    _sweeper.stop()
+
+
+def get_form_artifact(form_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve the published artifact of a form version.
+
+    Without version_number, the artifact of the latest published version is returned.
+    Served from the artifact cache when possible.
+    '''
+
+    # Published artifacts only change when the form is written or published again
+    version = version_number if version_number is not None else LATEST
+    cached = form_artifact_cache.get(form_id, version)
+    if cached is not None:
+        return cached
+    generation = form_artifact_cache.generation(form_id)
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        params = (form_id, version_number) if version_number is not None else (form_id,)
+        cursor.execute(artifact_query(version_number), params)
+
+        row = cursor.fetchone()
+
+        if row is None:
+            raise not_published(form_id, version_number)
+
+        artifact = artifact_from_row(row)
+
+        # Keep it for the next reads
+        form_artifact_cache.set(form_id, version, artifact, generation)
+
+        return artifact
+
+    except HTTPException:
+        raise
+
+    # If an exception occurs
+    except Exception as e:
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error retrieving form artifact: {str(e)}")
+
+    finally:
+        # Close the cursor and connection
+        cursor.close()
+        release_connection(conn)
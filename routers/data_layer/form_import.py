@@ -0,0 +1,353 @@
+from db_handler import get_connection, release_connection
+from fastapi import HTTPException
+from models.form_models import FormImport
+from pydantic import ValidationError
+from typing import List
+import gzip
+import io
+import json
+import os
+import psycopg2
+import tarfile
+import time
+import zipfile
+import zlib
+from logger import get_logger
+from cache import form_version_cache
+from cache_bus import invalidation_cte
+from schema_validation import SchemaValidationError, check_form_schema
+from validation_engine import ValidationConfigError
+
+'''
+Bulk import of forms and their versions from a legacy export.
+
+The upload is JSON lines (one form per line, with its versions nested) either
+as plain text, gzipped, or packed as .jsonl/.ndjson files inside a zip or tar
+archive. Rows are staged with COPY into temporary tables and merged into
+form_definition.forms and form_definition.form_versions in a single
+transaction (insert or update by form key / version number).
+
+Compressed data is read in chunks against a budget: the gzip stream, and the
+archive members together, may each decompress to
+FORM_IMPORT_MAX_UNCOMPRESSED_BYTES at most (413 past it), so a small archive
+cannot expand to fill the worker's memory. The upload itself is capped by
+FORM_IMPORT_MAX_BODY_BYTES (see body_limit.py).
+
+Configuration:
+- FORM_IMPORT_MAX_UNCOMPRESSED_BYTES: Largest decompressed size of the gzip
+  stream and of the archive members (default 209715200, 200 MB)
+'''
+
+logger = get_logger(__name__)
+
+JSONL_EXTENSIONS = (".jsonl", ".ndjson", ".json")
+
+MAX_UNCOMPRESSED_BYTES = int(os.getenv("FORM_IMPORT_MAX_UNCOMPRESSED_BYTES", str(200 * 1024 * 1024)))
+
+# Bytes decompressed per read
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    '''Raised when an upload decompresses to more than its budget.'''
+
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Upload decompresses to more than {max_bytes} bytes.")
+
+
+class _ReadBudget:
+    '''Bytes that may still be decompressed, shared by the streams read against it.'''
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.remaining = max_bytes
+
+    def read(self, stream) -> bytes:
+        '''Read a whole stream in chunks, raising UploadTooLarge as soon as it passes the budget.'''
+        chunks = []
+        while True:
+            # One byte past the budget is enough to tell it is exceeded
+            chunk = stream.read(min(READ_CHUNK_BYTES, self.remaining + 1))
+            if not chunk:
+                return b"".join(chunks)
+
+            self.remaining -= len(chunk)
+            if self.remaining < 0:
+                raise UploadTooLarge(self.max_bytes)
+            chunks.append(chunk)
+
+
+def _iter_upload_lines(body: bytes):
+    '''Yield (source, line_number, line) for every non-empty line of the upload.'''
+
+    # Archive members are all read against the same budget
+    members_budget = _ReadBudget(MAX_UNCOMPRESSED_BYTES)
+
+    # Zip archive: every JSON lines member, in name order
+    if body[:4] == b"PK\x03\x04":
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            for name in sorted(archive.namelist()):
+                if name.lower().endswith(JSONL_EXTENSIONS):
+                    with archive.open(name) as member:
+                        yield from _iter_text_lines(name, members_budget.read(member))
+        return
+
+    # Gzip: either a .tar.gz archive or a single gzipped JSON lines file
+    if body[:2] == b"\x1f\x8b":
+        with gzip.GzipFile(fileobj=io.BytesIO(body)) as stream:
+            body = _ReadBudget(MAX_UNCOMPRESSED_BYTES).read(stream)
+
+    if _is_tar(body):
+        with tarfile.open(fileobj=io.BytesIO(body)) as archive:
+            members = sorted((m for m in archive.getmembers() if m.isfile()), key=lambda m: m.name)
+            for member in members:
+                if member.name.lower().endswith(JSONL_EXTENSIONS):
+                    # Sparse members can expand past the size of the archive
+                    with archive.extractfile(member) as stream:
+                        yield from _iter_text_lines(member.name, members_budget.read(stream))
+        return
+
+    yield from _iter_text_lines("upload", body)
+
+
+def _is_tar(body: bytes) -> bool:
+    '''Tar archives carry the "ustar" magic at offset 257.'''
+    return len(body) > 262 and body[257:262] == b"ustar"
+
+
+def _iter_text_lines(source: str, data: bytes):
+    for line_number, line in enumerate(data.decode("utf-8").splitlines(), start=1):
+        if line.strip():
+            yield source, line_number, line
+
+
+def parse_import_upload(body: bytes) -> List[FormImport]:
+    '''
+    Parse and validate an upload into FormImport objects.
+
+    Raises a 400 listing the first problems found (bad JSON, invalid fields,
+    invalid schemas, duplicated form keys, version numbers or version keys), so
+    nothing is staged unless the whole upload is valid. Raises a 413 when the
+    upload decompresses to more than FORM_IMPORT_MAX_UNCOMPRESSED_BYTES.
+    '''
+    forms = []
+    errors = []
+    seen_keys = {}
+
+    try:
+        lines = list(_iter_upload_lines(body))
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable upload: {str(e)}")
+
+    for source, line_number, line in lines:
+        where = f"{source}:{line_number}"
+
+        try:
+            form = FormImport.model_validate(json.loads(line))
+        except (ValueError, ValidationError) as e:
+            errors.append(f"{where}: {str(e)}")
+            continue
+
+        if form.key in seen_keys:
+            errors.append(f"{where}: form key '{form.key}' already defined at {seen_keys[form.key]}")
+            continue
+        seen_keys[form.key] = where
+
+        # Versions without a number take their position in the list
+        numbers = set()
+        version_keys = {}
+        for position, version in enumerate(form.versions, start=1):
+            if version.version_number is None:
+                version.version_number = position
+            if version.version_number in numbers:
+                errors.append(f"{where}: version {version.version_number} of form '{form.key}' is duplicated")
+            numbers.add(version.version_number)
+
+            # Version keys are unique per form too (UNIQUE (form_id, key))
+            if version.key in version_keys:
+                errors.append(f"{where}: version key '{version.key}' of form '{form.key}' is already used "
+                              f"by version {version_keys[version.key]}")
+            else:
+                version_keys[version.key] = version.version_number
+
+            # Same checks as the form version endpoints
+            try:
+                check_form_schema(version.schema)
+            except SchemaValidationError as e:
+                errors.extend(f"{where}: version {version.version_number} of form '{form.key}': "
+                              f"schema/{'/'.join(map(str, item['path']))}: {item['message']}"
+                              for item in e.errors[:5])
+            except ValidationConfigError as e:
+                errors.append(f"{where}: version {version.version_number} of form '{form.key}': {str(e)}")
+
+        forms.append(form)
+
+    if errors:
+        raise HTTPException(status_code=400, detail=errors[:50])
+
+    if not forms:
+        raise HTTPException(status_code=400, detail="The upload does not contain any form")
+
+    return forms
+
+
+def _copy_value(value) -> str:
+    '''Render a value for COPY ... FROM STDIN in text format.'''
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+
+def _copy_rows(cursor, table: str, columns: str, rows):
+    '''Stream rows into a table with a single COPY.'''
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+
+
+def import_forms(forms: List[FormImport], dry_run: bool = False):
+    '''
+    Stage the forms and versions with COPY and merge them in one transaction.
+
+    Existing forms (by key) and versions (by form and version number) are updated,
+    the others are inserted, and the version counters of the forms are moved past
+    the imported numbers. With dry_run the transaction is rolled back at the end,
+    so the counts are reported without changing anything.
+    Returns the counts and the throughput in rows per second.
+    '''
+
+    logger.info(f"Starting import of {len(forms)} forms (dry_run={dry_run})")
+    started = time.perf_counter()
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        # Staging tables live only for this transaction
+        cursor.execute('''
+            CREATE TEMP TABLE import_forms (
+                key          TEXT NOT NULL,
+                name         TEXT NOT NULL,
+                description  TEXT
+            ) ON COMMIT DROP;
+
+            CREATE TEMP TABLE import_form_versions (
+                form_key        TEXT NOT NULL,
+                version_number  INTEGER NOT NULL,
+                key             TEXT NOT NULL,
+                schema          JSONB NOT NULL,
+                is_active       BOOLEAN NOT NULL
+            ) ON COMMIT DROP;
+        ''')
+
+        # Stage every row with COPY
+        _copy_rows(cursor, "import_forms", "key, name, description",
+                   ((form.key, form.name, form.description) for form in forms))
+
+        _copy_rows(cursor, "import_form_versions", "form_key, version_number, key, schema, is_active",
+                   ((form.key, version.version_number, version.key, json.dumps(version.schema), version.is_active)
+                    for form in forms for version in form.versions))
+
+        # Merge forms (xmax = 0 tells inserted rows from updated ones)
+        cursor.execute('''
+            INSERT INTO form_definition.forms (key, name, description, created_at, updated_at)
+            SELECT key, name, description, now(), now()
+            FROM import_forms
+            ON CONFLICT (key) DO UPDATE
+            SET name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                updated_at = now()
+            RETURNING (xmax = 0) AS inserted;
+        ''')
+        form_results = [row['inserted'] for row in cursor.fetchall()]
+
+        # Merge versions
+        cursor.execute('''
+            INSERT INTO form_definition.form_versions (form_id, version_number, key, schema, is_active, created_at, updated_at)
+            SELECT f.id, v.version_number, v.key, v.schema, v.is_active, now(), now()
+            FROM import_form_versions v
+            JOIN form_definition.forms f ON f.key = v.form_key
+            ON CONFLICT (form_id, version_number) DO UPDATE
+            SET key = EXCLUDED.key,
+                schema = EXCLUDED.schema,
+                is_active = EXCLUDED.is_active,
+                artifact_hash = NULL,
+                updated_at = now()
+            RETURNING (xmax = 0) AS inserted;
+        ''')
+        version_results = [row['inserted'] for row in cursor.fetchall()]
+
+        # Keep the version counters ahead of the imported numbers, telling the other workers
+        # to drop their cached form versions (sent on commit only)
+        notice, notice_params = invalidation_cte(form_version_cache)
+        cursor.execute(f'''
+            WITH {notice}
+            UPDATE form_definition.forms f
+            SET last_version_number = GREATEST(f.last_version_number, v.max_version)
+            FROM (
+                SELECT form_key, MAX(version_number) AS max_version
+                FROM import_form_versions
+                GROUP BY form_key
+            ) v, notified
+            WHERE f.key = v.form_key;
+        ''', notice_params)
+
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+
+            # Imports touch many forms at once: drop every cached form version
+            form_version_cache.clear()
+
+        elapsed = time.perf_counter() - started
+        total_rows = len(form_results) + len(version_results)
+
+        result = {
+            "dry_run": dry_run,
+            "forms_inserted": sum(1 for inserted in form_results if inserted),
+            "forms_updated": sum(1 for inserted in form_results if not inserted),
+            "versions_inserted": sum(1 for inserted in version_results if inserted),
+            "versions_updated": sum(1 for inserted in version_results if not inserted),
+            "rows": total_rows,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        }
+
+        logger.info(f"Import finished: {result}")
+
+        return result
+
+    except psycopg2.IntegrityError as e:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail=f"Import conflicts with existing data: {str(e)}")
+
+    # If an exception occurs
+    except Exception as e:
+        # Rollback the whole import
+        conn.rollback()
+
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error importing forms: {str(e)}")
+
+    finally:
+        # Close the cursor and connection
+        cursor.close()
+        release_connection(conn)
+
+
+def import_forms_from_upload(body: bytes, dry_run: bool = False):
+    '''Parse an upload and import it (see parse_import_upload and import_forms).'''
+    return import_forms(parse_import_upload(body), dry_run)
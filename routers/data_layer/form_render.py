@@ -0,0 +1,185 @@
+from db_handler import get_connection, release_connection
+from fastapi import HTTPException
+from typing import Optional
+from logger import get_logger
+from json_response import RawJSON, raw_json_columns
+from cache import component_version_cache, LATEST, variant
+from routers.data_layer.component_versions import COMPONENT_VERSION_JSON_COLUMNS, component_version_columns
+from routers.data_layer.form_versions import get_form_version_from_db, get_latest_form_version_from_db
+
+'''
+Render bundles: a form version together with every component version its
+schema references, so a client can render the form with a single request.
+
+Components are referenced anywhere in the schema by objects carrying an
+integer "component_id" and, optionally, a "version_number" (without it, the
+latest version of the component is used). The references missing from the
+component version cache are loaded with one query, whatever their number.
+
+In the bundle, "components" maps "<component_id>:<version_number>" (or
+"<component_id>:latest") to the component version, and "missing" lists the
+references that do not exist.
+'''
+
+logger = get_logger(__name__)
+
+
+def collect_component_references(schema) -> list:
+    '''(component_id, version_number or LATEST) pairs referenced in a form schema, in order of appearance.'''
+    references = {}
+    pending = [schema]
+
+    while pending:
+        node = pending.pop()
+
+        if isinstance(node, dict):
+            component_id = node.get("component_id")
+            if isinstance(component_id, int) and not isinstance(component_id, bool):
+                version_number = node.get("version_number")
+                version = version_number if isinstance(version_number, int) else LATEST
+                references.setdefault((component_id, version), None)
+            pending.extend(reversed(list(node.values())))
+
+        elif isinstance(node, list):
+            pending.extend(reversed(node))
+
+    return list(references)
+
+
+def reference_key(component_id: int, version) -> str:
+    '''Key of a reference in the bundle's "components" map.'''
+    return f"{component_id}:{version}"
+
+
+def batch_query(raw: bool = False) -> str:
+    '''
+    Query loading many component versions at once.
+
+    Takes the pinned references as two parallel arrays (component ids and
+    version numbers) and the ids of the components wanted at their latest
+    version. The "latest" column tells which part a row answers.
+    '''
+    columns = component_version_columns(raw)
+
+    return f'''
+        SELECT {columns}, false AS latest
+        FROM form_definition.component_versions
+        WHERE (component_id, version_number) IN (SELECT * FROM unnest(%s::int[], %s::int[]))
+        UNION ALL
+        (SELECT DISTINCT ON (component_id) {columns}, true AS latest
+         FROM form_definition.component_versions
+         WHERE component_id = ANY(%s::int[])
+         ORDER BY component_id, version_number DESC);
+    '''
+
+
+def cached_references(references: list, raw: bool = False):
+    '''Split references into the component versions found in the cache and the ones to load.'''
+    found = {}
+    misses = []
+
+    for component_id, version in references:
+        cached = component_version_cache.get(component_id, variant(version, raw))
+        if cached is not None:
+            found[(component_id, version)] = cached
+        else:
+            misses.append((component_id, version))
+
+    return found, misses
+
+
+def batch_params(misses: list) -> tuple:
+    '''Parameters of batch_query for the references to load.'''
+    pinned = [(component_id, version) for component_id, version in misses if version != LATEST]
+    latest = [component_id for component_id, version in misses if version == LATEST]
+
+    return ([component_id for component_id, _ in pinned], [version for _, version in pinned], latest)
+
+
+def store_batch(rows: list, found: dict, generation, raw: bool = False):
+    '''Add the rows returned by batch_query to found, and to the component version cache.'''
+    for row in rows:
+        row = dict(row)
+        latest = row.pop("latest")
+
+        if raw:
+            row = raw_json_columns(row, COMPONENT_VERSION_JSON_COLUMNS)
+
+        component_id = row['component_id']
+        version = LATEST if latest else row['version_number']
+        found[(component_id, version)] = row
+
+        # Same entries as the single version reads
+        component_version_cache.set(component_id, variant(version, raw), row, generation)
+        if latest:
+            component_version_cache.set(component_id, variant(row['version_number'], raw), row, generation)
+
+
+def build_bundle(form_version, references: list, found: dict) -> dict:
+    '''Render bundle of a form version, from the component versions found for its references.'''
+    return {
+        "form_version": form_version,
+        "components": {reference_key(*reference): found[reference] for reference in references if reference in found},
+        "missing": [reference_key(*reference) for reference in references if reference not in found],
+    }
+
+
+def form_schema(form_version):
+    '''Parsed schema of a form version (read as RawJSON in raw mode).'''
+    schema = form_version['schema']
+    return schema.load() if isinstance(schema, RawJSON) else schema
+
+
+def get_form_render_bundle(form_id: int, version_number: Optional[int] = None, raw: bool = False):
+    '''
+    Retrieve a form version and every component version its schema references.
+
+    Without version_number, the latest version of the form is used. With raw,
+    the JSON columns are returned as RawJSON text (spliced as is into the response).
+    '''
+
+    logger.info(f"Building render bundle for form_id={form_id} version_number={version_number}")
+
+    # The form version itself (served from the version cache when possible)
+    if version_number is not None:
+        form_version = get_form_version_from_db(form_id, version_number, raw=raw)
+    else:
+        form_version = get_latest_form_version_from_db(form_id, raw=raw)
+
+    references = collect_component_references(form_schema(form_version))
+
+    # Only the references not in the cache go to the database
+    found, misses = cached_references(references, raw)
+    if not misses:
+        return build_bundle(form_version, references, found)
+
+    generation = component_version_cache.generation()
+
+    # Get the connection to the database
+    conn = get_connection()
+
+    # Create a cursor
+    cursor = conn.cursor()
+
+    try:
+        logger.debug("Loading %d of %d component versions for form_id=%s", len(misses), len(references), form_id)
+
+        # Load every missing component version in one query
+        cursor.execute(batch_query(raw), batch_params(misses))
+        store_batch(cursor.fetchall(), found, generation, raw)
+
+        return build_bundle(form_version, references, found)
+
+    except HTTPException:
+        raise
+
+    # If an exception occurs
+    except Exception as e:
+        logger.error(f"Error building render bundle for form {form_id}: {str(e)}", exc_info=True)
+        # Raise the exception to be handled by the caller
+        raise Exception(f"Error building render bundle: {str(e)}")
+
+    finally:
+        # Close the cursor and connection
+        cursor.close()
+        release_connection(conn)
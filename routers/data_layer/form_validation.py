@@ -0,0 +1,70 @@
+from typing import Optional
+from logger import get_logger
+from cache import form_validator_cache, LATEST
+from validation_engine import FormValidator, ValidationConfigError, compile_form
+from routers.data_layer.form_render import collect_component_references, get_form_render_bundle, reference_key
+
+'''
+Compiled validators of the form versions.
+
+A form version is compiled from its render bundle (see form_render.py): the
+schema and the component versions it references, loaded with one query.
+Validators are cached per (form_id, version) and depend on the form and on
+every component referenced, so a write to any of them evicts the validator
+(also in the other workers, through the version caches they are linked to).
+'''
+
+logger = get_logger(__name__)
+
+
+def compile_bundle(bundle: dict) -> FormValidator:
+    '''
+    Compile the validator of a render bundle (read with raw=False).
+
+    Raises ValidationConfigError when the rules of the schema or of a component cannot be compiled.
+    '''
+    form_version = bundle["form_version"]
+    components = bundle["components"]
+
+    def component_rules(field):
+        version = field.get("version_number") if isinstance(field.get("version_number"), int) else LATEST
+        component = components.get(reference_key(field.get("component_id"), version))
+        return component["validation_config"] if component is not None else None
+
+    try:
+        return compile_form(form_version["schema"], component_rules,
+                            form_version["form_id"], form_version["version_number"])
+    except ValidationConfigError as e:
+        raise ValidationConfigError(f"Invalid validation rules in version {form_version['version_number']} "
+                                    f"of form {form_version['form_id']}: {str(e)}")
+
+
+def validator_dependencies(bundle: dict) -> list:
+    '''Cache parents of a validator besides its form: the components it references (found or not).'''
+    references = collect_component_references(bundle["form_version"]["schema"])
+    return [("component", component_id) for component_id in dict.fromkeys(component_id for component_id, _ in references)]
+
+
+def get_form_validator(form_id: int, version_number: Optional[int] = None) -> FormValidator:
+    '''
+    Compiled validator of a form version (of the latest version when version_number is None).
+
+    Served from the validator cache when possible.
+    '''
+
+    version = version_number if version_number is not None else LATEST
+    cached = form_validator_cache.get(("form", form_id), version)
+    if cached is not None:
+        return cached
+    generation = form_validator_cache.generation()
+
+    logger.info(f"Compiling validator for form_id={form_id} version_number={version_number}")
+
+    bundle = get_form_render_bundle(form_id, version_number)
+    validator = compile_bundle(bundle)
+
+    # Keep it until the form or one of its components changes
+    form_validator_cache.set(("form", form_id), version, validator, generation,
+                             depends_on=validator_dependencies(bundle))
+
+    return validator
@@ -1,11 +1,25 @@
-from db_handler import get_connection, close_connection
+from db_handler import get_connection, release_connection
+from fastapi import HTTPException
 from models.form_models import FormVersion
 import json
+from typing import Optional
 from logger import get_logger
+from json_response import raw_json_columns
+from cache import form_version_cache, LATEST, variant
+from cache_bus import invalidation_cte
 
 # Initialize logger
 logger = get_logger(__name__)
 
+# JSONB columns of form_versions (returned as raw JSON text in raw mode)
+FORM_VERSION_JSON_COLUMNS = ("schema",)
+
+
+def form_version_columns(raw: bool = False) -> str:
+    '''Select list of a form version row, with the schema as text when raw.'''
+    schema = "schema::text AS schema" if raw else "schema"
+    return f"id, form_id, version_number, key, {schema}, is_active, created_at, updated_at"
+
 
 def create_form_version(form_id: int, form_version: FormVersion):
     '''
@@ -23,15 +37,19 @@ def create_form_version(form_id: int, form_version: FormVersion):
     cursor = conn.cursor()
 
     try:
-        # Find the next version number to use
-        next_version = _find_next_version_number(form_id, conn)
-        logger.info(f"Next version to be created for form {form_id} is {next_version}")
-
-        # Update input with correct version number
-        form_version.version_number = next_version
-
-        # Insert the new version in the database
-        cursor.execute('''
+        # Allocate the next version number and insert the version in a single statement.
+        # Incrementing the counter locks the form row, so concurrent creates for
+        # the same form queue up instead of reading the same MAX(version_number).
+        # The same statement tells the other workers to drop their cached versions (sent on commit).
+        notice, notice_params = invalidation_cte(form_version_cache, form_id)
+        cursor.execute(f'''
+            WITH {notice},
+            next_version AS (
+                UPDATE form_definition.forms
+                SET last_version_number = last_version_number + 1
+                WHERE id = %s
+                RETURNING id, last_version_number
+            )
             INSERT INTO form_definition.form_versions (
                        form_id,
                        version_number,
@@ -40,27 +58,44 @@ def create_form_version(form_id: int, form_version: FormVersion):
                        is_active,
                        created_at,
                        updated_at)
-            VALUES (%s, %s, %s, %s, True, now(), now())
+            SELECT id, last_version_number, %s, %s, True, now(), now()
+            FROM next_version, notified
             RETURNING *
-        ''', (form_id,
-              form_version.version_number,
+        ''', (*notice_params,
+              form_id,
               form_version.key,
               json.dumps(form_version.schema),
               ))
 
         # Fetch the newly created form version and row id
         new_version = cursor.fetchone()
+
+        # No row means the form does not exist
+        if new_version is None:
+            raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
+
         new_id = new_version['id']
+        next_version = new_version['version_number']
+
+        # Update input with the allocated version number
+        form_version.version_number = next_version
 
         # Commit the transaction
         conn.commit()
 
+        # Drop the cached versions of the form
+        form_version_cache.invalidate(form_id)
+
         # Log the result
         logger.info(f"Row with id={new_id} created to store version {next_version} of form {form_id}")
 
         # Return the new form version details
         return new_version
 
+    except HTTPException:
+        conn.rollback()
+        raise
+
     except Exception as e:
         logger.error(f"Error creating form version: {str(e)}")
         conn.rollback()
@@ -69,30 +104,7 @@ def create_form_version(form_id: int, form_version: FormVersion):
     finally:
         logger.info("Ending execution of version creation (success or failure)...")
         cursor.close()
-        close_connection()
-
-
-def _find_next_version_number(form_id: int, conn) -> int:
-    '''Find the next available version number for this form.'''
-    cursor = conn.cursor()
-
-    try:
-        # Find next version number
-        cursor.execute('''
-            SELECT COALESCE(MAX(version_number), 0) + 1 AS next_version
-            FROM form_definition.form_versions
-            WHERE form_id = %s;
-        ''', (form_id,))
-
-        # Obtain result (next version) and return
-        result = cursor.fetchone()
-        return result['next_version']
-
-    except Exception as e:
-        raise Exception(f"Error finding next version number: {str(e)}")
-
-    finally:
-        cursor.close()
+        release_connection(conn)
 
 
 def update_form_version(form_id: int, version_id: int, form_version: FormVersion):
@@ -100,78 +112,195 @@ def update_form_version(form_id: int, version_id: int, form_version: FormVersion
     cursor = conn.cursor()
 
     try:
-        # Find the id of the record to be updated
-        # This is not quite necessary (additional step), but helps with clarity
-        row_id = _get_record_id(form_id, version_id, conn)
-
-        # Update row using the id
-        cursor.execute('''
+        # Update the row addressed by (form_id, version_number) in a single statement,
+        # which also tells the other workers to drop their cached versions (sent on commit)
+        notice, notice_params = invalidation_cte(form_version_cache, form_id)
+        cursor.execute(f'''
+            WITH {notice}
             UPDATE form_definition.form_versions
-            SET form_id = %s,
-                version_number = %s,
-                key = %s,
+            SET key = %s,
                 schema = %s,
                 is_active = true,
+                artifact_hash = NULL,
                 updated_at = now()
-            WHERE id = %s
-            RETURNING *;
-        ''', (form_id,
-              version_id,
+            FROM notified
+            WHERE form_id = %s AND version_number = %s
+            RETURNING form_versions.*;
+        ''', (*notice_params,
               form_version.key,
               json.dumps(form_version.schema),
-              row_id))
+              form_id,
+              version_id))
 
-        # Fetch the updated component version
+        # Fetch the updated form version
         new_version = cursor.fetchone()
 
+        # No row means there is no such version for this form
+        if new_version is None:
+            logger.warning("Version not found.")
+            raise HTTPException(status_code=404, detail=f"Version {version_id} to update form {form_id} not found.")
+
         # Commit the transaction
         conn.commit()
 
+        # Drop the cached versions of the form
+        form_version_cache.invalidate(form_id)
+
         # Log the results
-        logger.info("OK")
+        logger.info(f"Version {version_id} of form {form_id} updated")
 
-        # Return the updated component version details
+        # Return the updated form version details
         return new_version
 
+    except HTTPException:
+        conn.rollback()
+        raise
+
     except Exception as e:
         conn.rollback()
         raise Exception(f"Error updating form version: {str(e)}")
     
     finally:
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
-def _get_record_id(form_id: int, version_id: int, conn) -> int:
+def get_form_version_from_db(form_id: int, version_number: int, raw: bool = False):
     '''
-    Get the id for the corresponding row.
+    Retrieve a form version by form ID and version number.
+
+    Served from the version cache when possible. With raw, the schema is
+    returned as RawJSON text (spliced as is into the response).
     '''
-    logger.info(f"Obtaining record id for the selected version...")
 
-    # Create cursor
+    # Versions almost never change once written: serve them from the cache when possible
+    cached = form_version_cache.get(form_id, variant(version_number, raw))
+    if cached is not None:
+        return cached
+    generation = form_version_cache.generation(form_id)
+
+    conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute('''
-            SELECT id FROM form_definition.form_versions
+        cursor.execute(f'''
+            SELECT {form_version_columns(raw)}
+            FROM form_definition.form_versions
             WHERE form_id = %s AND version_number = %s;
-        ''', (form_id, version_id))
+        ''', (form_id, version_number))
 
-        # Obtain the record
-        record = cursor.fetchone()
+        form_version = cursor.fetchone()
 
-        # If no record found, raise exception
-        if record is None:
-            logger.warning("Version not found.")
-            raise Exception(f"Version {version_id} to update form {form_id} not found.")
+        if form_version is None:
+            raise HTTPException(status_code=404, detail=f"Version {version_number} of form {form_id} not found.")
 
-        # Return id  
-        return record['id']
+        if raw:
+            form_version = raw_json_columns(form_version, FORM_VERSION_JSON_COLUMNS)
+
+        # Keep it for the next reads
+        form_version_cache.set(form_id, variant(version_number, raw), form_version, generation)
+
+        return form_version
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        logger.warning("Failed to find the version to update.")
-        raise Exception(f"Failed to find the version to update: {str(e)}")
-    
+        raise Exception(f"Error retrieving form version: {str(e)}")
+
     finally:
-        logger.info("Exiting method that obtains the record id...")
-        cursor.close()
\ No newline at end of file
+        cursor.close()
+        release_connection(conn)
+
+
+def get_latest_form_version_from_db(form_id: int, raw: bool = False):
+    '''
+    Retrieve the latest version of a form.
+
+    Served from the version cache when possible (any write to the form invalidates it).
+    With raw, the schema is returned as RawJSON text.
+    '''
+
+    cached = form_version_cache.get(form_id, variant(LATEST, raw))
+    if cached is not None:
+        return cached
+    generation = form_version_cache.generation(form_id)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f'''
+            SELECT {form_version_columns(raw)}
+            FROM form_definition.form_versions
+            WHERE form_id = %s
+            ORDER BY version_number DESC
+            LIMIT 1;
+        ''', (form_id,))
+
+        form_version = cursor.fetchone()
+
+        if form_version is None:
+            raise HTTPException(status_code=404, detail=f"No versions found for form {form_id}.")
+
+        if raw:
+            form_version = raw_json_columns(form_version, FORM_VERSION_JSON_COLUMNS)
+
+        # Keep it for the next reads, both as the latest and as its own version
+        form_version_cache.set(form_id, variant(LATEST, raw), form_version, generation)
+        form_version_cache.set(form_id, variant(form_version['version_number'], raw), form_version, generation)
+
+        return form_version
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise Exception(f"Error retrieving latest form version: {str(e)}")
+
+    finally:
+        cursor.close()
+        release_connection(conn)
+
+
+def get_form_version_stamp(form_id: int, version_number: Optional[int] = None):
+    '''
+    Retrieve only the id and updated_at of a form version (the latest one when
+    version_number is None), so conditional GETs do not read the schema.
+
+    Uses the cached row when there is one. Returns None if the version does not exist.
+    '''
+
+    version = LATEST if version_number is None else version_number
+    cached = form_version_cache.get(form_id, version) or form_version_cache.get(form_id, variant(version, True))
+    if cached is not None:
+        return cached
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # The latest version, or the one asked for
+        if version_number is None:
+            cursor.execute('''
+                SELECT id, version_number, updated_at
+                FROM form_definition.form_versions
+                WHERE form_id = %s
+                ORDER BY version_number DESC
+                LIMIT 1;
+            ''', (form_id,))
+        else:
+            cursor.execute('''
+                SELECT id, version_number, updated_at
+                FROM form_definition.form_versions
+                WHERE form_id = %s AND version_number = %s;
+            ''', (form_id, version_number))
+
+        return cursor.fetchone()
+
+    except Exception as e:
+        raise Exception(f"Error retrieving form version: {str(e)}")
+
+    finally:
+        cursor.close()
+        release_connection(conn)
@@ -1,6 +1,10 @@
 from models.form_models import Form
-from db_handler import get_connection, close_connection
+from db_handler import get_connection, release_connection
 from fastapi import HTTPException
+from typing import Optional
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, split_page
+from cache import form_version_cache
+from cache_bus import invalidation_cte
 
 def create_form(form: Form):
     """
@@ -44,7 +48,7 @@ def create_form(form: Form):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 def update_form(form_id: int, udpate_key: bool, form: Form):
@@ -65,29 +69,25 @@ def update_form(form_id: int, udpate_key: bool, form: Form):
     cursor = conn.cursor()
 
     try:
-        # Check if the form with the given ID exists
-        cursor.execute('SELECT id, key FROM form_definition.forms WHERE id = %s;', (form_id,))
-        existing_form = cursor.fetchone()
-
-        if existing_form is None:
-            raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
-        
-        new_key = form.key if udpate_key else existing_form['key']
-        
-        # If it exists, update it
+        # Update the form in a single statement. The key is only replaced when
+        # update_key is set; otherwise the stored key is kept.
         cursor.execute('''
             UPDATE form_definition.forms
-            SET key = %s,
+            SET key = CASE WHEN %s THEN %s ELSE key END,
                 name = %s,
                 description = %s,
                 updated_at = now()
             WHERE id = %s
             RETURNING id, key, name, description, created_at, updated_at;
-        ''', (new_key, form.name, form.description, form_id))
+        ''', (udpate_key, form.key, form.name, form.description, form_id))
 
         # Load updated form
         updated_form = cursor.fetchone()
 
+        # No row means the form does not exist
+        if updated_form is None:
+            raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
+
         # Commit the transaction
         conn.commit()
 
@@ -96,6 +96,7 @@ def update_form(form_id: int, udpate_key: bool, form: Form):
 
     # If an exception occurs
     except HTTPException:
+        conn.rollback()
         raise
 
     except Exception as e:
@@ -108,7 +109,7 @@ def update_form(form_id: int, udpate_key: bool, form: Form):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 # Method name needs to be different from the router method name
@@ -130,12 +131,17 @@ def delete_form_from_db(form_id: int):
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail=f"Form with id={form_id} not found")
         
-        # If it exists, delete it
-        cursor.execute('DELETE FROM form_definition.forms WHERE id = %s;', (form_id,))
+        # If it exists, delete it, telling the other workers to drop their cached versions (sent on commit)
+        notice, notice_params = invalidation_cte(form_version_cache, form_id)
+        cursor.execute(f'WITH {notice} DELETE FROM form_definition.forms USING notified WHERE id = %s;',
+                             (*notice_params, form_id))
 
         # Commit changes
         conn.commit()
 
+        # The versions went with the form (ON DELETE CASCADE)
+        form_version_cache.invalidate(form_id)
+
         return {"status": "success", "message": f"Form with id={form_id} deleted"}
 
     except HTTPException:
@@ -149,7 +155,7 @@ def delete_form_from_db(form_id: int):
     finally:
         # Close cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
 def get_form_from_db(form_id: int):
@@ -185,14 +191,15 @@ def get_form_from_db(form_id: int):
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
+        release_connection(conn)
 
 
-def list_forms():
+def list_forms(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
     '''
-    List all forms in the database.
+    List the forms in the database, one page at a time.
 
-    Returns a list of all forms with their details.
+    Returns up to `limit` forms ordered by id, starting after the form with id `after`,
+    and the token for the next page (None on the last page).
     '''
 
     # Get the connection to the database
@@ -202,11 +209,17 @@ def list_forms():
     cursor = conn.cursor()
 
     try:
-        # Fetch all forms
-        cursor.execute('SELECT id, key, name, description, created_at, updated_at FROM form_definition.forms;')
-        forms = cursor.fetchall()
+        # Fetch one page of forms (one extra row tells whether there is a next page)
+        cursor.execute('''
+            SELECT id, key, name, description, created_at, updated_at
+            FROM form_definition.forms
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s;
+        ''', (after or 0, limit + 1))
+        forms, next_after = split_page(cursor.fetchall(), limit, "id")
 
-        return {"status": "success", "forms": forms}
+        return {"status": "success", "forms": forms, "next_after": next_after}
 
     except Exception as e:
         # Raise an HTTP exception
@@ -215,4 +228,4 @@ def list_forms():
     finally:
         # Close the cursor and connection
         cursor.close()
-        close_connection()
\ No newline at end of file
+        release_connection(conn)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import base64
+import json
+import os
+from typing import Optional
+from fastapi import HTTPException
+
+'''
+Helpers for keyset (cursor) pagination of list endpoints.
+
+Pages are ordered on a unique key (id or version_number). The client receives
+an opaque "after" token holding the key of the last row of the page, and the
+next page is read with WHERE key > after (or < for descending lists) instead
+of an OFFSET, so every page costs the same no matter how deep it is.
+
+Configuration:
+- PAGE_SIZE_DEFAULT: Rows per page when no limit is given (default 100)
+- PAGE_SIZE_MAX: Largest limit a client may ask for (default 1000)
+'''
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+
+def encode_after(key: int) -> str:
+    '''Build the opaque token pointing after the row with the given key.'''
+    raw = json.dumps({"after": key}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_after(token: Optional[str]) -> Optional[int]:
+    '''Read the key out of an "after" token. Raises a 400 on malformed tokens.'''
+    if not token:
+        return None
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+        if not isinstance(key, int):
+            raise ValueError("key is not an integer")
+        return key
+
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid pagination token: {token}")
+
+
+def split_page(rows: list, limit: int, key: str):
+    '''
+    Split the rows of a query run with LIMIT limit + 1 into the page itself
+    and the token for the next page (None when this is the last page).
+    '''
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    return page, encode_after(page[-1][key])
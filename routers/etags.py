@@ -0,0 +1,49 @@
+from typing import Optional
+from fastapi import Response
+
+'''
+Helpers for ETags and conditional GETs on versioned resources.
+
+A version row is identified by its id and changes only when updated_at
+does, so the pair is a strong validator: the ETag is derived from them and
+can be checked with a cheap SELECT id, updated_at (or straight from the
+version cache) without reading the JSON columns.
+'''
+
+
+def version_etag(row) -> Optional[str]:
+    '''Strong ETag of a version row (anything with id and updated_at).'''
+    if row is None:
+        return None
+
+    updated_at = row['updated_at']
+    stamp = round(updated_at.timestamp() * 1_000_000) if updated_at is not None else 0
+    return f'"{row["id"]}-{stamp:x}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    '''
+    Whether an If-None-Match header matches the ETag.
+
+    Uses the weak comparison the spec requires for If-None-Match, so W/"..."
+    tags sent back by caches that weakened them still match.
+    '''
+    if not if_none_match or etag is None:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    '''Empty 304 response carrying the current ETag.'''
+    return Response(status_code=304, headers={"ETag": etag})
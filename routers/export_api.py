@@ -0,0 +1,47 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from routers.data_layer.exports import export_components, export_component_versions, export_form_versions
+from logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Initialize the API router
+router = APIRouter(prefix="/export", tags=["Export"])
+
+'''
+Bulk exports used to sync downstream renderers.
+
+Every endpoint streams a whole table as NDJSON (application/x-ndjson), one row
+per line, straight from a server-side cursor. Nothing is buffered in full, so
+memory stays flat no matter how many rows are exported.
+'''
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@router.get("/components", summary="Export all components as NDJSON")
+async def export_all_components():
+    '''
+    Stream every component definition, one JSON document per line.
+    '''
+    logger.info("Exporting all components")
+    return StreamingResponse(export_components(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/component_versions", summary="Export all component versions as NDJSON")
+async def export_all_component_versions():
+    '''
+    Stream every component version, one JSON document per line.
+    '''
+    logger.info("Exporting all component versions")
+    return StreamingResponse(export_component_versions(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/form_versions", summary="Export all form versions as NDJSON")
+async def export_all_form_versions():
+    '''
+    Stream every form version, one JSON document per line.
+    '''
+    logger.info("Exporting all form versions")
+    return StreamingResponse(export_form_versions(), media_type=NDJSON_MEDIA_TYPE)
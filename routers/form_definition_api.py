@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
 from models.form_models import Form
-from db_handler import get_connection, close_connection
-from routers.data_layer.forms import create_form, update_form, delete_form_from_db, get_form_from_db, list_forms    
+from routers.data_layer import forms, form_import
+from routers.data_layer.aio import forms as async_forms
+from routers.data_layer.dispatch import DataLayer
+from routers.data_layer.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_after
+from json_response import FastJSONResponse
 
 router = APIRouter(prefix="/form_definitions", tags=["Forms"])
 
+# Data layer (native async when DB_ASYNC is enabled, threadpool otherwise)
+forms_db = DataLayer(forms, async_forms)
+form_import_db = DataLayer(form_import)
+
 
 '''
 This API implements endpoints used to work with form definitions.
@@ -18,7 +26,7 @@ For the moment, we only have mechanisms to create forms.
         response_description="The created or updated form details",
         status_code=201
         )
-def create_or_update_form(
+async def create_or_update_form(
     form: Form, 
     form_id: int = None, 
     update_key: bool = False
@@ -50,16 +58,16 @@ def create_or_update_form(
         # UPDATE the form instead of creating a new one
             
             # Call update method in database layer
-            updated_form = update_form(form_id, update_key, form)
+            updated_form = await forms_db.update_form(form_id, update_key, form)
             # Return info
-            return{"status": "success", "form": updated_form}
+            return FastJSONResponse({"status": "success", "form": updated_form}, status_code=201)
                
         else:
             # INSERT a new form
 
             # Call creation method in database layer
-            new_form = create_form(form)
-            return {"status": "success", "form": new_form}
+            new_form = await forms_db.create_form(form)
+            return FastJSONResponse({"status": "success", "form": new_form}, status_code=201)
         
     except HTTPException:
         raise
@@ -72,7 +80,7 @@ def create_or_update_form(
 
 
 @router.delete("/forms/{form_id}", summary="Delete a form")
-def delete_form(form_id: int):
+async def delete_form(form_id: int):
     '''
     Delete a form from the database.
 
@@ -82,7 +90,7 @@ def delete_form(form_id: int):
 
     try:
         # Call deletion method in database layer
-        message = delete_form_from_db(form_id)
+        message = await forms_db.delete_form_from_db(form_id)
         return message
     
     except HTTPException:
@@ -92,7 +100,7 @@ def delete_form(form_id: int):
         raise HTTPException(status_code=500, detail=f"Database operation failed: {str(e)}")
 
 @router.get("/forms/{form_id}", summary="Get form details")
-def get_form(form_id: int):
+async def get_form(form_id: int):
     '''
     Retrieve form details from the database.
 
@@ -101,8 +109,8 @@ def get_form(form_id: int):
 
     try:
         # Call retrieval method in database layer
-        message = get_form_from_db(form_id)
-        return message
+        message = await forms_db.get_form_from_db(form_id)
+        return FastJSONResponse(message)
     
     except HTTPException:
         raise
@@ -112,17 +120,58 @@ def get_form(form_id: int):
     
 
 @router.get("/forms", summary="Health check endpoint")
-def get_all_forms():
+async def get_all_forms(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+    ):
     '''
-    Endpoint to get a list of all the forms in the database.
+    Endpoint to get the list of forms in the database, one page at a time.
+
+    Forms are ordered by id. Pass the `next_after` token of a response as
+    `after` to read the next page; it is null on the last page.
     ''' 
 
+    # Validate the page token before touching the database
+    after_id = decode_after(after)
+
     try:
-        message = list_forms()
-        return message
+        message = await forms_db.list_forms(limit, after_id)
+        return FastJSONResponse(message)
     
     except HTTPException:
         raise
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database operation failed: {str(e)}") 
+
+
+@router.post("/import", summary="Bulk import forms and form versions")
+async def import_forms(request: Request, dry_run: bool = False):
+    '''
+    Import forms and their versions from a JSON lines upload (request body).
+
+    Each line is one form: {"key", "name", "description", "versions": [{"version_number",
+    "key", "schema", "is_active"}]}. The body may be plain JSON lines, gzipped, or a
+    zip / tar(.gz) archive of .jsonl files. Rows are staged with COPY and merged in a
+    single transaction: existing forms (by key) and versions (by number) are updated.
+    Uploads over FORM_IMPORT_MAX_BODY_BYTES, or decompressing to more than
+    FORM_IMPORT_MAX_UNCOMPRESSED_BYTES, are rejected with a 413.
+
+    **Parameters:**
+    - **dry_run**: Run the whole import and report the counts, then roll it back.
+
+    **Returns:**
+    - Inserted / updated counts, elapsed time and throughput in rows per second.
+    '''
+
+    body = await request.body()
+
+    try:
+        result = await form_import_db.import_forms_from_upload(body, dry_run)
+        return {"status": "success", "import": result}
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database operation failed: {str(e)}")
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
-from models.form_models import FormVersion
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from models.form_models import FormVersion, SubmissionBatch
+from json_response import FastJSONResponse, JSONB_PASSTHROUGH
 from logger import get_logger
-from routers.data_layer.form_versions import create_form_version, update_form_version 
-from models.form_models import FormVersion
+from routers.data_layer import form_versions
+from routers.data_layer.aio import form_versions as async_form_versions
+from routers.data_layer import form_render
+from routers.data_layer.aio import form_render as async_form_render
+from routers.data_layer import form_artifacts
+from routers.data_layer.aio import form_artifacts as async_form_artifacts
+from routers.artifacts import artifact_response
+from routers.data_layer import form_validation
+from routers.data_layer.aio import form_validation as async_form_validation
+from routers.data_layer.dispatch import DataLayer
+from routers.etags import version_etag, etag_matches, not_modified
+from cpu_pool import cpu_pool
+from validation_engine import ValidationConfigError
+from schema_validation import SchemaValidationError, check_form_schema
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -12,9 +23,37 @@ logger = get_logger(__name__)
 # Initialize API router
 router = APIRouter(prefix="/form_definitions", tags=["Component Versions"])
 
+# Data layer (native async when DB_ASYNC is enabled, threadpool otherwise)
+form_versions_db = DataLayer(form_versions, async_form_versions)
+form_render_db = DataLayer(form_render, async_form_render)
+form_artifacts_db = DataLayer(form_artifacts, async_form_artifacts)
+form_validation_db = DataLayer(form_validation, async_form_validation)
+
+async def publish_after_write(form_id: int, version_number: int):
+    '''
+    Publish a version that was just written (writes activate it).
+
+    Run as a background task, once the response is sent: the write already
+    succeeded, so a failure is logged and leaves the version unpublished.
+    '''
+    try:
+        await form_artifacts_db.publish_form_version(form_id, version_number)
+
+    except Exception as e:
+        logger.warning(f"Version {version_number} of form {form_id} saved but not published: {str(e)}")
+
+
+def schema_errors(error: SchemaValidationError) -> list:
+    '''Meta-schema errors in the shape of FastAPI's own 422 details.'''
+    return [{"type": f"schema.{item['keyword']}",
+             "loc": ["body", "schema", *item["path"]],
+             "msg": item["message"]}
+            for item in error.errors]
+
+
 # Test method to ensure routing is working
 @router.get("/test-versions", summary="Test endpoint for component versions")
-def test_form_version_endpoint():
+async def test_form_version_endpoint():
     """
     A simple test endpoint to verify that the component versions router is working.
     """
@@ -26,32 +65,44 @@ def test_form_version_endpoint():
 
 @router.post("/forms/{form_id}/versions", summary="Create a new form version")
 @router.post("/forms/{form_id}/versions/{version_id}", summary="Update a specific version of a form")
-def create_or_update_form_version(form_id: int,
+async def create_or_update_form_version(form_id: int,
                                   form_version: FormVersion,
+                                  background_tasks: BackgroundTasks,
                                   version_id: int = None):
     '''
     Method to create or update a form version.
     
     If the version number is provided, it will update the corresponding version.
-    Else, it will create a new version.'''
+    Else, it will create a new version.
+    The version is published once the response is sent (see publish_after_write).'''
 
     # Determine if it's a creation or update operation
     update_version = True if version_id else False
 
     try:
+        # Reject schemas not following their meta-schema or with rules that cannot be compiled
+        try:
+            await cpu_pool.run(check_form_schema, form_version.schema)
+        except SchemaValidationError as e:
+            raise HTTPException(status_code=422, detail=schema_errors(e))
+        except ValidationConfigError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid validation rules in schema: {str(e)}")
+
         if update_version:
             # Log the update operation
             logger.info(f"Attempting to update version {version_id} of form {form_id}")
 
             # Call database operation
-            message = update_form_version(form_id, version_id, form_version)
+            message = await form_versions_db.update_form_version(form_id, version_id, form_version)
+            if form_artifacts.PUBLISH_ON_WRITE:
+                background_tasks.add_task(publish_after_write, form_id, version_id)
 
             # Return message with status code 200 (OK)
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code = 200,
                 content = {
                     "status": "Version updated successfully",
-                    "data": jsonable_encoder(message)
+                    "data": message
                 }
             )
 
@@ -60,14 +111,16 @@ def create_or_update_form_version(form_id: int,
             logger.info(f"Attempting to create a new version for form {form_id}")
 
             # Call database operation
-            message = create_form_version(form_id, form_version)
+            message = await form_versions_db.create_form_version(form_id, form_version)
+            if form_artifacts.PUBLISH_ON_WRITE:
+                background_tasks.add_task(publish_after_write, form_id, message['version_number'])
 
             # Return message with explicit 201 status code (Created)
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code = 201,
                 content = {
                     "status": "Version created successfully",
-                    "data": jsonable_encoder(message)
+                    "data": message
                 }
             )
 
@@ -76,4 +129,171 @@ def create_or_update_form_version(form_id: int,
         raise
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing form version: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error processing form version: {str(e)}")
+
+@router.get("/forms/{form_id}/versions/{version_id}", summary="Obtain a particular version of a form")
+async def get_form_version(form_id: int, version_id: int, request: Request):
+    '''
+    Method to obtain a specific version of a form.
+
+    The response carries an ETag. If the If-None-Match header matches it,
+    returns an empty 304 without reading the schema.
+    '''
+
+    try:
+        # Conditional GET: only the id and last update are needed to answer it
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            etag = version_etag(await form_versions_db.get_form_version_stamp(form_id, version_id))
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        # Call database operation (served from the version cache when possible)
+        form_version = await form_versions_db.get_form_version_from_db(form_id, version_id, raw=JSONB_PASSTHROUGH)
+
+        return FastJSONResponse({"status": "success", "form_version": form_version},
+                                headers={"ETag": version_etag(form_version)})
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving form version: {str(e)}")
+
+
+@router.get("/forms/{form_id}/versions", summary="Obtain latest version of a form")
+async def get_latest_form_version(form_id: int, request: Request):
+    '''
+    Method to obtain the latest version of a form.
+
+    The response carries an ETag (it changes when a version is added or updated).
+    If the If-None-Match header matches it, returns an empty 304.
+    '''
+
+    try:
+        # Conditional GET: only the id and last update are needed to answer it
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            etag = version_etag(await form_versions_db.get_form_version_stamp(form_id))
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        # Call database operation (served from the version cache when possible)
+        form_version = await form_versions_db.get_latest_form_version_from_db(form_id, raw=JSONB_PASSTHROUGH)
+
+        return FastJSONResponse({"status": "success", "form_version": form_version},
+                                headers={"ETag": version_etag(form_version)})
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving latest form version: {str(e)}")
+
+
+@router.get("/forms/{form_id}/versions/{version_id}/render", summary="Obtain a form version with every component it uses")
+@router.get("/forms/{form_id}/render", summary="Obtain the latest form version with every component it uses")
+async def get_form_render_bundle(form_id: int, version_id: int = None):
+    '''
+    Method to obtain everything needed to render a form version in one call.
+
+    Returns the form version and, in "components", every component version its
+    schema references (objects with "component_id" and optionally "version_number"),
+    keyed by "<component_id>:<version_number>" or "<component_id>:latest".
+    References that do not exist are listed in "missing".
+    '''
+
+    try:
+        # Call database operation (one query for all the components not cached)
+        bundle = await form_render_db.get_form_render_bundle(form_id, version_id, raw=JSONB_PASSTHROUGH)
+
+        return FastJSONResponse({"status": "success", **bundle})
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building render bundle: {str(e)}")
+
+
+@router.post("/forms/{form_id}/versions/{version_id}/publish", summary="Publish a form version as a precompiled artifact")
+async def publish_form_version(form_id: int, version_id: int):
+    '''
+    Method to (re)publish a form version.
+
+    Serializes the version with every component it references (the render
+    bundle) and stores it compressed, addressed by content hash. Versions are
+    published when written; publish again to pick up component changes.
+    '''
+
+    try:
+        artifact = await form_artifacts_db.publish_form_version(form_id, version_id)
+
+        return FastJSONResponse({"status": "Version published", "artifact": artifact})
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error publishing form version: {str(e)}")
+
+
+@router.get("/forms/{form_id}/versions/{version_id}/artifact", summary="Obtain the published artifact of a form version")
+@router.get("/forms/{form_id}/artifact", summary="Obtain the published artifact of the latest published form version")
+async def get_form_artifact(form_id: int, request: Request, version_id: int = None):
+    '''
+    Method to obtain a published form version, as stored when it was published.
+
+    Same document as the render endpoint at publish time, sent as brotli, gzip or
+    plain bytes according to Accept-Encoding, with no serialization per request.
+    The ETag derives from the content hash; a matching If-None-Match gets a 304.
+    '''
+
+    try:
+        # Served from the artifact cache when possible
+        artifact = await form_artifacts_db.get_form_artifact(form_id, version_id)
+
+        return artifact_response(artifact,
+                                 request.headers.get("accept-encoding"),
+                                 request.headers.get("if-none-match"))
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving form artifact: {str(e)}")
+
+
+@router.post("/forms/{form_id}/versions/{version_id}/validate", summary="Validate submissions against a form version")
+@router.post("/forms/{form_id}/validate", summary="Validate submissions against the latest form version")
+async def validate_submissions(form_id: int, batch: SubmissionBatch, version_id: int = None):
+    '''
+    Method to validate a batch of submissions (field name -> value objects).
+
+    Rules come from the validation_config of the components each field uses,
+    overridden by the field's own "validation" object in the schema. They are
+    compiled once per form version. Returns, per submission, whether it is
+    valid and its errors (field, rule and message). Rules that cannot be
+    compiled (e.g. a component's minimum that is not a number) give a 409.
+    '''
+
+    try:
+        # Compiled validator (cached until the form or one of its components changes)
+        validator = await form_validation_db.get_form_validator(form_id, version_id)
+
+        # CPU bound: checked in the CPU pool (or on the threadpool without one)
+        result = await cpu_pool.run(validator.validate_many, batch.submissions)
+
+        return FastJSONResponse({"status": "success",
+                                 "form_id": form_id,
+                                 "version_number": validator.version_number,
+                                 **result})
+
+    except HTTPException:
+        raise
+
+    except ValidationConfigError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error validating submissions: {str(e)}")
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from metrics import CONTENT_TYPE, render_metrics
+
+# Initialize the API router
+router = APIRouter(tags=["Metrics"])
+
+'''
+Metrics of this process in the Prometheus text format, for a Prometheus
+server (or anything reading that format, curl included) to scrape.
+
+See metrics.py for the metrics collected.
+'''
+
+
+@router.get("/metrics", summary="Get the metrics in the Prometheus text format", response_class=Response)
+async def get_metrics():
+    '''
+    Request counts, latency and response size histograms per route template,
+    requests in flight and error counts by status.
+    '''
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
@@ -1,5 +1,10 @@
 from fastapi import APIRouter
 from datetime import datetime
+from db_handler import get_pool_stats, get_async_pool_stats, get_query_stats
+from cache import get_cache_stats
+from cache_bus import get_cache_bus_stats
+from cpu_pool import get_cpu_pool_stats
+from logger import get_logging_stats
 
 router = APIRouter(prefix="/testapi", tags=["Test API"])
 
@@ -21,7 +26,7 @@ def _time_of_day(hour: int) -> str:
     return "night"
 
 @router.get("/time", summary="Get current local time and time-of-day")
-def get_time():
+async def get_time():
     """
     Returns the current server local datetime (ISO) and a time-of-day label.
     This endpoint is intentionally simple for local development.
@@ -36,3 +41,51 @@ def get_time():
     }
 
 
+@router.get("/db-pool", summary="Get database connection pool statistics")
+async def get_db_pool():
+    """
+    Returns the usage counters of the database connection pools
+    (open, in use and idle connections, checkouts, waits and health check failures).
+    The async pool is only reported once it has been opened (DB_ASYNC enabled).
+    """
+    return {"sync": get_pool_stats(), "async": get_async_pool_stats()}
+
+
+@router.get("/db-queries", summary="Get database statement statistics")
+async def get_db_queries(limit: int = 20):
+    """
+    Returns the execution counters of the statements run by this process, per
+    normalized statement (calls, errors, slow executions, rows, total, mean and
+    max time in seconds), the ones with the longest total time first.
+    """
+    return {"queries": get_query_stats(limit)}
+
+
+@router.get("/cache", summary="Get version cache statistics")
+async def get_cache():
+    """
+    Returns the counters of the in-process version caches
+    (hits, misses, expirations, evictions, invalidations and current size),
+    and of the listener applying the invalidations sent by the other workers.
+    """
+    return {"caches": get_cache_stats(), "bus": get_cache_bus_stats()}
+
+
+@router.get("/cpu-pool", summary="Get CPU pool statistics")
+async def get_cpu_pool():
+    """
+    Returns the counters of the process pool running CPU-bound work
+    (submitted, completed, failed, rejected and timed out tasks, pending tasks,
+    and the time tasks spent queued and running).
+    """
+    return get_cpu_pool_stats()
+
+
+@router.get("/logging", summary="Get logging queue statistics")
+async def get_logging():
+    """
+    Returns the counters of the logging queue (records waiting to be written,
+    records dropped because it was full and batches written), when logs are
+    written asynchronously.
+    """
+    return get_logging_stats()
@@ -0,0 +1,372 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Optional
+from dotenv import load_dotenv
+from validation_engine import check_schema
+
+'''
+Validation of form version schemas against versioned meta-schemas.
+
+A meta-schema is a JSON Schema document stored in models/meta_schemas as
+form_schema_v<version>.json. A form schema picks the one it follows with its
+top-level "schema_version" (the configured default when absent). Each
+meta-schema is compiled once per process, on first use, into nested check
+functions, so validating a schema walks it once without interpreting the
+meta-schema again.
+
+The compiler implements the subset of JSON Schema (2020-12) the meta-schemas
+use: type, enum, const, properties, required, additionalProperties, items,
+minItems / maxItems, minLength / maxLength, minimum / maximum, pattern and
+local $ref to "#" or "#/$defs/...". A meta-schema using any other keyword
+fails to compile rather than being partially enforced.
+
+Errors carry the path of the offending value (keys and list indexes), the
+keyword that failed and a message. Validation stops after MAX_ERRORS errors.
+
+Configuration:
+- FORM_SCHEMA_VERSION: Meta-schema version of schemas without
+  "schema_version" (default the latest one)
+'''
+
+load_dotenv()
+
+META_SCHEMA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "meta_schemas")
+META_SCHEMA_FILE = re.compile(r"^form_schema_v(\d+)\.json$")
+
+# Errors reported at most per schema
+MAX_ERRORS = 50
+
+# Keywords that only document the meta-schema
+ANNOTATIONS = {"$schema", "$id", "$comment", "$defs", "title", "description", "default", "examples"}
+
+KEYWORDS = {"type", "enum", "const", "properties", "required", "additionalProperties", "items",
+            "minItems", "maxItems", "minLength", "maxLength", "minimum", "maximum", "pattern", "$ref"}
+
+
+def _is_integer(value) -> bool:
+    return (isinstance(value, int) and not isinstance(value, bool)) or (isinstance(value, float) and value.is_integer())
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _json_equal(value, other) -> bool:
+    '''Equality of JSON values (true is not 1, 1 is 1.0).'''
+    if isinstance(value, bool) or isinstance(other, bool):
+        return isinstance(value, bool) and isinstance(other, bool) and value == other
+    return value == other
+
+
+# JSON type -> test of a parsed value
+JSON_TYPES = {
+    "null": lambda value: value is None,
+    "boolean": lambda value: isinstance(value, bool),
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "number": _is_number,
+    "integer": _is_integer,
+}
+
+# Check: (value, path, errors); path is a linked (parent, key) pair, None at the root
+Check = Callable[[Any, Optional[tuple], list], None]
+
+
+class MetaSchemaError(Exception):
+    '''A meta-schema that cannot be compiled (unsupported keyword, unresolvable $ref).'''
+
+
+class SchemaValidationError(ValueError):
+    '''A form schema that does not follow its meta-schema.'''
+
+    def __init__(self, message: str, errors: list):
+        super().__init__(message, errors)
+        self.message = message
+        self.errors = errors
+
+    def __str__(self):
+        return self.message
+
+
+class _TooManyErrors(Exception):
+    pass
+
+
+def path_list(path: Optional[tuple]) -> list:
+    '''Keys and indexes from the root to a value.'''
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    keys.reverse()
+    return keys
+
+
+def _fail(errors: list, path, keyword: str, message: str):
+    errors.append({"path": path_list(path), "keyword": keyword, "message": message})
+    if len(errors) >= MAX_ERRORS:
+        raise _TooManyErrors()
+
+
+class _Compiler:
+    '''Compiles one meta-schema; $ref targets are compiled once and shared.'''
+
+    def __init__(self, root: dict):
+        self.root = root
+        self.refs = {}
+
+    def ref(self, pointer: str) -> Check:
+        if pointer not in self.refs:
+            # Placeholder first: recursive definitions refer to themselves
+            self.refs[pointer] = None
+            self.refs[pointer] = self.compile(self.resolve(pointer))
+
+        refs = self.refs
+        return lambda value, path, errors: refs[pointer](value, path, errors)
+
+    def resolve(self, pointer: str):
+        if pointer == "#":
+            return self.root
+
+        if not pointer.startswith("#/"):
+            raise MetaSchemaError(f"Only local references are supported: {pointer!r}")
+
+        node = self.root
+        for key in pointer[2:].split("/"):
+            key = key.replace("~1", "/").replace("~0", "~")
+            if not isinstance(node, dict) or key not in node:
+                raise MetaSchemaError(f"Unresolvable reference {pointer!r}")
+            node = node[key]
+        return node
+
+    def compile(self, node) -> Check:
+        if node is True or node == {}:
+            return lambda value, path, errors: None
+
+        if node is False:
+            return lambda value, path, errors: _fail(errors, path, "false", "No value is allowed here.")
+
+        if not isinstance(node, dict):
+            raise MetaSchemaError(f"A schema must be an object or a boolean, not {node!r}")
+
+        unsupported = set(node) - KEYWORDS - ANNOTATIONS
+        if unsupported:
+            raise MetaSchemaError(f"Unsupported keywords: {', '.join(sorted(unsupported))}")
+
+        checks = []
+
+        if "$ref" in node:
+            checks.append(self.ref(node["$ref"]))
+
+        if "type" in node:
+            checks.append(self._type(node["type"]))
+
+        if "enum" in node:
+            allowed = node["enum"]
+
+            def check_enum(value, path, errors):
+                if not any(_json_equal(value, option) for option in allowed):
+                    _fail(errors, path, "enum", f"Must be one of {json.dumps(allowed)}.")
+
+            checks.append(check_enum)
+
+        if "const" in node:
+            expected = node["const"]
+
+            def check_const(value, path, errors):
+                if not _json_equal(value, expected):
+                    _fail(errors, path, "const", f"Must be {json.dumps(expected)}.")
+
+            checks.append(check_const)
+
+        if {"properties", "required", "additionalProperties"} & set(node):
+            checks.append(self._object(node))
+
+        if {"items", "minItems", "maxItems"} & set(node):
+            checks.append(self._array(node))
+
+        if {"minLength", "maxLength", "pattern"} & set(node):
+            checks.append(self._string(node))
+
+        if {"minimum", "maximum"} & set(node):
+            checks.append(self._number(node))
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value, path, errors):
+            for check in checks:
+                check(value, path, errors)
+
+        return check_all
+
+    def _type(self, expected) -> Check:
+        names = [expected] if isinstance(expected, str) else list(expected)
+        unknown = [name for name in names if name not in JSON_TYPES]
+        if unknown:
+            raise MetaSchemaError(f"Unknown types: {', '.join(map(str, unknown))}")
+
+        tests = [JSON_TYPES[name] for name in names]
+        message = f"Must be of type {' or '.join(names)}."
+
+        if len(tests) == 1:
+            test = tests[0]
+
+            def check_type(value, path, errors):
+                if not test(value):
+                    _fail(errors, path, "type", message)
+
+            return check_type
+
+        def check_types(value, path, errors):
+            if not any(test(value) for test in tests):
+                _fail(errors, path, "type", message)
+
+        return check_types
+
+    def _object(self, node: dict) -> Check:
+        properties = {name: self.compile(schema) for name, schema in node.get("properties", {}).items()}
+        required = list(node.get("required", []))
+        additional = node.get("additionalProperties", True)
+        additional = None if additional is True or additional == {} else self.compile(additional)
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+
+            for name in required:
+                if name not in value:
+                    _fail(errors, path, "required", f"'{name}' is required.")
+
+            for key, item in value.items():
+                check = properties.get(key)
+                if check is not None:
+                    check(item, (path, key), errors)
+                elif additional is not None:
+                    additional(item, (path, key), errors)
+
+        return check_object
+
+    def _array(self, node: dict) -> Check:
+        items = self.compile(node["items"]) if "items" in node else None
+        min_items = node.get("minItems")
+        max_items = node.get("maxItems")
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+
+            if min_items is not None and len(value) < min_items:
+                _fail(errors, path, "minItems", f"Must have at least {min_items} items.")
+            if max_items is not None and len(value) > max_items:
+                _fail(errors, path, "maxItems", f"Must have at most {max_items} items.")
+
+            if items is not None:
+                for index, item in enumerate(value):
+                    items(item, (path, index), errors)
+
+        return check_array
+
+    def _string(self, node: dict) -> Check:
+        min_length = node.get("minLength")
+        max_length = node.get("maxLength")
+        search = re.compile(node["pattern"]).search if "pattern" in node else None
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+
+            if min_length is not None and len(value) < min_length:
+                _fail(errors, path, "minLength", f"Must have at least {min_length} characters.")
+            if max_length is not None and len(value) > max_length:
+                _fail(errors, path, "maxLength", f"Must have at most {max_length} characters.")
+            if search is not None and search(value) is None:
+                _fail(errors, path, "pattern", f"Must match {node['pattern']!r}.")
+
+        return check_string
+
+    def _number(self, node: dict) -> Check:
+        minimum = node.get("minimum")
+        maximum = node.get("maximum")
+
+        def check_number(value, path, errors):
+            if not _is_number(value):
+                return
+
+            if minimum is not None and value < minimum:
+                _fail(errors, path, "minimum", f"Must be greater than or equal to {minimum}.")
+            if maximum is not None and value > maximum:
+                _fail(errors, path, "maximum", f"Must be less than or equal to {maximum}.")
+
+        return check_number
+
+
+def compile_schema(schema) -> Callable[[Any], list]:
+    '''Compile a JSON Schema (the supported subset) into a function returning the errors of a document.'''
+    check = _Compiler(schema).compile(schema)
+
+    def validate(document) -> list:
+        errors = []
+        try:
+            check(document, None, errors)
+        except _TooManyErrors:
+            pass
+        return errors
+
+    return validate
+
+
+@lru_cache(maxsize=None)
+def available_versions() -> tuple:
+    '''Versions of the meta-schemas shipped in models/meta_schemas.'''
+    return tuple(sorted(int(match.group(1)) for match in map(META_SCHEMA_FILE.match, os.listdir(META_SCHEMA_DIRECTORY))
+                  if match is not None))
+
+
+DEFAULT_VERSION = int(os.getenv("FORM_SCHEMA_VERSION", "0")) or max(available_versions())
+
+
+@lru_cache(maxsize=None)
+def meta_validator(version: int) -> Callable[[Any], list]:
+    '''Compiled validator of a meta-schema version (compiled once per process).'''
+    path = os.path.join(META_SCHEMA_DIRECTORY, f"form_schema_v{version}.json")
+
+    with open(path, encoding="utf-8") as meta_schema_file:
+        return compile_schema(json.load(meta_schema_file))
+
+
+def validate_form_schema(schema) -> int:
+    '''
+    Check a form schema against the meta-schema it declares (or the default one).
+
+    Returns the meta-schema version used. Raises SchemaValidationError listing
+    the errors found.
+    '''
+    version = schema.get("schema_version", DEFAULT_VERSION) if isinstance(schema, dict) else DEFAULT_VERSION
+
+    if not _is_integer(version) or int(version) not in available_versions():
+        raise SchemaValidationError(
+            f"Unknown schema_version {version!r}, supported versions: {list(available_versions())}",
+            [{"path": ["schema_version"], "keyword": "schema_version", "message": "Unknown meta-schema version."}])
+
+    errors = meta_validator(int(version))(schema)
+    if errors:
+        raise SchemaValidationError(f"The schema does not follow meta-schema version {int(version)}", errors)
+
+    return int(version)
+
+
+def check_form_schema(schema) -> int:
+    '''
+    Everything checked on a form version write: the meta-schema, then the
+    validation rules of the fields (see validation_engine.check_schema).
+
+    Raises SchemaValidationError or ValidationConfigError. CPU bound on large
+    schemas: run through the CPU pool.
+    '''
+    version = validate_form_schema(schema)
+    check_schema(schema)
+    return version
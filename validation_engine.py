@@ -0,0 +1,313 @@
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+'''
+Validation engine for form submissions.
+
+The rules of a field come from the validation_config of the component
+version it references, overridden by the field's own "required" flag, then
+key by key by its "validation" object in the form schema. A form version is compiled once into
+a FormValidator: each rule becomes a small check function (regular
+expressions are compiled, limits converted), so validating a submission only
+runs those functions, without looking at the rules again.
+
+Fields are the objects of the schema with a "name" and a "component_id", a
+"validation" object or a "required" flag. A submission is an object mapping
+field names to values; values of unknown fields are ignored.
+
+Supported rules (unknown ones are ignored):
+- required: the value must be present and not null or ""
+- type: string, number, integer, boolean, array or object
+- min_length / max_length: length of a string or array
+- minimum / maximum: bounds of a number
+- pattern: regular expression a string must match (searched, as in JSON Schema)
+- enum: list of allowed values
+- messages: custom error message per rule name
+
+Compiled validators can be sent to other processes (see cpu_pool.py): they
+are pickled as their rules and compiled again on the other side, once per
+process and set of rules.
+'''
+
+# Python types accepted for each "type" rule (bool is not a number here)
+TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+DEFAULT_MESSAGES = {
+    "required": "This field is required.",
+    "type": "Must be of type {type}.",
+    "min_length": "Must have at least {min_length} characters or items.",
+    "max_length": "Must have at most {max_length} characters or items.",
+    "minimum": "Must be greater than or equal to {minimum}.",
+    "maximum": "Must be less than or equal to {maximum}.",
+    "pattern": "Does not match the expected format.",
+    "enum": "Is not one of the allowed values.",
+}
+
+# Check: value -> whether it passes
+Check = Callable[[Any], bool]
+
+
+class ValidationConfigError(ValueError):
+    '''A validation rule that cannot be compiled (e.g. an invalid regular expression or a limit that is not a number).'''
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_type(expected: str) -> Check:
+    if not isinstance(expected, str) or expected not in TYPES:
+        raise ValidationConfigError(f"Unknown type {expected!r}")
+
+    types = TYPES[expected]
+    if expected in ("number", "integer"):
+        return lambda value: isinstance(value, types) and not isinstance(value, bool)
+    return lambda value: isinstance(value, types)
+
+
+def _length_limit(rule: str, limit) -> int:
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+        raise ValidationConfigError(f"{rule} must be a non-negative integer, not {limit!r}")
+    return limit
+
+
+def _number_limit(rule: str, limit):
+    if not _is_number(limit):
+        raise ValidationConfigError(f"{rule} must be a number, not {limit!r}")
+    return limit
+
+
+def _check_min_length(limit: int) -> Check:
+    limit = _length_limit("min_length", limit)
+    return lambda value: not isinstance(value, (str, list)) or len(value) >= limit
+
+
+def _check_max_length(limit: int) -> Check:
+    limit = _length_limit("max_length", limit)
+    return lambda value: not isinstance(value, (str, list)) or len(value) <= limit
+
+
+def _check_minimum(limit) -> Check:
+    limit = _number_limit("minimum", limit)
+    return lambda value: not _is_number(value) or value >= limit
+
+
+def _check_maximum(limit) -> Check:
+    limit = _number_limit("maximum", limit)
+    return lambda value: not _is_number(value) or value <= limit
+
+
+def _check_pattern(pattern: str) -> Check:
+    if not isinstance(pattern, str):
+        raise ValidationConfigError(f"pattern must be a string, not {pattern!r}")
+    try:
+        search = re.compile(pattern).search
+    except (re.error, TypeError) as e:
+        raise ValidationConfigError(f"Invalid pattern {pattern!r}: {str(e)}")
+    return lambda value: not isinstance(value, str) or search(value) is not None
+
+
+def _check_enum(allowed: list) -> Check:
+    if not isinstance(allowed, list):
+        raise ValidationConfigError(f"enum must be a list, not {allowed!r}")
+
+    # Hashable values are looked up in a set, the rest compared one by one
+    try:
+        allowed_set = frozenset(allowed)
+        return lambda value: value in allowed_set if value.__hash__ is not None else value in allowed
+    except TypeError:
+        return lambda value: value in allowed
+
+
+# Rule name -> factory building its check from the rule's value
+CHECKS = {
+    "type": _check_type,
+    "min_length": _check_min_length,
+    "max_length": _check_max_length,
+    "minimum": _check_minimum,
+    "maximum": _check_maximum,
+    "pattern": _check_pattern,
+    "enum": _check_enum,
+}
+
+
+class FieldValidator:
+    '''Compiled rules of one field.'''
+
+    __slots__ = ("name", "rules", "required", "required_message", "checks")
+
+    def __init__(self, name: str, rules: dict):
+        self.name = name
+        self.rules = rules
+        messages = rules.get("messages") or {}
+        if not isinstance(messages, dict) or not all(isinstance(text, str) for text in messages.values()):
+            raise ValidationConfigError(f"Field '{name}': messages must map rule names to strings")
+        arguments = {key: value for key, value in rules.items() if isinstance(key, str)}
+
+        def message(rule):
+            template = messages.get(rule) or DEFAULT_MESSAGES[rule]
+            try:
+                return template.format(**arguments)
+            except (KeyError, IndexError, ValueError):
+                return template
+
+        self.required = bool(rules.get("required"))
+        self.required_message = message("required")
+
+        # (rule, check, message), in a fixed order so errors are reported consistently
+        self.checks: List[Tuple[str, Check, str]] = []
+        for rule, factory in CHECKS.items():
+            if rules.get(rule) is not None:
+                try:
+                    self.checks.append((rule, factory(rules[rule]), message(rule)))
+                except ValidationConfigError as e:
+                    raise ValidationConfigError(f"Field '{name}': {str(e)}")
+
+    def validate(self, value, errors: list):
+        '''Append the errors of a value (None when the field is missing) to errors.'''
+        if value is None or value == "":
+            if self.required:
+                errors.append({"field": self.name, "rule": "required", "message": self.required_message})
+            return
+
+        for rule, check, message in self.checks:
+            if not check(value):
+                errors.append({"field": self.name, "rule": rule, "message": message})
+
+
+class FormValidator:
+    '''Compiled validator of a form version.'''
+
+    def __init__(self, fields: List[FieldValidator], form_id: Optional[int] = None,
+                 version_number: Optional[int] = None):
+        self.fields = fields
+        self.form_id = form_id
+        self.version_number = version_number
+        self._fingerprint = None
+
+    def __reduce__(self):
+        # Pickled as its rules: checks are closures, rebuilt by _restore_validator
+        rules = [(field.name, field.rules) for field in self.fields]
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha1(repr(rules).encode()).hexdigest()
+        return _restore_validator, (self._fingerprint, rules, self.form_id, self.version_number)
+
+    def validate(self, submission) -> list:
+        '''Errors of one submission (empty when valid).'''
+        errors = []
+
+        if not isinstance(submission, dict):
+            return [{"field": None, "rule": "type", "message": "A submission must be an object."}]
+
+        get = submission.get
+        for field in self.fields:
+            field.validate(get(field.name), errors)
+
+        return errors
+
+    def validate_many(self, submissions: list) -> dict:
+        '''Validate a batch of submissions: counts and, per submission, its errors.'''
+        results = []
+        valid_count = 0
+
+        for index, submission in enumerate(submissions):
+            errors = self.validate(submission)
+            if not errors:
+                valid_count += 1
+            results.append({"index": index, "valid": not errors, "errors": errors})
+
+        return {"valid_count": valid_count, "invalid_count": len(results) - valid_count, "results": results}
+
+
+# Validators rebuilt from pickles in this process, by fingerprint of their rules
+_restored = OrderedDict()
+RESTORED_MAX_ENTRIES = 128
+
+
+def _restore_validator(fingerprint: str, rules: list, form_id: Optional[int],
+                       version_number: Optional[int]) -> FormValidator:
+    '''Compile a pickled validator, reusing the one compiled last time for the same rules.'''
+    validator = _restored.get(fingerprint)
+
+    if validator is None:
+        validator = FormValidator([FieldValidator(name, field_rules) for name, field_rules in rules])
+        validator._fingerprint = fingerprint
+        _restored[fingerprint] = validator
+        if len(_restored) > RESTORED_MAX_ENTRIES:
+            _restored.popitem(last=False)
+    else:
+        _restored.move_to_end(fingerprint)
+
+    # Same rules may belong to several form versions
+    restored = FormValidator(validator.fields, form_id, version_number)
+    restored._fingerprint = fingerprint
+    return restored
+
+
+def schema_fields(schema) -> list:
+    '''Objects of a form schema that describe a named field with validation (in order of appearance).'''
+    fields = []
+    pending = [schema]
+
+    while pending:
+        node = pending.pop()
+
+        if isinstance(node, dict):
+            if isinstance(node.get("name"), str) and ("component_id" in node or "required" in node
+                                                      or isinstance(node.get("validation"), dict)):
+                fields.append(node)
+            pending.extend(value for value in reversed(node.values()) if isinstance(value, (dict, list)))
+
+        elif isinstance(node, list):
+            pending.extend(value for value in reversed(node) if isinstance(value, (dict, list)))
+
+    return fields
+
+
+def compile_form(schema, component_rules: Callable[[dict], Optional[dict]],
+                 form_id: Optional[int] = None, version_number: Optional[int] = None) -> FormValidator:
+    '''
+    Compile the rules of a form schema.
+
+    component_rules(field) returns the validation_config of the component
+    version a field references (None when it has none).
+    Raises ValidationConfigError when a rule cannot be compiled.
+    '''
+    validators = []
+
+    for field in schema_fields(schema):
+        component_config = component_rules(field) or {}
+        field_config = field.get("validation") or {}
+        if not isinstance(component_config, dict):
+            raise ValidationConfigError(f"Field '{field['name']}': the validation_config of its component "
+                                        f"must be an object")
+        if not isinstance(field_config, dict):
+            raise ValidationConfigError(f"Field '{field['name']}': validation must be an object")
+
+        rules = dict(component_config)
+        if field.get("required") is not None:
+            rules["required"] = field["required"]
+        rules.update(field_config)
+
+        if rules:
+            validators.append(FieldValidator(field["name"], rules))
+
+    return FormValidator(validators, form_id, version_number)
+
+
+def check_schema(schema):
+    '''
+    Compile the rules a form schema declares itself (the "validation" objects of its fields).
+
+    Raises ValidationConfigError when one cannot be compiled.
+    '''
+    compile_form(schema, lambda field: None)